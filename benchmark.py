@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+
+import booking
+import governor
+import llm_client
+from main import AsyncTravelChatbot
+from prompt_budget import count_message_tokens, count_tokens
+
+##################################################################
+# Scripted conversations: (user message, fields the stub "extracts" from it)
+##################################################################
+
+SCRIPTS = {
+    "english": [
+        ("Hi! I'd like to plan a trip to Japan.", {"to": "Japan"}),
+        ("I'll be flying from Dhaka.", {"from": "Dhaka"}),
+        ("With my wife, so 2 adults.", {"traveling_with": "2 adults (couple)"}),
+        ("Next month, around the 10th.", {"when": "next month, around the 10th"}),
+        ("10 days", {"duration": "10 days"}),
+        ("Mostly culture and food.", {"purpose": "culture and food"}),
+        ("By train.", {"transportation": "train"}),
+    ],
+    "chinese": [
+        ("你好，我想去日本旅行。", {"to": "日本"}),
+        ("我从台北出发。", {"from": "台北"}),
+        ("和我太太，两个人。", {"traveling_with": "2人（夫妻）"}),
+        ("下个月中旬。", {"when": "下个月中旬"}),
+        ("十天", {"duration": "10 days"}),
+        ("文化和美食", {"purpose": "文化和美食"}),
+        ("坐火车", {"transportation": "火车"}),
+    ],
+}
+CONFIRMATION = {"english": "yes", "chinese": "yes"}
+
+STUB_ITINERARY = {
+    "trip_overview": {"title": "Stub trip", "total_estimated_cost": "$1", "travel_dates": "-", "group_size": "2", "destinations": ["Tokyo"]},
+    "locations": [
+        {"location": "Tokyo", "overview": "Stub.", "accommodations": [], "itinerary": [
+            {"day": str(day), "title": "Day", "date": "-", "description": "Stub day. " * 40, "travel_time": "-"}
+            for day in range(1, 6)
+        ]},
+    ],
+    "additional_info": [{"tips": "Stub tip."}],
+}
+
+
+##################################################################
+# Local stand-ins for the OpenAI chat endpoint and the Booking API
+##################################################################
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.booking_calls = 0
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"calls": self.calls, "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens, "booking_calls": self.booking_calls}
+
+
+def _stub_completion(messages: list) -> str:
+    last = messages[-1]["content"]
+    system = messages[0]["content"] if messages[0]["role"] == "system" else ""
+    all_messages = {text: fields for script in SCRIPTS.values() for text, fields in script}
+
+    match = re.search(r"Newest user message: (.*)", last)
+    if match:
+        return json.dumps(all_messages.get(match.group(1).strip(), {}), ensure_ascii=False)
+    if "extract travel information in JSON format" in last:
+        extracted = {}
+        for text, fields in all_messages.items():
+            if text in last or text.lower() in last:
+                extracted.update(fields)
+        return json.dumps(extracted, ensure_ascii=False)
+    if "comprehensive trip description" in last:
+        return "A relaxed cultural trip focused on food and history. " * 6
+    if "Summarize the earlier part" in last:
+        return "The user is planning a trip and has shared their preferences."
+    chunk = re.search(r"Write ONLY days (\d+) to (\d+)", system)
+    if chunk:
+        days = range(int(chunk.group(1)), int(chunk.group(2)) + 1)
+        day = STUB_ITINERARY["locations"][0]["itinerary"][0]
+        return json.dumps({"itinerary": [dict(day, day=str(number)) for number in days]}, ensure_ascii=False)
+    if "Do NOT write the day-by-day itinerary" in system:
+        plan = dict(STUB_ITINERARY, locations=[
+            {key: value for key, value in location.items() if key != "itinerary"} for location in STUB_ITINERARY["locations"]
+        ])
+        return json.dumps(plan, ensure_ascii=False)
+    if "travel itinerary" in system:
+        return json.dumps(STUB_ITINERARY, ensure_ascii=False)
+    return "That sounds wonderful! Could you tell me a bit more about your plans?"
+
+
+def make_openai_handler(stats: StubStats, latency: float, jitter: float):
+    class OpenAIStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            content = _stub_completion(body["messages"])
+            prompt_tokens = count_message_tokens(body["messages"])
+            completion_tokens = count_tokens(content)
+            with stats.lock:
+                stats.calls += 1
+                stats.prompt_tokens += prompt_tokens
+                stats.completion_tokens += completion_tokens
+            time.sleep(latency + random.uniform(0, jitter))
+
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for i in range(0, len(content), 16):
+                    chunk = {"id": "stub", "object": "chat.completion.chunk", "model": body.get("model"),
+                             "choices": [{"index": 0, "delta": {"content": content[i:i + 16]}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(0.002)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+                return
+
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion", "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return OpenAIStubHandler
+
+
+def make_booking_handler(stats: StubStats, latency: float, jitter: float):
+    class BookingStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with stats.lock:
+                stats.booking_calls += 1
+            time.sleep(latency + random.uniform(0, jitter))
+            payload = json.dumps({"path": self.path, "result": [{"name": "stub", "value": 1}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return BookingStubHandler
+
+
+def start_stub(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+##################################################################
+# Load generation
+##################################################################
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_session(language: str, turn_latencies: list, itinerary: bool):
+    bot = AsyncTravelChatbot(language=language)
+    bot.start_conversation()
+    for user_message, _ in SCRIPTS[language]:
+        started = time.perf_counter()
+        await bot.process_turn(user_message)
+        turn_latencies.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    await bot.handle_user_confirmation(CONFIRMATION[language])
+    turn_latencies.append(time.perf_counter() - started)
+    if itinerary:
+        from test import async_call_openai_chat
+        await bot.ensure_trip_description()
+        await async_call_openai_chat(bot.get_travel_info_json(), {"hotels": []}, language)
+
+
+async def run_load(sessions: int, concurrency: int, languages: list, itinerary: bool) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    turn_latencies = []
+
+    async def one(i):
+        async with semaphore:
+            await run_session(languages[i % len(languages)], turn_latencies, itinerary)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "turn_latencies": turn_latencies}
+
+
+def run_booking(hotels: int, rounds: int) -> list:
+    latencies = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        booking.fetch_hotels_details(list(range(1, hotels + 1)), ["reviews_filter_metadata", "review_scores", "facilities"])
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(values: list) -> dict:
+    return {
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "mean": round(statistics.fmean(values), 4) if values else 0.0,
+    }
+
+
+def run_benchmark(args) -> dict:
+    stats = StubStats()
+    openai_stub = start_stub(make_openai_handler(stats, args.llm_latency, args.llm_jitter))
+    booking_stub = start_stub(make_booking_handler(stats, args.booking_latency, args.booking_jitter))
+    openai.api_base = f"http://127.0.0.1:{openai_stub.server_port}/v1"
+    openai.api_key = "stub"
+    os.environ["OPENAI_API_KEY"] = "stub"
+    booking.set_client(booking.BookingClient(base_url=f"http://127.0.0.1:{booking_stub.server_port}",
+                                             cache=None, requests_per_second=0))
+    if not args.cache:
+        llm_client.configure_cache(None)
+    governor.configure(args.rpm, args.tpm, args.max_in_flight)
+
+    try:
+        load = asyncio.run(run_load(args.sessions, args.concurrency, args.languages, args.itinerary))
+        llm = stats.snapshot()
+        booking_latencies = run_booking(args.booking_hotels, args.booking_rounds) if args.booking_rounds else []
+    finally:
+        openai_stub.shutdown()
+        booking_stub.shutdown()
+
+    turns = len(load["turn_latencies"])
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "sessions_per_sec": round(args.sessions / load["elapsed"], 3),
+        "turn_latency": summarize(load["turn_latencies"]),
+        "llm_calls_per_turn": round(llm["calls"] / turns, 3),
+        "prompt_tokens_per_turn": round(llm["prompt_tokens"] / turns, 1),
+        "completion_tokens_per_turn": round(llm["completion_tokens"] / turns, 1),
+        "booking_enrichment_latency": summarize(booking_latencies) if booking_latencies else None,
+    }
+
+
+def compare(result: dict, baseline: dict):
+    def show(name, current, previous):
+        if isinstance(current, (int, float)) and isinstance(previous, (int, float)) and previous:
+            print(f"  {name:<32} {previous:>10} -> {current:>10} ({(current - previous) / previous:+.1%})")
+
+    print("Compared with baseline:")
+    for key in ("sessions_per_sec", "llm_calls_per_turn", "prompt_tokens_per_turn", "completion_tokens_per_turn"):
+        show(key, result.get(key), baseline.get(key))
+    for section in ("turn_latency", "booking_enrichment_latency"):
+        for pct in ("p50", "p95", "p99"):
+            show(f"{section}.{pct}", (result.get(section) or {}).get(pct), (baseline.get(section) or {}).get(pct))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Offline load test against local OpenAI/Booking stand-ins")
+    arg_parser.add_argument("--sessions", type=int, default=50)
+    arg_parser.add_argument("--concurrency", type=int, default=10)
+    arg_parser.add_argument("--languages", nargs="+", default=["english", "chinese"], choices=sorted(SCRIPTS))
+    arg_parser.add_argument("--llm-latency", type=float, default=0.3, help="base stub latency per LLM call (s)")
+    arg_parser.add_argument("--llm-jitter", type=float, default=0.2, help="extra uniform random latency (s)")
+    arg_parser.add_argument("--booking-latency", type=float, default=0.1)
+    arg_parser.add_argument("--booking-jitter", type=float, default=0.05)
+    arg_parser.add_argument("--booking-hotels", type=int, default=10)
+    arg_parser.add_argument("--booking-rounds", type=int, default=5)
+    arg_parser.add_argument("--itinerary", action="store_true", help="also generate an itinerary per session")
+    arg_parser.add_argument("--rpm", type=float, default=0, help="LLM requests/min quota for the governor (0 = unlimited)")
+    arg_parser.add_argument("--tpm", type=float, default=0, help="LLM tokens/min quota for the governor (0 = unlimited)")
+    arg_parser.add_argument("--max-in-flight", type=int, default=0, help="open LLM requests allowed by the governor (0 = unlimited)")
+    arg_parser.add_argument("--cache", action="store_true", help="keep the LLM response cache enabled")
+    arg_parser.add_argument("--output", default="benchmark_results.json", help="where to save the results")
+    arg_parser.add_argument("--compare", help="baseline results file to compare against")
+    args = arg_parser.parse_args()
+
+    result = run_benchmark(args)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -52,62 +52,436 @@
 
 
 
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import urljoin, urlparse
+
 import requests
+from requests.adapters import HTTPAdapter
+
+import geo_index
+import metrics
+from cache import LRUCache, SQLiteCache, TieredCache, make_key
+
+BOOKING_BASE_URL = os.getenv("BOOKING_BASE_URL", "https://booking-com.p.rapidapi.com")
 
 # Common Headers for the API
 headers = {
-    "x-rapidapi-key": "0ec75bfd4bmsh619d22cc21e2e29p13405ejsn8bdaab1b2017",  # Replace with your actual RapidAPI key
+    "x-rapidapi-key": os.getenv("TRAVEL_API_KEY", "0ec75bfd4bmsh619d22cc21e2e29p13405ejsn8bdaab1b2017"),  # Replace with your actual RapidAPI key
     "x-rapidapi-host": "booking-com.p.rapidapi.com"
 }
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Response cache policies per endpoint path: (fresh TTL, extra stale-while-revalidate window) in seconds.
+# Search results change with availability; hotel metadata and geography barely change at all.
+CACHE_POLICIES = {
+    "/v1/hotels/search": (30 * 60, 30 * 60),
+    "/v1/hotels/locations": (7 * DAY, 7 * DAY),
+    "/v1/hotels/nearby-cities": (30 * DAY, 30 * DAY),
+    "/v1/hotels/reviews-filter-metadata": (7 * DAY, 7 * DAY),
+    "/v1/hotels/review-scores": (DAY, DAY),
+    "/v1/hotels/facilities": (7 * DAY, 7 * DAY),
+    "/v1/hotels/description": (7 * DAY, 7 * DAY),
+    "/v1/hotels/photos": (7 * DAY, 7 * DAY),
+    "/v1/hotels/data": (7 * DAY, 7 * DAY),
+}
+DEFAULT_CACHE_POLICY = (HOUR, HOUR)
+
+
+def default_response_cache() -> TieredCache:
+    """Bounded in-memory LRU, plus an SQLite tier when BOOKING_CACHE_PATH is set"""
+    disk_path = os.getenv("BOOKING_CACHE_PATH")
+    return TieredCache(
+        LRUCache(max_entries=int(os.getenv("BOOKING_CACHE_SIZE", "2048")), ttl=DEFAULT_CACHE_POLICY[0]),
+        SQLiteCache(disk_path) if disk_path else None,
+    )
+
+
+@dataclass
+class BookingResult:
+    """Outcome of a Booking API request (instead of printing status/debug output)"""
+    url: str
+    status_code: Optional[int] = None
+    data: Any = None
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    from_cache: bool = False
+    stale: bool = False
+    headers: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.status_code == 200
+
+
+class RateLimiter:
+    """Thread-safe token bucket used to stay under the RapidAPI request quota."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so no request is sent for `seconds` (used for Retry-After)"""
+        with self._lock:
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class BookingClient:
+    """Booking.com (RapidAPI) client with a shared keep-alive connection pool.
+
+    Adds request timeouts, retries with jittered exponential backoff on 429/5xx
+    (honouring Retry-After) and a client-side rate limiter for the API quota.
+    Successful responses are cached per endpoint policy (see CACHE_POLICIES);
+    stale entries are served immediately while a background refresh runs.
+    Pass cache=None to disable caching.
+    """
+
+    def __init__(
+        self,
+        base_url: str = BOOKING_BASE_URL,
+        api_key: str = None,
+        timeout: tuple = (3.05, 15),
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        requests_per_second: float = 5.0,
+        pool_size: int = 20,
+        cache="default",
+        cache_policies: dict = None,
+    ):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(requests_per_second) if requests_per_second else None
+
+        self.cache = default_response_cache() if cache == "default" else cache
+        self.cache_policies = CACHE_POLICIES if cache_policies is None else cache_policies
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2)
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        if api_key:
+            self.session.headers["x-rapidapi-key"] = api_key
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _url(self, endpoint: str) -> str:
+        if endpoint.startswith(("http://", "https://")):
+            return endpoint
+        return urljoin(self.base_url, endpoint.lstrip("/"))
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _policy(self, url: str) -> tuple:
+        return self.cache_policies.get(urlparse(url).path, DEFAULT_CACHE_POLICY)
+
+    def get(self, endpoint: str, params: dict = None) -> BookingResult:
+        url = self._url(endpoint)
+        if self.cache is None:
+            return self._fetch(url, params)
+
+        key = make_key(url, {k: str(v) for k, v in (params or {}).items()})
+        ttl, stale_window = self._policy(url)
+        entry = self.cache.get(key)
+        metrics.record_cache("booking", entry is not None)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            stale = age > ttl
+            if stale:
+                self._refresh_in_background(key, url, params)
+            return BookingResult(url=url, status_code=200, data=entry["data"], from_cache=True, stale=stale)
+
+        result = self._fetch(url, params)
+        if result.ok:
+            self._store(key, result, ttl + stale_window)
+        return result
+
+    def _store(self, key: str, result: BookingResult, ttl: float):
+        self.cache.set(key, {"data": result.data, "fetched_at": time.time()}, ttl)
+
+    def _refresh_in_background(self, key: str, url: str, params: dict):
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                result = self._fetch(url, params)
+                if result.ok:
+                    self._store(key, result, sum(self._policy(url)))
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def _fetch(self, url: str, params: dict = None) -> BookingResult:
+        with metrics.span(f"booking.{urlparse(url).path.rsplit('/', 1)[-1]}") as info:
+            result = self._do_fetch(url, params)
+            info.update(status=result.status_code, attempts=result.attempts)
+            return result
+
+    def _do_fetch(self, url: str, params: dict = None) -> BookingResult:
+        result = BookingResult(url=url)
+        started = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            result.attempts = attempt + 1
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                result.error = f"{type(e).__name__}: {e}"
+                result.status_code = None
+                if attempt < self.max_retries:
+                    metrics.record_retry("booking", type(e).__name__)
+                    time.sleep(self._backoff(attempt))
+                    continue
+                break
+
+            result.url = response.url
+            result.status_code = response.status_code
+            result.headers = dict(response.headers)
+
+            if response.status_code == 200:
+                try:
+                    result.data = response.json()
+                    result.error = None
+                except ValueError:
+                    result.error = "Invalid JSON in response"
+                break
+
+            result.error = f"HTTP {response.status_code}: {response.text[:500]}"
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                break
+
+            delay = self._backoff(attempt)
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            if response.status_code == 429 and self.rate_limiter is not None:
+                self.rate_limiter.pause(delay)
+            metrics.record_retry("booking", str(response.status_code))
+            time.sleep(delay)
+
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def close(self):
+        self._refresh_executor.shutdown(wait=False)
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> BookingClient:
+    """Process-wide shared BookingClient (one connection pool for all callers)"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = BookingClient()
+    return _default_client
+
+
+def set_client(client: BookingClient):
+    global _default_client
+    _default_client = client
+
+
 # Function to fetch data from any endpoint with error handling
 def fetch_data(endpoint, params=None):
-    response = requests.get(endpoint, headers=headers, params=params)
-    print(f"Request URL: {response.url}")  # Debugging: print the request URL
-    print(f"Status Code: {response.status_code}")  # Debugging: print the status code
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Failed to fetch data from {endpoint}. Status code: {response.status_code}")
-        print(f"Error Response: {response.text}")  # Print error response content
-        return None
+    result = get_client().get(endpoint, params)
+    return result.data if result.ok else None
+
+# Search hotels for a destination and dates (cached per dest/dates/party/currency)
+def search_hotels(dest_id, checkin_date, checkout_date, adults_number=2, room_number=1,
+                  filter_by_currency="USD", dest_type="city", order_by="popularity", locale="en-gb", page_number=0):
+    url = "/v1/hotels/search"
+    querystring = {
+        "dest_id": dest_id,
+        "dest_type": dest_type,
+        "checkin_date": checkin_date,
+        "checkout_date": checkout_date,
+        "adults_number": adults_number,
+        "room_number": room_number,
+        "filter_by_currency": filter_by_currency,
+        "order_by": order_by,
+        "locale": locale,
+        "units": "metric",
+        "page_number": page_number,
+    }
+    return fetch_data(url, querystring)
 
 # Example API calls for different endpoints
 
 # Fetch nearby cities for a hotel (Example endpoint)
-def fetch_nearby_cities():
-    url = "https://booking-com.p.rapidapi.com/v1/hotels/nearby-cities"
-    querystring = {"latitude":"65.9667","longitude":"-18.5333","locale":"en-gb"}
-    return fetch_data(url, querystring)
+def fetch_nearby_cities(latitude="65.9667", longitude="-18.5333", locale="en-gb"):
+    path, params = _nearby_cities_request(None, (latitude, longitude), locale)
+    local = _resolve_locally(path, params)
+    if local is not None:
+        return local
+    return fetch_data(path, params)
 
 # Fetch reviews filter metadata for a hotel (Example endpoint)
 def fetch_reviews_filter_metadata(hotel_id):
-    url = "https://booking-com.p.rapidapi.com/v1/hotels/reviews-filter-metadata"
-    querystring = {"hotel_id": hotel_id, "locale": "en-gb"}
-    return fetch_data(url, querystring)
+    return fetch_data(*_reviews_filter_metadata_request(hotel_id))
+
+
+def _nearby_cities_request(hotel_id, location=None, locale="en-gb"):
+    latitude, longitude = location or ("65.9667", "-18.5333")
+    return "/v1/hotels/nearby-cities", {"latitude": str(latitude), "longitude": str(longitude), "locale": locale}
+
+def _reviews_filter_metadata_request(hotel_id, location=None):
+    return "/v1/hotels/reviews-filter-metadata", {"hotel_id": hotel_id, "locale": "en-gb"}
+
+def _hotel_request(path):
+    return lambda hotel_id, location=None: (path, {"hotel_id": hotel_id, "locale": "en-gb"})
+
+
+def _local_nearby_cities(params):
+    return geo_index.nearby_cities(params["latitude"], params["longitude"])
+
+
+# Endpoints that can be answered from local data; the remote call is only made on a local miss
+LOCAL_ENDPOINTS = {
+    "/v1/hotels/nearby-cities": _local_nearby_cities,
+}
+
+
+def _resolve_locally(path, params):
+    resolver = LOCAL_ENDPOINTS.get(path)
+    if resolver is None:
+        return None
+    try:
+        return resolver(params)
+    except (KeyError, ValueError):
+        return None
+
+
+# Per-hotel enrichment endpoints: name -> function(hotel_id, location) returning (path, params)
+HOTEL_DETAIL_ENDPOINTS = {
+    "nearby_cities": _nearby_cities_request,
+    "reviews_filter_metadata": _reviews_filter_metadata_request,
+    "review_scores": _hotel_request("/v1/hotels/review-scores"),
+    "facilities": _hotel_request("/v1/hotels/facilities"),
+    "description": _hotel_request("/v1/hotels/description"),
+    "photos": _hotel_request("/v1/hotels/photos"),
+    "data": _hotel_request("/v1/hotels/data"),
+}
+DEFAULT_DETAIL_ENDPOINTS = ("nearby_cities", "reviews_filter_metadata")
+
+
+def fetch_hotels_details(hotel_ids, endpoints=DEFAULT_DETAIL_ENDPOINTS, max_concurrency: int = 8, client: BookingClient = None,
+                         hotel_locations: dict = None) -> dict:
+    """Enrich one or many hotels by calling all endpoints concurrently.
+
+    hotel_locations optionally maps hotel_id -> (latitude, longitude) for location-based endpoints.
+    Identical requests (e.g. the same nearby-cities lookup) are only sent once, and
+    endpoints in LOCAL_ENDPOINTS are answered locally when possible.
+    Returns {hotel_id: {endpoint: data or None, "errors": {endpoint: message}}};
+    a failing endpoint leaves None in its slot instead of failing the whole record.
+    """
+    if isinstance(hotel_ids, (int, str)):
+        hotel_ids = [hotel_ids]
+    client = client or get_client()
+
+    unique_requests = {}  # (path, frozen params) -> (path, params)
+    plan = []  # (hotel_id, endpoint, request key)
+    for hotel_id in hotel_ids:
+        for endpoint in endpoints:
+            path, params = HOTEL_DETAIL_ENDPOINTS[endpoint](hotel_id, (hotel_locations or {}).get(hotel_id))
+            key = (path, tuple(sorted(params.items())))
+            unique_requests.setdefault(key, (path, params))
+            plan.append((hotel_id, endpoint, key))
+
+    results = {}
+    remote_requests = {}
+    for key, (path, params) in unique_requests.items():
+        local = _resolve_locally(path, params)
+        if local is not None:
+            results[key] = BookingResult(url=path, status_code=200, data=local, from_cache=True)
+        else:
+            remote_requests[key] = (path, params)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(remote_requests)))) as executor:
+        # Each worker runs in a copy of the caller's context so spans keep the session tag
+        futures = {
+            key: executor.submit(contextvars.copy_context().run, client.get, path, params)
+            for key, (path, params) in remote_requests.items()
+        }
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = BookingResult(url=key[0], error=f"{type(e).__name__}: {e}")
+
+    details = {hotel_id: {} for hotel_id in hotel_ids}
+    for hotel_id, endpoint, key in plan:
+        result = results[key]
+        record = details[hotel_id]
+        record[endpoint] = result.data if result.ok else None
+        if not result.ok:
+            record.setdefault("errors", {})[endpoint] = result.error
+    return details
 
 # Main function to fetch hotel details
-def fetch_hotel_details(hotel_id):
-    hotel_details = {}
-
-    # Example fetching different endpoints for the hotel
-    hotel_details["nearby_cities"] = fetch_nearby_cities()
-    hotel_details["reviews_filter_metadata"] = fetch_reviews_filter_metadata(hotel_id)
-    # Add other functions like fetch_review_scores, fetch_room_list, etc.
-
-    return hotel_details
-
-# Example to fetch hotel data for a specific hotel_id
-hotel_id = 1676161  # Example hotel ID
-hotel_details = fetch_hotel_details(hotel_id)
-
-# Print the fetched details
-if hotel_details:
-    for key, value in hotel_details.items():
-        print(f"{key}: {value}")
-else:
-    print("Failed to fetch hotel details.")
+def fetch_hotel_details(hotel_id, endpoints=DEFAULT_DETAIL_ENDPOINTS):
+    return fetch_hotels_details([hotel_id], endpoints)[hotel_id]
+
+
+if __name__ == "__main__":
+    # Example to fetch hotel data for a specific hotel_id
+    hotel_id = 1676161  # Example hotel ID
+    hotel_details = fetch_hotel_details(hotel_id)
+
+    # Print the fetched details
+    if hotel_details:
+        for key, value in hotel_details.items():
+            print(f"{key}: {value}")
+    else:
+        print("Failed to fetch hotel details.")
 
 
 
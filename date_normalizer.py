@@ -0,0 +1,442 @@
+import datetime
+import functools
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
+
+from dateutil.relativedelta import relativedelta
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents while keeping every character at its index"""
+    folded = []
+    for ch in text:
+        base = unicodedata.normalize("NFKD", ch)[:1] or ch
+        if unicodedata.combining(base):
+            base = ch
+        lower = base.lower()
+        folded.append(lower if len(lower) == 1 else base)
+    return "".join(folded)
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """A normalised travel date: a single day, or start..end for ranges, months and month parts."""
+
+    start: datetime.date
+    end: Optional[datetime.date] = None
+
+    def iso(self) -> str:
+        if self.end is None or self.end == self.start:
+            return self.start.isoformat()
+        return f"{self.start.isoformat()} to {self.end.isoformat()}"
+
+    def as_dict(self) -> dict:
+        return {"start": self.start.isoformat(), "end": (self.end or self.start).isoformat()}
+
+
+##################################################################
+# Numbers
+##################################################################
+
+EN_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "twenty": 20, "thirty": 30, "a couple of": 2, "couple of": 2, "a pair of": 2,
+}
+ZH_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "兩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+
+EN_NUM = r"\d{1,3}|" + "|".join(re.escape(word) for word in sorted(EN_NUMBERS, key=len, reverse=True))
+ZH_NUM = r"\d{1,3}|[零一二两兩三四五六七八九十]{1,3}"
+
+
+def parse_number(text: str) -> int:
+    """'12' / 'twelve' / '十二' -> 12; None when not a number"""
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    if text in EN_NUMBERS:
+        return EN_NUMBERS[text]
+    if text and all(ch in ZH_DIGITS or ch == "十" for ch in text):
+        if "十" not in text:
+            return ZH_DIGITS[text] if len(text) == 1 else None
+        tens, _, ones = text.partition("十")
+        return (ZH_DIGITS.get(tens, 1) if tens else 1) * 10 + (ZH_DIGITS.get(ones, 0) if ones else 0)
+    return None
+
+
+##################################################################
+# Date grammar
+##################################################################
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8, "september": 9,
+    "sept": 9, "sep": 9, "october": 10, "oct": 10, "november": 11, "nov": 11, "december": 12, "dec": 12,
+}
+WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+WEEK_OF_MONTH = {"first": 1, "1st": 1, "second": 8, "2nd": 8, "third": 15, "3rd": 15, "fourth": 22, "4th": 22}
+# Part of a month -> (first day, last day); -1 is the last day of the month
+MONTH_PARTS = {
+    "early": (1, 10), "beginning of": (1, 10), "start of": (1, 10), "mid": (11, 20), "middle of": (11, 20),
+    "late": (21, -1), "end of": (-1, -1),
+    "初": (1, 10), "上旬": (1, 10), "中": (11, 20), "中旬": (11, 20), "下旬": (21, -1), "底": (-1, -1), "末": (-1, -1),
+}
+
+# Part of a year -> (first month, last month)
+YEAR_PARTS = {
+    "early": (1, 4), "beginning of": (1, 4), "start of": (1, 4), "mid": (5, 8), "middle of": (5, 8),
+    "late": (9, 12), "end of": (12, 12),
+    "初": (1, 4), "年初": (1, 4), "中": (5, 8), "年中": (5, 8), "底": (12, 12), "年底": (12, 12), "末": (12, 12), "年末": (12, 12),
+}
+# Season -> (first month, number of months); winter runs into the next year
+SEASONS = {
+    "spring": (3, 3), "summer": (6, 3), "autumn": (9, 3), "fall": (9, 3), "winter": (12, 3),
+    "春": (3, 3), "夏": (6, 3), "秋": (9, 3), "冬": (12, 3),
+}
+
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+_EN_PART = r"early|mid|late|beginning\s+of|start\s+of|middle\s+of|end\s+of"
+_ZH_PART = r"初|上旬|中旬|下旬|中|底|末"
+_ORDINAL = r"(?:st|nd|rd|th)?"
+_ANNOTATION_RE = re.compile(r"\((\d{4}-\d{2}-\d{2})(?: to (\d{4}-\d{2}-\d{2}))?\)\s*$")
+_RANGE_JOIN_RE = re.compile(r"\s*(?:-|–|~|to|until|till|through|thru|到|至|～)\s*")
+
+
+def _month_end(date: datetime.date) -> datetime.date:
+    return (date + relativedelta(months=1)).replace(day=1) - datetime.timedelta(days=1)
+
+
+def _day_in_month(date: datetime.date, day: int) -> datetime.date:
+    """date moved to `day` of its month (-1 = last day)"""
+    return _month_end(date) if day == -1 else date.replace(day=min(day, _month_end(date).day))
+
+
+def _month_year(today: datetime.date, month: int, last_day: int = -1) -> int:
+    """Year of the next occurrence of `month` that has not ended before `last_day`"""
+    end = _day_in_month(datetime.date(today.year, month, 1), last_day)
+    return today.year + 1 if end < today else today.year
+
+
+def _month_span(year: int, month: int, part: tuple = (1, -1)) -> DateRange:
+    first = datetime.date(year, month, 1)
+    start, end = _day_in_month(first, part[0]), _day_in_month(first, part[1])
+    return DateRange(start, end if end != start else None)
+
+
+def _month_reference(today: datetime.date, month: int, part: str = None, day: int = None,
+                     day2: int = None, year: int = None) -> DateRange:
+    """'March', 'mid-March', 'March 10', 'March 10-15', with the year inferred when missing"""
+    if day is not None:
+        last = day2 or day
+        year = year or _month_year(today, month, last)
+        start = _day_in_month(datetime.date(year, month, 1), day)
+        return DateRange(start, _day_in_month(start, day2) if day2 else None)
+    span = MONTH_PARTS.get(re.sub(r"\s+", " ", part), (1, -1)) if part else (1, -1)
+    return _month_span(year or _month_year(today, month, span[1]), month, span)
+
+
+def _months_span(year: int, month: int, count: int) -> DateRange:
+    start = datetime.date(year, month, 1)
+    return DateRange(start, _month_end(start + relativedelta(months=count - 1)))
+
+
+def _year_span(year: int, part: str = None) -> DateRange:
+    first, last = YEAR_PARTS[re.sub(r"\s+", " ", part)] if part else (1, 12)
+    return _months_span(year, first, last - first + 1)
+
+
+def _season_span(today: datetime.date, season: str, year: int = None, skip: bool = False) -> DateRange:
+    """A season in `year`, or else the current or next one (the one after that when skip, i.e. "next summer")"""
+    month, count = SEASONS[season]
+    if year is not None:
+        return _months_span(year, month, count)
+    span = _months_span(today.year - (1 if month == 12 and today.month <= 2 else 0), month, count)
+    if span.end < today:
+        span = _months_span(span.start.year + 1, month, count)
+    if skip and span.start <= today:
+        span = _months_span(span.start.year + 1, month, count)
+    return span
+
+
+def _upcoming_weekday(today: datetime.date, weekday: int) -> datetime.date:
+    return today + datetime.timedelta(days=(weekday - today.weekday()) % 7)
+
+
+def _weekend(saturday: datetime.date) -> DateRange:
+    return DateRange(saturday, saturday + datetime.timedelta(days=1))
+
+
+def _offset(today: datetime.date, count: int, unit: str) -> datetime.date:
+    unit = unit.lstrip("个個")
+    if unit.startswith(("week", "周", "週", "星期", "礼拜", "禮拜")):
+        return today + datetime.timedelta(weeks=count)
+    if unit.startswith(("month", "月")):
+        return today + relativedelta(months=count)
+    return today + datetime.timedelta(days=count)
+
+
+def _next_month(m, today):
+    base = today + relativedelta(months=1)
+    week = m.group("week")
+    if week == "last":
+        return DateRange(_month_end(base) - datetime.timedelta(days=6), _month_end(base))
+    if week:
+        start = base.replace(day=WEEK_OF_MONTH[week])
+        return DateRange(start, start + datetime.timedelta(days=6))
+    return DateRange(base)
+
+
+def _en_month(m, today):
+    month_word = m.group("month")
+    groups = m.groupdict()
+    qualified = groups.get("part") or groups.get("day") or groups.get("year") or groups.get("next_year")
+    if not (qualified or groups.get("prefix") in ("in", "this", "next")) and month_word in ("may", "march"):
+        return None  # "I may ..." / "march" as a verb
+    year = int(groups["year"]) if groups.get("year") else (today.year + 1 if groups.get("next_year") else None)
+    return _month_reference(
+        today, MONTHS[month_word], groups.get("part"),
+        int(groups["day"]) if groups.get("day") else None,
+        int(groups["day2"]) if groups.get("day2") else None,
+        year,
+    )
+
+
+_ZH_RELATIVE_YEARS = {"今年": 0, "明年": 1, "后年": 2, "後年": 2}
+
+
+def _zh_year(groups: dict, today: datetime.date) -> Optional[int]:
+    if groups.get("year"):
+        return int(groups["year"])
+    if groups.get("rel_year"):
+        return today.year + _ZH_RELATIVE_YEARS[groups["rel_year"]]
+    return None
+
+
+def _zh_month(m, today):
+    groups = m.groupdict()
+    month = parse_number(groups["month"])
+    if not month or month > 12:
+        return None
+    return _month_reference(
+        today, month, groups.get("part"),
+        parse_number(groups["day"]) if groups.get("day") else None,
+        parse_number(groups["day2"]) if groups.get("day2") else None,
+        _zh_year(groups, today),
+    )
+
+
+def _numeric_date(m, today):
+    """'10/12/2026' and '12/25' read month first, like dateutil; day first when that is the only valid order"""
+    first, second = int(m.group("first")), int(m.group("second"))
+    month, day = (second, first) if first > 12 >= second else (first, second)
+    year = m.groupdict().get("year")
+    if year is None:
+        year = _month_year(today, month, day)
+    else:
+        year = int(year) + (2000 if len(year) == 2 else 0)
+    return DateRange(datetime.date(year, month, day))
+
+
+def _single(offset):
+    return lambda m, today: DateRange(offset(m, today))
+
+
+# (pattern, resolver(match, today) -> DateRange or None), matched against folded text in order;
+# a span taken by an earlier rule is not matched again.
+DATE_RULES = [
+    (re.compile(r"\b(?:in\s+|on\s+)?(?P<year>\d{4})(?P<sep>[-/.])(?P<month>\d{1,2})(?P=sep)(?P<day>\d{1,2})\b"),
+     _single(lambda m, today: datetime.date(int(m.group("year")), int(m.group("month")), int(m.group("day"))))),
+    # "10/12/2026", "12.10.2026", "10-12-26", "12/25"
+    (re.compile(r"\b(?:on\s+)?(?P<first>\d{1,2})(?P<sep>[-/.])(?P<second>\d{1,2})(?P=sep)(?P<year>\d{4}|\d{2})\b"), _numeric_date),
+    (re.compile(r"\b(?:on\s+)?(?P<first>\d{1,2})/(?P<second>\d{1,2})(?![/\d])"), _numeric_date),
+    (re.compile(r"\b(?:(?:in\s+)?the\s+|in\s+)?(?:(?P<week>first|1st|second|2nd|third|3rd|fourth|4th|last)\s+week\s+of\s+)?"
+                r"next\s+month\b"), _next_month),
+    (re.compile(r"\b(?:at\s+)?(?:the\s+)?end\s+of\s+(?:this|the)\s+month\b"), _single(lambda m, today: _month_end(today))),
+    (re.compile(r"\b(?:at\s+)?(?:the\s+)?end\s+of\s+next\s+month\b"),
+     _single(lambda m, today: _month_end(today + relativedelta(months=1)))),
+    (re.compile(r"\bthis\s+weekend\b"), lambda m, today: _weekend(_upcoming_weekday(today, 5))),
+    (re.compile(r"\bnext\s+weekend\b"), lambda m, today: _weekend(_upcoming_weekday(today, 5) + datetime.timedelta(days=7))),
+    (re.compile(r"\bnext\s+week\b"), _single(lambda m, today: today + datetime.timedelta(days=7))),
+    (re.compile(r"\b(?:the\s+)?day\s+after\s+tomorrow\b"), _single(lambda m, today: today + datetime.timedelta(days=2))),
+    (re.compile(r"\btomorrow\b"), _single(lambda m, today: today + datetime.timedelta(days=1))),
+    (re.compile(r"\b(?:today|tonight)\b"), _single(lambda m, today: today)),
+    (re.compile(rf"\bin\s+(?P<count>{EN_NUM})\s+(?P<unit>days?|weeks?|months?)(?:\s+time)?\b"),
+     _single(lambda m, today: _offset(today, parse_number(m.group("count")), m.group("unit")))),
+    (re.compile(rf"\b(?P<count>{EN_NUM})\s+(?P<unit>days?|weeks?|months?)\s+from\s+(?:now|today)\b"),
+     _single(lambda m, today: _offset(today, parse_number(m.group("count")), m.group("unit")))),
+    (re.compile(r"\b(?:on\s+|this\s+|next\s+)?(?P<weekday>monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b"),
+     _single(lambda m, today: _upcoming_weekday(today + datetime.timedelta(days=1), WEEKDAYS[m.group("weekday")]))),
+    # "March 10-15", "10-15 March"
+    (re.compile(rf"\b(?P<month>{_MONTH_NAMES})\.?\s+(?P<day>\d{{1,2}}){_ORDINAL}\s*(?:-|–|to|until|till|through)\s*"
+                rf"(?P<day2>\d{{1,2}}){_ORDINAL}(?:,?\s+(?P<year>\d{{4}}))?\b"), _en_month),
+    (re.compile(rf"\b(?P<day>\d{{1,2}}){_ORDINAL}\s*(?:-|–|to|until|till|through)\s*(?P<day2>\d{{1,2}}){_ORDINAL}\s+(?:of\s+)?"
+                rf"(?P<month>{_MONTH_NAMES})(?:,?\s+(?P<year>\d{{4}}))?\b"), _en_month),
+    # "12 October", "3rd of November" (before the bare month, which would take the month word)
+    (re.compile(rf"\b(?:on\s+)?(?:the\s+)?(?P<day>\d{{1,2}}){_ORDINAL}\s+(?:of\s+)?(?P<month>{_MONTH_NAMES})"
+                rf"(?:,?\s+(?:(?P<year>\d{{4}})|(?P<next_year>next\s+year)))?\b"), _en_month),
+    (re.compile(rf"\b(?:(?P<prefix>in|on|this|next)\s+)?(?:(?P<part>{_EN_PART})[\s-]+)?"
+                rf"(?P<month>{_MONTH_NAMES})\.?(?:\s+(?P<day>\d{{1,2}}){_ORDINAL})?"
+                rf"(?:,?\s+(?:(?P<year>\d{{4}})|(?P<next_year>next\s+year)))?\b"), _en_month),
+    # "next year", "early next year", "summer", "next spring", "winter 2027"
+    (re.compile(rf"\b(?:(?P<part>{_EN_PART})[\s-]+)?next\s+year\b"),
+     lambda m, today: _year_span(today.year + 1, m.group("part"))),
+    (re.compile(r"\b(?:(?P<prefix>in|this|next)\s+)?(?:the\s+)?(?P<season>spring|summer|autumn|fall|winter)"
+                r"(?:\s+(?:of\s+)?(?:(?P<year>\d{4})|(?P<next_year>next\s+year)))?\b"),
+     lambda m, today: None if m.group("season") == "fall" and not (m.group("prefix") or m.group("year") or m.group("next_year"))
+     else _season_span(today, m.group("season"),
+                       int(m.group("year")) if m.group("year") else (today.year + 1 if m.group("next_year") else None),
+                       m.group("prefix") == "next")),
+    # Chinese: "10月1日到7日", "十月中旬", "2026年3月5号", "下个月初", "三天后"
+    (re.compile(rf"(?:(?P<year>\d{{4}})年|(?P<rel_year>今年|明年|后年|後年))?(?P<month>{ZH_NUM})月(?P<day>{ZH_NUM})[日号號]?"
+                rf"\s*(?:-|–|~|～|到|至)\s*(?P<day2>{ZH_NUM})[日号號]"), _zh_month),
+    (re.compile(rf"(?:(?P<year>\d{{4}})年|(?P<rel_year>今年|明年|后年|後年))?(?P<month>{ZH_NUM})月(?:份)?"
+                rf"(?:(?P<day>{ZH_NUM})[日号號]|(?P<part>{_ZH_PART}))?"), _zh_month),
+    # "明年春天", "今年冬季", "2027年夏天"
+    (re.compile(r"(?:(?P<year>\d{4})年|(?P<rel_year>今年|明年|后年|後年))?(?P<season>[春夏秋冬])(?:天|季)"),
+     lambda m, today: _season_span(today, m.group("season"), _zh_year(m.groupdict(), today))),
+    (re.compile(rf"下(?:个|個)?月(?P<part>{_ZH_PART})?"),
+     lambda m, today: _month_span((today + relativedelta(months=1)).year, (today + relativedelta(months=1)).month,
+                                  MONTH_PARTS[m.group("part")])
+     if m.group("part") else DateRange(today + relativedelta(months=1))),
+    (re.compile(r"(?:这|這|本)?(?:个|個)?月(?:底|末)"), _single(lambda m, today: _month_end(today))),
+    (re.compile(r"下(?:个|個)?(?:周末|週末)"), lambda m, today: _weekend(_upcoming_weekday(today, 5) + datetime.timedelta(days=7))),
+    (re.compile(r"(?:这|這)?(?:个|個)?(?:周末|週末)"), lambda m, today: _weekend(_upcoming_weekday(today, 5))),
+    (re.compile(r"下(?:个|個)?(?:周|週|星期|礼拜|禮拜)"), _single(lambda m, today: today + datetime.timedelta(days=7))),
+    (re.compile(r"明年(?P<part>年初|年中|年底|年末|初|底|末)?"), lambda m, today: _year_span(today.year + 1, m.group("part"))),
+    (re.compile(r"大(?:后|後)天"), _single(lambda m, today: today + datetime.timedelta(days=3))),
+    (re.compile(r"(?:后|後)天"), _single(lambda m, today: today + datetime.timedelta(days=2))),
+    (re.compile(r"明天"), _single(lambda m, today: today + datetime.timedelta(days=1))),
+    (re.compile(r"今天"), _single(lambda m, today: today)),
+    (re.compile(rf"(?P<count>{ZH_NUM})\s*(?P<unit>天|周|週|(?:个|個)?星期|(?:个|個)?礼拜|(?:个|個)?禮拜|(?:个|個)月)(?:以?(?:后|後))"),
+     _single(lambda m, today: _offset(today, parse_number(m.group("count")), m.group("unit")))),
+]
+
+
+@functools.lru_cache(maxsize=4096)
+def find_dates(folded_text: str, today: datetime.date) -> tuple:
+    """All date expressions in folded text as ((start, end) span, DateRange), in text order.
+
+    Two expressions joined by "to", "-", "until", "到", "至"... are merged into one range.
+    """
+    text = folded_text
+    found = []
+    for pattern, resolve in DATE_RULES:
+        for match in pattern.finditer(text):
+            try:
+                date_range = resolve(match, today)
+            except (ValueError, TypeError, KeyError, OverflowError):
+                date_range = None
+            if date_range is None:
+                continue
+            start, end = match.span()
+            found.append(((start, end), date_range))
+            text = text[:start] + " " * (end - start) + text[end:]
+    found.sort(key=lambda item: item[0])
+
+    merged = []
+    for span, date_range in found:
+        if merged and _RANGE_JOIN_RE.fullmatch(folded_text[merged[-1][0][1]:span[0]]):
+            (first, _), previous = merged[-1]
+            if date_range.start >= previous.start:
+                merged[-1] = ((first, span[1]), DateRange(previous.start, date_range.end or date_range.start))
+                continue
+        merged.append((span, date_range))
+    return tuple(merged)
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_when(expression: str, today: datetime.date):
+    annotated = _ANNOTATION_RE.search(expression)
+    if annotated:
+        start = datetime.date.fromisoformat(annotated.group(1))
+        end = datetime.date.fromisoformat(annotated.group(2)) if annotated.group(2) else None
+        return DateRange(start, end)
+    found = find_dates(fold(expression), today)
+    return found[0][1] if found else None
+
+
+def normalize_when(expression: str, today: datetime.date = None) -> Optional[DateRange]:
+    """Normalise a travel-date expression ("next month", "March 10-15", "十月中旬", or an already
+    annotated "next month (2026-11-16)") to a DateRange; None when no date is recognised.
+
+    Results are memoised per (expression, reference date).
+    """
+    if not expression:
+        return None
+    return _normalize_when(expression.strip(), today or datetime.date.today())
+
+
+def annotate_when(expression: str, today: datetime.date = None) -> str:
+    """'next month' -> 'next month (2026-11-16)': the original text plus the normalised date(s).
+    Values that already carry a parenthetical (ours or the model's) are left as they are."""
+    if not expression or '(' in expression:
+        return expression
+    date_range = normalize_when(expression, today)
+    return f"{expression} ({date_range.iso()})" if date_range else expression
+
+
+def strip_annotation(when: str) -> str:
+    """Original text of an annotated 'when' value, for display"""
+    return _ANNOTATION_RE.sub("", when).strip() if when else when
+
+
+##################################################################
+# Durations
+##################################################################
+
+DURATION_RULES = [
+    re.compile(r"\b(?:for\s+)?(?P<count>a|one)\s+(?P<unit>week)\s+and\s+a\s+half\b"),
+    re.compile(rf"\b(?:for\s+)?(?:about\s+|around\s+)?(?P<count>{EN_NUM})[\s-]*(?P<unit>days?|nights?|weeks?|months?)(?:\s+long)?\b"),
+    re.compile(r"\b(?:for\s+)?(?:a\s+)?(?P<unit>fortnight)\b"),
+    re.compile(rf"(?P<count>半|{ZH_NUM})\s*(?:个|個)\s*(?P<unit>月)"),
+    re.compile(rf"(?P<count>{ZH_NUM})\s*(?:个|個)?\s*(?P<unit>天|日|晚|夜|星期|礼拜|禮拜|周|週)(?:左右)?"),
+]
+_DAYS_PER_UNIT = {"fortnight": 14, "w": 7, "星": 7, "礼": 7, "禮": 7, "周": 7, "週": 7, "m": 30, "月": 30}
+
+
+def _duration_days(match) -> Optional[int]:
+    groups = match.groupdict()
+    unit = groups["unit"]
+    if groups.get("count") == "半":
+        return 15
+    count = parse_number(groups["count"]) if groups.get("count") else 1
+    if not count:
+        return None
+    days = count * _DAYS_PER_UNIT.get(unit, _DAYS_PER_UNIT.get(unit[0], 1))
+    if "and a half" in match.group():
+        days += 3
+    return days
+
+
+@functools.lru_cache(maxsize=4096)
+def find_durations(folded_text: str) -> tuple:
+    """All trip-length expressions in folded text as ((start, end) span, days, unit), in text order"""
+    text = folded_text
+    found = []
+    for pattern in DURATION_RULES:
+        for match in pattern.finditer(text):
+            days = _duration_days(match)
+            if days is None:
+                continue
+            start, end = match.span()
+            found.append(((start, end), days, match.group("unit")))
+            text = text[:start] + " " * (end - start) + text[end:]
+    return tuple(sorted(found))
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_duration(expression: str) -> Optional[int]:
+    """Trip length in days ("2 weeks" -> 14, "十天" -> 10, a bare "10" -> 10); None when not recognised"""
+    if not expression:
+        return None
+    found = find_durations(fold(expression))
+    if found:
+        return found[0][1]
+    number = re.search(r"\d+", expression)
+    return int(number.group()) if number else None
+
+
+def duration_text(days: int) -> str:
+    return f"{days} day" if days == 1 else f"{days} days"
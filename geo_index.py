@@ -0,0 +1,273 @@
+import csv
+import heapq
+import io
+import math
+import os
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Compact built-in city table: name|country code|country|latitude|longitude.
+# Extend it (or point GEO_CITIES_PATH at a complete CSV with the same columns) for better coverage;
+# on its own it only answers lookups where it can fill every requested result.
+CITY_TABLE = """\
+Reykjavík|is|Iceland|64.1466|-21.9426
+Akureyri|is|Iceland|65.6835|-18.1105
+Dalvík|is|Iceland|65.9702|-18.5286
+Ólafsfjörður|is|Iceland|66.0725|-18.6494
+Siglufjörður|is|Iceland|66.1522|-18.9097
+Húsavík|is|Iceland|66.0449|-17.3389
+Egilsstaðir|is|Iceland|65.2669|-14.3948
+Ísafjörður|is|Iceland|66.0750|-23.1350
+Vík|is|Iceland|63.4186|-19.0060
+Selfoss|is|Iceland|63.9331|-20.9971
+London|gb|United Kingdom|51.5074|-0.1278
+Edinburgh|gb|United Kingdom|55.9533|-3.1883
+Manchester|gb|United Kingdom|53.4808|-2.2426
+Dublin|ie|Ireland|53.3498|-6.2603
+Paris|fr|France|48.8566|2.3522
+Nice|fr|France|43.7102|7.2620
+Lyon|fr|France|45.7640|4.8357
+Amsterdam|nl|Netherlands|52.3676|4.9041
+Brussels|be|Belgium|50.8503|4.3517
+Berlin|de|Germany|52.5200|13.4050
+Munich|de|Germany|48.1351|11.5820
+Zurich|ch|Switzerland|47.3769|8.5417
+Vienna|at|Austria|48.2082|16.3738
+Prague|cz|Czech Republic|50.0755|14.4378
+Budapest|hu|Hungary|47.4979|19.0402
+Debrecen|hu|Hungary|47.5316|21.6273
+Szentendre|hu|Hungary|47.6694|19.0756
+Warsaw|pl|Poland|52.2297|21.0122
+Kraków|pl|Poland|50.0647|19.9450
+Rome|it|Italy|41.9028|12.4964
+Florence|it|Italy|43.7696|11.2558
+Venice|it|Italy|45.4408|12.3155
+Milan|it|Italy|45.4642|9.1900
+Naples|it|Italy|40.8518|14.2681
+Madrid|es|Spain|40.4168|-3.7038
+Barcelona|es|Spain|41.3874|2.1686
+Seville|es|Spain|37.3891|-5.9845
+Lisbon|pt|Portugal|38.7223|-9.1393
+Porto|pt|Portugal|41.1579|-8.6291
+Athens|gr|Greece|37.9838|23.7275
+Istanbul|tr|Turkey|41.0082|28.9784
+Copenhagen|dk|Denmark|55.6761|12.5683
+Stockholm|se|Sweden|59.3293|18.0686
+Oslo|no|Norway|59.9139|10.7522
+Helsinki|fi|Finland|60.1699|24.9384
+Cairo|eg|Egypt|30.0444|31.2357
+Marrakesh|ma|Morocco|31.6295|-7.9811
+Cape Town|za|South Africa|-33.9249|18.4241
+Nairobi|ke|Kenya|-1.2921|36.8219
+Dubai|ae|United Arab Emirates|25.2048|55.2708
+Abu Dhabi|ae|United Arab Emirates|24.4539|54.3773
+Doha|qa|Qatar|25.2854|51.5310
+New Delhi|in|India|28.6139|77.2090
+Agra|in|India|27.1767|78.0081
+Jaipur|in|India|26.9124|75.7873
+Varanasi|in|India|25.3176|82.9739
+Mumbai|in|India|19.0760|72.8777
+Kolkata|in|India|22.5726|88.3639
+Howrah|in|India|22.5958|88.2636
+Chennai|in|India|13.0827|80.2707
+Bengaluru|in|India|12.9716|77.5946
+Goa|in|India|15.2993|74.1240
+Kochi|in|India|9.9312|76.2673
+Dhaka|bd|Bangladesh|23.8103|90.4125
+Chittagong|bd|Bangladesh|22.3569|91.7832
+Cox's Bazar|bd|Bangladesh|21.4272|92.0058
+Sylhet|bd|Bangladesh|24.8949|91.8687
+Kathmandu|np|Nepal|27.7172|85.3240
+Colombo|lk|Sri Lanka|6.9271|79.8612
+Bangkok|th|Thailand|13.7563|100.5018
+Chiang Mai|th|Thailand|18.7883|98.9853
+Phuket|th|Thailand|7.8804|98.3923
+Singapore|sg|Singapore|1.3521|103.8198
+Kuala Lumpur|my|Malaysia|3.1390|101.6869
+Bali|id|Indonesia|-8.3405|115.0920
+Hanoi|vn|Vietnam|21.0278|105.8342
+Ho Chi Minh City|vn|Vietnam|10.8231|106.6297
+Hong Kong|hk|Hong Kong|22.3193|114.1694
+Macau|mo|Macau|22.1987|113.5439
+Taipei|tw|Taiwan|25.0330|121.5654
+Tainan|tw|Taiwan|22.9999|120.2270
+Kaohsiung|tw|Taiwan|22.6273|120.3014
+Beijing|cn|China|39.9042|116.4074
+Shanghai|cn|China|31.2304|121.4737
+Hangzhou|cn|China|30.2741|120.1551
+Guangzhou|cn|China|23.1291|113.2644
+Shenzhen|cn|China|22.5431|114.0579
+Chengdu|cn|China|30.5728|104.0668
+Xi'an|cn|China|34.3416|108.9398
+Seoul|kr|South Korea|37.5665|126.9780
+Busan|kr|South Korea|35.1796|129.0756
+Tokyo|jp|Japan|35.6762|139.6503
+Yokohama|jp|Japan|35.4437|139.6380
+Kyoto|jp|Japan|35.0116|135.7681
+Osaka|jp|Japan|34.6937|135.5023
+Nara|jp|Japan|34.6851|135.8048
+Sapporo|jp|Japan|43.0618|141.3545
+Sydney|au|Australia|-33.8688|151.2093
+Melbourne|au|Australia|-37.8136|144.9631
+Auckland|nz|New Zealand|-36.8485|174.7633
+New York|us|United States|40.7128|-74.0060
+Boston|us|United States|42.3601|-71.0589
+Washington|us|United States|38.9072|-77.0369
+Chicago|us|United States|41.8781|-87.6298
+Miami|us|United States|25.7617|-80.1918
+Los Angeles|us|United States|34.0522|-118.2437
+San Francisco|us|United States|37.7749|-122.4194
+Las Vegas|us|United States|36.1699|-115.1398
+Honolulu|us|United States|21.3069|-157.8583
+Toronto|ca|Canada|43.6532|-79.3832
+Vancouver|ca|Canada|49.2827|-123.1207
+Montreal|ca|Canada|45.5017|-73.5673
+Mexico City|mx|Mexico|19.4326|-99.1332
+Cancún|mx|Mexico|21.1619|-86.8515
+Havana|cu|Cuba|23.1136|-82.3666
+Lima|pe|Peru|-12.0464|-77.0428
+Cusco|pe|Peru|-13.5320|-71.9675
+Rio de Janeiro|br|Brazil|-22.9068|-43.1729
+São Paulo|br|Brazil|-23.5505|-46.6333
+Buenos Aires|ar|Argentina|-34.6037|-58.3816
+Santiago|cl|Chile|-33.4489|-70.6693
+"""
+
+
+def _to_unit_vector(latitude: float, longitude: float) -> tuple:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class CityIndex:
+    """k-d tree over cities on the unit sphere, with k-nearest and radius queries.
+
+    Points are stored as 3D unit vectors so straight-line (chord) distance is
+    monotonic in great-circle distance and no special casing is needed at the
+    poles or the antimeridian. `complete` marks a dataset trusted to cover every
+    city the Booking API would return (a configured CSV), not just a sample of them.
+    """
+
+    def __init__(self, cities: list, complete: bool = False):
+        self.cities = cities
+        self.complete = complete
+        self._points = [_to_unit_vector(city["latitude"], city["longitude"]) for city in cities]
+        # Flattened tree: node -> (point index, axis, left node, right node)
+        self._nodes = []
+        self._root = self._build(list(range(len(cities))), 0)
+
+    @classmethod
+    def from_table(cls, table: str = CITY_TABLE, complete: bool = False) -> "CityIndex":
+        cities = []
+        for row in csv.reader(io.StringIO(table), delimiter="|"):
+            if len(row) != 5:
+                continue
+            name, country, country_name, latitude, longitude = row
+            cities.append({
+                "name": name,
+                "country": country,
+                "country_name": country_name,
+                "latitude": float(latitude),
+                "longitude": float(longitude),
+            })
+        return cls(cities, complete)
+
+    @classmethod
+    def from_csv(cls, path: str, complete: bool = True) -> "CityIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_table(f.read(), complete)
+
+    def _build(self, indices: list, depth: int):
+        if not indices:
+            return None
+        axis = depth % 3
+        indices.sort(key=lambda i: self._points[i][axis])
+        middle = len(indices) // 2
+        node = len(self._nodes)
+        self._nodes.append(None)
+        left = self._build(indices[:middle], depth + 1)
+        right = self._build(indices[middle + 1:], depth + 1)
+        self._nodes[node] = (indices[middle], axis, left, right)
+        return node
+
+    def _search(self, target: tuple, k: int, max_chord: float) -> list:
+        best = []  # max-heap of (-distance, index)
+        bound = max_chord
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            index, axis, left, right = self._nodes[node]
+            point = self._points[index]
+            distance = math.dist(point, target)
+            if distance <= bound:
+                heapq.heappush(best, (-distance, index))
+                if len(best) > k:
+                    heapq.heappop(best)
+                if len(best) == k:
+                    bound = min(bound, -best[0][0])
+            delta = target[axis] - point[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            if abs(delta) <= bound:
+                stack.append(far)
+            stack.append(near)
+        return sorted((-negative, index) for negative, index in best)
+
+    def _format(self, results: list) -> list:
+        return [
+            dict(self.cities[index], distance=round(_chord_to_km(chord), 2))
+            for chord, index in results
+        ]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 10, max_distance_km: float = None) -> list:
+        """k nearest cities (optionally within max_distance_km), closest first"""
+        max_chord = _km_to_chord(max_distance_km) if max_distance_km is not None else float("inf")
+        return self._format(self._search(_to_unit_vector(latitude, longitude), k, max_chord))
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> list:
+        """All cities within radius_km, closest first"""
+        return self.nearest(latitude, longitude, k=len(self.cities), max_distance_km=radius_km)
+
+
+_default_index = None
+
+
+def get_city_index() -> CityIndex:
+    global _default_index
+    if _default_index is None:
+        path = os.getenv("GEO_CITIES_PATH")
+        _default_index = CityIndex.from_csv(path) if path else CityIndex.from_table()
+    return _default_index
+
+
+def nearby_cities(latitude, longitude, k: int = 10, max_distance_km: float = 150.0, index: CityIndex = None):
+    """Nearby cities in the shape of the Booking nearby-cities response, or None on a local miss.
+
+    The built-in table is only a sample, so its answer is used only when it fills all k
+    results; a complete index (GEO_CITIES_PATH) is trusted even with fewer. Local
+    results carry name, country, latitude, longitude and distance only: Booking's
+    dest_id, image_url and other Booking-specific fields are omitted.
+    """
+    index = index or get_city_index()
+    cities = index.nearest(float(latitude), float(longitude), k=k, max_distance_km=max_distance_km)
+    if not cities or (len(cities) < k and not index.complete):
+        return None
+    return [
+        {
+            "name": city["name"],
+            "country": city["country"],
+            "latitude": city["latitude"],
+            "longitude": city["longitude"],
+            "distance": city["distance"],
+        }
+        for city in cities
+    ]
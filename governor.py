@@ -0,0 +1,308 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import openai
+
+import metrics
+from prompt_budget import count_message_tokens, count_tokens
+
+# Highest first: a queued request of an earlier class is sent before any of a later one
+PRIORITY_CLASSES = ("interactive", "confirmation", "description", "itinerary")
+
+TASK_PRIORITIES = {
+    "reply": "interactive",
+    "extract": "interactive",
+    "extract_delta": "interactive",
+    "extract_retry": "interactive",
+    "change_ack": "confirmation",
+    "description": "description",
+    "summary": "description",
+    "translate": "itinerary",
+    "itinerary": "itinerary",
+    "itinerary_plan": "itinerary",
+    "itinerary_chunk": "itinerary",
+}
+
+DEFAULT_PRIORITY = "description"
+
+# A request queued this long is treated as one class higher, so itineraries are delayed but never starved
+PRIORITY_AGING = 30.0
+
+# Dispatch pause after an upstream 429 that carries no Retry-After header
+RATE_LIMIT_PAUSE = 2.0
+
+# Completion allowance charged when a request sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+QUEUE_DEPTH = metrics.register(metrics.Gauge("travel_llm_queue_depth", "LLM requests waiting for rate-limit capacity"))
+IN_FLIGHT = metrics.register(metrics.Gauge("travel_llm_in_flight", "LLM requests sent and not yet settled"))
+QUEUE_WAIT = metrics.register(metrics.Histogram("travel_llm_queue_wait_seconds", "Time LLM requests waited for rate-limit capacity"))
+THROTTLES = metrics.register(metrics.Counter("travel_llm_throttles_total", "Dispatch pauses after upstream rate-limit errors"))
+
+
+def priority_for(task: str) -> str:
+    return TASK_PRIORITIES.get(task, DEFAULT_PRIORITY)
+
+
+class TokenBucket:
+    """Refills per_minute units evenly over the minute, holding at most one minute's worth; 0 means unlimited"""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (a request larger than the bucket only needs it full)"""
+        if not self.per_minute:
+            return 0.0
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+        missing = min(amount, self.per_minute) - self.level
+        return max(0.0, missing * 60 / self.per_minute)
+
+    def take(self, amount: float):
+        # May go negative after an oversized request; later requests wait for the debt to refill
+        if self.per_minute:
+            self.level -= amount
+
+    def give(self, amount: float):
+        if self.per_minute:
+            self.level = min(self.per_minute, self.level + amount)
+
+
+class Ticket:
+    """One request's place in the governor: its priority class, session and charged tokens"""
+
+    __slots__ = ("priority", "session", "tokens", "enqueued", "granted", "settled", "wake")
+
+    def __init__(self, priority: str, session: str, tokens: int, wake):
+        self.priority = priority
+        self.session = session
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.granted = None
+        self.settled = False
+        self.wake = wake
+
+
+class Governor:
+    """Process-wide admission control for LLM requests.
+
+    Every request waits here until the requests/min and tokens/min buckets can both
+    cover it and fewer than max_in_flight requests are open (a request stays open
+    until it is settled). Waiting requests are served by priority class and
+    round-robin across sessions within a class, so a long itinerary never holds back
+    a chat turn and one busy session cannot crowd out the others. An upstream 429
+    pauses all dispatch instead of letting every queued request run into the same limit.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_in_flight: int = 0):
+        self._lock = threading.Lock()
+        self._queues = {priority: OrderedDict() for priority in PRIORITY_CLASSES}  # session -> deque of tickets
+        self._depth = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._timer = None
+        self._timer_at = None
+        self.configure(requests_per_minute, tokens_per_minute, max_in_flight)
+
+    def configure(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_in_flight: int = 0):
+        with self._lock:
+            self.requests = TokenBucket(requests_per_minute)
+            self.tokens = TokenBucket(tokens_per_minute)
+            self.max_in_flight = max_in_flight
+        self._dispatch()
+
+    def queued(self) -> int:
+        return self._depth
+
+    def estimate_tokens(self, params: dict) -> int:
+        """What a request is charged against tokens/min: its prompt plus the completion allowance"""
+        if not self.tokens.per_minute:
+            return 0
+        prompt = count_message_tokens(params.get("messages", []))
+        for key in ("tools", "functions"):
+            if params.get(key):
+                prompt += count_tokens(json.dumps(params[key]))
+        return prompt + (params.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+    ##################################################################
+    # Queueing and dispatch
+    ##################################################################
+
+    def _submit(self, task: str, tokens: int, wake) -> Ticket:
+        ticket = Ticket(priority_for(task), metrics.current_session_id() or "", tokens, wake)
+        with self._lock:
+            self._queues[ticket.priority].setdefault(ticket.session, deque()).append(ticket)
+            self._depth += 1
+        QUEUE_DEPTH.inc(priority=ticket.priority)
+        self._dispatch()
+        return ticket
+
+    def _remove(self, ticket: Ticket):
+        queue = self._queues[ticket.priority]
+        waiting = queue[ticket.session]
+        waiting.remove(ticket)
+        if waiting:
+            queue.move_to_end(ticket.session)
+        else:
+            del queue[ticket.session]
+        self._depth -= 1
+        QUEUE_DEPTH.dec(priority=ticket.priority)
+
+    def _next(self, now: float) -> Ticket:
+        """The oldest request of the next session in turn, from the best class after aging"""
+        best, best_rank = None, None
+        for rank, priority in enumerate(PRIORITY_CLASSES):
+            queue = self._queues[priority]
+            if not queue:
+                continue
+            ticket = next(iter(queue.values()))[0]
+            rank -= int((now - ticket.enqueued) / PRIORITY_AGING)
+            if best is None or rank < best_rank:
+                best, best_rank = ticket, rank
+        return best
+
+    def _dispatch(self):
+        """Grant queued requests while capacity allows, then wake them outside the lock"""
+        granted = []
+        with self._lock:
+            now = time.monotonic()
+            delay = 0.0
+            while self._depth:
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                    break
+                if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                    break  # settle() dispatches again when a slot frees up
+                ticket = self._next(now)
+                delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(ticket.tokens, now))
+                if delay > 0:
+                    break
+                self.requests.take(1)
+                self.tokens.take(ticket.tokens)
+                self._remove(ticket)
+                self._in_flight += 1
+                ticket.granted = now
+                granted.append(ticket)
+            if delay > 0:
+                self._schedule(now + delay)
+        if granted:
+            IN_FLIGHT.set(self._in_flight)
+        for ticket in granted:
+            QUEUE_WAIT.observe(ticket.granted - ticket.enqueued, priority=ticket.priority)
+            ticket.wake()
+
+    def _schedule(self, at: float):
+        # Called with the lock held; one timer, always for the earliest time capacity frees up
+        if self._timer_at is not None and self._timer_at <= at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_at = at
+        self._timer = threading.Timer(max(0.0, at - time.monotonic()), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = self._timer_at = None
+        self._dispatch()
+
+    def _abandon(self, ticket: Ticket) -> bool:
+        """Withdraw a request that stopped waiting; True if it had been granted in the meantime"""
+        with self._lock:
+            if ticket.granted is not None:
+                return True
+            self._remove(ticket)
+            return False
+
+    ##################################################################
+    # Caller API
+    ##################################################################
+
+    def acquire(self, task: str, tokens: int = 0, timeout: float = None) -> Ticket:
+        """Block until the request may be sent; raises openai.error.Timeout after timeout seconds"""
+        ready = threading.Event()
+        ticket = self._submit(task, tokens, ready.set)
+        if ticket.granted is None and not ready.wait(timeout) and not self._abandon(ticket):
+            raise openai.error.Timeout(f"Timed out waiting for LLM rate-limit capacity ({ticket.priority})")
+        return ticket
+
+    async def aacquire(self, task: str, tokens: int = 0, timeout: float = None) -> Ticket:
+        """Awaitable counterpart of acquire"""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: ready.done() or ready.set_result(None))
+
+        ticket = self._submit(task, tokens, wake)
+        if ticket.granted is not None:
+            return ticket
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout)
+        except asyncio.TimeoutError:
+            if not self._abandon(ticket):
+                raise openai.error.Timeout(f"Timed out waiting for LLM rate-limit capacity ({ticket.priority})")
+        except asyncio.CancelledError:
+            if self._abandon(ticket):
+                self.settle(ticket, 0, sent=False)
+            raise
+        return ticket
+
+    def settle(self, ticket: Ticket, used_tokens: int = None, sent: bool = True):
+        """Release a granted request's slot and correct its token charge to what it actually used
+        (None keeps the estimate). Settling twice is a no-op."""
+        with self._lock:
+            if ticket.settled:
+                return
+            ticket.settled = True
+            self._in_flight -= 1
+            IN_FLIGHT.set(self._in_flight)
+            if not sent:
+                self.requests.give(1)
+            if used_tokens is not None and self.tokens.per_minute:
+                refund = ticket.tokens - used_tokens
+                if refund >= 0:
+                    self.tokens.give(refund)
+                else:
+                    self.tokens.take(-refund)
+        self._dispatch()
+
+    def throttle(self, seconds: float = None):
+        """Hold all queued requests after an upstream rate-limit error"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + (seconds or RATE_LIMIT_PAUSE))
+            self._schedule(self._paused_until)
+        THROTTLES.inc()
+
+
+_governor = Governor(
+    float(os.getenv("LLM_RPM_LIMIT", "0")),
+    float(os.getenv("LLM_TPM_LIMIT", "0")),
+    int(os.getenv("LLM_MAX_IN_FLIGHT", "32")),
+)
+
+
+def configure(requests_per_minute: float = 0, tokens_per_minute: float = 0, max_in_flight: int = 0):
+    """Set the process-wide quotas and open-request limit (0 = unlimited; 429s still pause dispatch)"""
+    _governor.configure(requests_per_minute, tokens_per_minute, max_in_flight)
+
+
+def get_governor() -> Governor:
+    return _governor
+
+
+def retry_after(error: Exception) -> float:
+    """Seconds from a rate-limit error's Retry-After header, if it has one"""
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
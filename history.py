@@ -0,0 +1,56 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from prompt_budget import count_message_tokens
+from prompts import HISTORY_SUMMARY
+
+# Shared by every sync chatbot so compaction never runs on the caller's thread
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="history-compaction")
+
+
+def submit(fn, *args):
+    return _executor.submit(fn, *args)
+
+
+class HistoryCompactor:
+    """Policy for rolling conversation-history compaction.
+
+    When the verbatim history grows past token_threshold, everything except the
+    last keep_last messages is folded into a running summary (the structured
+    travel_info is kept separately, so the summary only has to carry the rest).
+    """
+
+    def __init__(self, keep_last: int = 8, token_threshold: int = 1500, max_summary_tokens: int = 300):
+        self.keep_last = keep_last
+        self.token_threshold = token_threshold
+        self.max_summary_tokens = max_summary_tokens
+
+    def needs_compaction(self, history: list) -> bool:
+        return len(history) > self.keep_last and count_message_tokens(history) > self.token_threshold
+
+    def split(self, history: list) -> tuple:
+        """(older messages to fold into the summary, recent messages kept verbatim)"""
+        cut = len(history) - self.keep_last
+        # Never start the verbatim window on an assistant reply to a message we dropped
+        while cut < len(history) and history[cut]["role"] == "assistant":
+            cut += 1
+        return history[:cut], history[cut:]
+
+    def build_summary_request(self, previous_summary: str, older: list, travel_info: dict) -> dict:
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in older)
+        known = json.dumps({key: value for key, value in travel_info.items() if value}, ensure_ascii=False)
+        prompt = HISTORY_SUMMARY.render(known=known, previous_summary=previous_summary or "None", transcript=transcript)
+        return {
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_summary_tokens,
+            "temperature": 0.3,
+        }
+
+
+def summary_message(summary: str, travel_info: dict) -> dict:
+    """System message that stands in for the compacted part of the history"""
+    known = json.dumps({key: value for key, value in travel_info.items() if value}, ensure_ascii=False)
+    return {
+        "role": "system",
+        "content": f"Summary of the earlier conversation: {summary}\nTravel information collected so far: {known}",
+    }
@@ -0,0 +1,177 @@
+import functools
+import re
+
+_PRICE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_LEADING_COUNT_RE = re.compile(r"^\d+\s+")
+
+ELDERLY_TAGS = ("facilities for disabled guests",)
+FAMILY_TAGS = ("family rooms",)
+
+# Description keywords -> hotel tags that make a hotel a better fit. Keywords match whole
+# words (plurals included); a trailing "*" marks a deliberate stem ("relax*" = relaxing, relaxation)
+AMENITY_KEYWORDS = {
+    "relax*": ("spa and wellness centre", "swimming pool"),
+    "spa": ("spa and wellness centre",),
+    "beach": ("swimming pool", "beachfront"),
+    "pool": ("swimming pool",),
+    "fitness": ("fitness centre",),
+    "gym": ("fitness centre",),
+    "airport": ("airport shuttle",),
+    "car": ("free parking", "private parking"),
+    "drive": ("free parking", "private parking"),
+    "driving": ("free parking", "private parking"),
+    "pet": ("pets allowed",),
+    "dog": ("pets allowed",),
+    "wifi": ("free wifi",),
+    "work": ("free wifi",),
+    "food": ("restaurant",),
+    "cuisine": ("restaurant",),
+    "culinary": ("restaurant",),
+}
+
+# Budget keywords -> price band as fractions of the sorted price range of the candidates
+# (checked in order, so "budget is mid-range" resolves to mid-range; keywords match as above)
+BUDGET_BANDS = {
+    "mid-range": (0.2, 0.8),
+    "moderate": (0.2, 0.8),
+    "luxury": (0.6, 1.0),
+    "high-end": (0.6, 1.0),
+    "affordable": (0.0, 0.5),
+    "cheap*": (0.0, 0.4),
+    "budget": (0.0, 0.4),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def keyword_pattern(keyword: str) -> re.Pattern:
+    if keyword.endswith("*"):
+        return re.compile(rf"\b{re.escape(keyword[:-1])}")
+    return re.compile(rf"\b{re.escape(keyword)}(?:e?s)?\b")
+
+
+def normalize_tag(tag: str) -> str:
+    return _LEADING_COUNT_RE.sub("", tag.strip().lower())
+
+
+def parse_price(price) -> float:
+    """'US$1,993' -> 1993.0; None when no number is present"""
+    if isinstance(price, (int, float)):
+        return float(price)
+    match = _PRICE_RE.search(price or "")
+    return float(match.group().replace(",", "")) if match else None
+
+
+class HotelCandidates:
+    """Parsed, indexed view of a hotel list for fast constraint filtering and ranking.
+
+    Tags are parsed once into an inverted index of bitsets (tag -> int with bit i
+    set when hotel i has the tag), so a set of constraints is evaluated for all
+    hotels at once with a few integer ANDs instead of per-hotel substring checks.
+    """
+
+    def __init__(self, hotels: list):
+        self.hotels = hotels
+        self.prices = [parse_price(hotel.get("offer_price")) for hotel in hotels]
+        self.tags = []  # per-hotel set of normalized tags
+        self.tag_index = {}  # normalized tag -> bitset of hotels
+        for i, hotel in enumerate(hotels):
+            tags = {normalize_tag(tag) for tag in (hotel.get("tags") or "").split(",") if tag.strip()}
+            self.tags.append(tags)
+            for tag in tags:
+                self.tag_index[tag] = self.tag_index.get(tag, 0) | (1 << i)
+        self.all_mask = (1 << len(hotels)) - 1
+
+    def with_tags(self, tags) -> int:
+        """Bitset of hotels having every tag"""
+        mask = self.all_mask
+        for tag in tags:
+            mask &= self.tag_index.get(normalize_tag(tag), 0)
+        return mask
+
+    def priced_between(self, low: float = None, high: float = None) -> int:
+        mask = 0
+        for i, price in enumerate(self.prices):
+            if price is None or ((low is None or price >= low) and (high is None or price <= high)):
+                mask |= 1 << i
+        return mask
+
+    def _budget_range(self, band: tuple, mask: int) -> tuple:
+        prices = sorted(price for i, price in enumerate(self.prices) if price is not None and mask >> i & 1)
+        if not prices:
+            return None, None
+        low_index = int(band[0] * (len(prices) - 1))
+        high_index = int(round(band[1] * (len(prices) - 1)))
+        return prices[low_index], prices[high_index]
+
+    def select(self, required_tags=(), preferred_tags=(), max_price: float = None, budget_band: tuple = None, k: int = 5) -> list:
+        """Indices of the top-k hotels meeting required_tags and price limits.
+
+        Ranked by number of preferred tags matched, then closeness to the middle of
+        the budget band (or lowest price when there is no band).
+        """
+        mask = self.with_tags(required_tags)
+        if max_price is not None:
+            mask &= self.priced_between(high=max_price)
+        target_price = None
+        if budget_band is not None and mask:
+            low, high = self._budget_range(budget_band, mask)
+            if low is not None:
+                in_band = mask & self.priced_between(low, high)
+                mask = in_band or mask
+                target_price = (low + high) / 2
+
+        preferred = [self.tag_index.get(normalize_tag(tag), 0) for tag in preferred_tags]
+        candidates = [i for i in range(len(self.hotels)) if mask >> i & 1]
+
+        def rank(i):
+            matched = sum(1 for column in preferred if column >> i & 1)
+            price = self.prices[i]
+            if price is None:
+                price_key = float("inf")
+            elif target_price is not None:
+                price_key = abs(price - target_price)
+            else:
+                price_key = price
+            return (-matched, price_key)
+
+        candidates.sort(key=rank)
+        return candidates[:k]
+
+
+def traveler_constraints(description: str, has_elderly: bool = False, is_family: bool = False) -> dict:
+    """Derive select() arguments from the traveler profile and trip description"""
+    text = (description or "").lower()
+    required = []
+    if has_elderly:
+        required.extend(ELDERLY_TAGS)
+    if is_family:
+        required.extend(FAMILY_TAGS)
+
+    preferred = []
+    for keyword, tags in AMENITY_KEYWORDS.items():
+        if keyword_pattern(keyword).search(text):
+            preferred.extend(tag for tag in tags if tag not in preferred)
+
+    budget_band = None
+    for keyword, band in BUDGET_BANDS.items():
+        if keyword_pattern(keyword).search(text):
+            budget_band = band
+            break
+
+    return {"required_tags": required, "preferred_tags": preferred, "budget_band": budget_band}
+
+
+def rank_hotels(hotels: list, description: str, has_elderly: bool = False, is_family: bool = False, k: int = 5) -> list:
+    """Top-k suitable hotels in the compact form embedded in the itinerary prompt"""
+    engine = HotelCandidates(hotels)
+    selected = engine.select(k=k, **traveler_constraints(description, has_elderly, is_family))
+    return [
+        {
+            "name": hotels[i]["hotel_name"],
+            "url": hotels[i]["hotel_url"],
+            "image": hotels[i]["hotel_image"],
+            "price": hotels[i]["offer_price"],
+            "tags": hotels[i]["tags"],
+        }
+        for i in selected
+    ]
@@ -0,0 +1,263 @@
+import json
+import re
+
+
+# Sections of the itinerary JSON that are emitted as soon as they are complete.
+# Paths use "." between object keys and "[]" for array elements; "" is the whole document.
+ITINERARY_SECTIONS = (
+    "trip_overview",
+    "locations[].itinerary[]",
+    "locations[]",
+    "additional_info[]",
+    "",
+)
+
+
+class JSONSectionStream:
+    """Incremental scanner that yields complete JSON sub-objects from a token stream.
+
+    Feed it text chunks as they arrive from a streaming completion. Whenever an
+    object or array at one of the watched paths closes, it is parsed and returned
+    from feed(). Text before the first '{' (e.g. a ```json fence) and after the
+    root object closes is ignored.
+    """
+
+    def __init__(self, sections=ITINERARY_SECTIONS):
+        self.sections = set(sections)
+        self.text = ""
+        self._pos = 0
+        self._stack = []  # frames: [kind, path, start, key, expecting_key]
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._started = False
+        self.done = False
+
+    def feed(self, chunk: str) -> list:
+        """Consume a chunk and return a list of (path, value) for every section completed by it"""
+        if self.done or not chunk:
+            return []
+        self.text += chunk
+        completed = []
+        text = self.text
+
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+            index = self._pos
+            self._pos += 1
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._open("object", index)
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(index)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = index
+            elif ch == "{":
+                self._open("object", index)
+            elif ch == "[":
+                self._open("array", index)
+            elif ch in "}]":
+                section = self._close(index)
+                if section is not None:
+                    completed.append(section)
+            elif ch == ":":
+                if self._stack and self._stack[-1][0] == "object":
+                    self._stack[-1][4] = False
+            elif ch == ",":
+                if self._stack and self._stack[-1][0] == "object":
+                    self._stack[-1][4] = True
+
+        return completed
+
+    def _child_path(self) -> str:
+        if not self._stack:
+            return ""
+        kind, path, _, key, _ = self._stack[-1]
+        if kind == "array":
+            return path + "[]"
+        return f"{path}.{key}" if path else (key or "")
+
+    def _open(self, kind: str, index: int):
+        self._stack.append([kind, self._child_path(), index, None, kind == "object"])
+
+    def _close_string(self, index: int):
+        if self._stack and self._stack[-1][0] == "object" and self._stack[-1][4]:
+            try:
+                self._stack[-1][3] = json.loads(self.text[self._string_start:index + 1])
+            except ValueError:
+                self._stack[-1][3] = self.text[self._string_start + 1:index]
+
+    def _close(self, index: int):
+        if not self._stack:
+            return None
+        _, path, start, _, _ = self._stack.pop()
+        if not self._stack:
+            self.done = True
+        if path not in self.sections:
+            return None
+        try:
+            return path, loads_lenient(self.text[start:index + 1])
+        except ValueError:
+            # Malformed beyond repair; skip the section rather than abort the stream
+            return None
+
+
+##################################################################
+# Tolerant parsing of model output
+##################################################################
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*(.*?)(?:```|$)", re.S)
+_WORD_RE = re.compile(r"[A-Za-z_][\w-]*")
+_LITERALS = {"null": "null", "none": "null", "true": "true", "false": "false", "nan": "null", "undefined": "null"}
+_SCALAR_RE = re.compile(
+    r"\s*(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|null|None|true|false|True|False|-?\d+(?:\.\d+)?)", re.S
+)
+
+
+def _read_string(text: str, i: int) -> tuple:
+    """Read a single- or double-quoted string starting at text[i]; returns (JSON string, next index).
+    An unterminated string runs to the end of the text (next index is then len(text) + 1)."""
+    quote = text[i]
+    i += 1
+    chars = []
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            chars.append("'" if text[i + 1] == "'" else ch + text[i + 1])
+            i += 2
+            continue
+        if ch == quote:
+            return '"' + "".join(chars) + '"', i + 1
+        chars.append({'"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}.get(ch, ch))
+        i += 1
+    return '"' + "".join(chars) + '"', i + 1
+
+
+def _strip_trailing_comma(out: list):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str) -> str:
+    """Best-effort fix-up of JSON written by a model.
+
+    Handles code fences and prose around the object, single-quoted strings,
+    unquoted keys and Python literals, comments, trailing commas, and
+    truncation (unterminated strings, missing values and closing brackets).
+    """
+    fence = _FENCE_RE.search(text)
+    if fence:
+        text = fence.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip()
+
+    out = []
+    closers = []
+    checkpoints = []  # (len(out), closers) after each structural comma, for cutting back a truncated tail
+    i = min(starts)
+    while i < len(text):
+        ch = text[i]
+        if ch in "\"'":
+            string, i = _read_string(text, i)
+            out.append(string)
+            continue
+        if ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            if closers:
+                out.append(closers.pop())
+            if not closers:
+                break
+        elif ch == ",":
+            _strip_trailing_comma(out)
+            checkpoints.append((len(out), list(closers)))
+            out.append(ch)
+        elif ch == "/" and text.startswith(("//", "/*"), i):
+            end = text.find("\n" if text[i + 1] == "/" else "*/", i + 2)
+            i = len(text) if end == -1 else end + (1 if text[i + 1] == "/" else 2)
+            continue
+        elif ch == "#":
+            end = text.find("\n", i)
+            i = len(text) if end == -1 else end + 1
+            continue
+        elif ch.isalpha() or ch == "_":
+            word = _WORD_RE.match(text, i).group()
+            following = text[i + len(word):].lstrip()[:1]
+            if following == ":":
+                out.append(json.dumps(word))
+            else:
+                out.append(_LITERALS.get(word.lower(), json.dumps(word)))
+            i += len(word)
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if not closers:
+        return "".join(out)
+
+    # Truncated: drop a half-written last member (cut-off string or missing value)
+    # by cutting back to the last complete one, otherwise just close what is open
+    repaired = "".join(out).rstrip()
+    cut_backs = ["".join(out[:length]) + "".join(reversed(open_closers)) for length, open_closers in reversed(checkpoints)]
+    closed = (repaired + " null" if repaired.endswith(":") else repaired.rstrip(",")) + "".join(reversed(closers))
+    if i > len(text) or repaired.endswith(":"):
+        candidates = cut_backs + [closed]
+    else:
+        candidates = [closed] + cut_backs
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return candidate
+        except ValueError:
+            continue
+    return candidates[0]
+
+
+def loads_lenient(text: str):
+    """json.loads, falling back to repair_json; raises ValueError when the text cannot be repaired"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return json.loads(repair_json(text))
+
+
+def salvage_fields(text: str, fields) -> tuple:
+    """Recover scalar "field": value pairs from text that is not parseable as a whole.
+
+    Returns (recovered values, fields that appear but whose value could not be read).
+    When no field is found at all, every field is reported as failed.
+    """
+    recovered, failed = {}, []
+    for field in fields:
+        key = re.search(r"[\"']?" + re.escape(field) + r"[\"']?\s*:", text)
+        if key is None:
+            continue
+        value = _SCALAR_RE.match(text, key.end())
+        try:
+            recovered[field] = loads_lenient(value.group(1)) if value else None
+        except ValueError:
+            value = None
+        if value is None:
+            failed.append(field)
+    if not recovered and not failed:
+        failed = list(fields)
+    return recovered, failed
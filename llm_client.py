@@ -0,0 +1,289 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+import openai
+from openai.util import convert_to_openai_object
+
+import governor
+import metrics
+import model_router
+from cache import LRUCache, SQLiteCache, TieredCache, make_key
+
+
+# Parameters that do not change the completion and must not split cache entries
+_NON_SEMANTIC_PARAMS = {"stream", "request_timeout", "timeout", "api_key", "api_base", "organization"}
+
+# Only near-deterministic completions (extraction, summaries) are reused; serving a cached
+# 0.7-temperature reply would hand a user who repeats a message a canned answer
+CACHEABLE_MAX_TEMPERATURE = 0.3
+
+# Hedged sync calls run here so the caller can wait on whichever request finishes first
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "16")), thread_name_prefix="llm-hedge")
+_hedging_enabled = os.getenv("LLM_HEDGING", "1") != "0"
+
+_cache = TieredCache(
+    LRUCache(max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")), ttl=float(os.getenv("LLM_CACHE_TTL", "86400"))),
+    SQLiteCache(os.environ["LLM_CACHE_PATH"]) if os.getenv("LLM_CACHE_PATH") else None,
+)
+
+
+def configure_cache(cache=None):
+    """Replace the response cache (any object with get/set, e.g. TieredCache); None disables caching"""
+    global _cache
+    _cache = cache
+
+
+def get_cache():
+    return _cache
+
+
+def cache_key(params: dict) -> str:
+    """Normalised hash of model, messages and generation parameters"""
+    messages = [
+        {key: (value.strip() if isinstance(value, str) else value) for key, value in message.items()}
+        for message in params.get("messages", [])
+    ]
+    options = {key: value for key, value in params.items() if key not in _NON_SEMANTIC_PARAMS and key != "messages"}
+    return make_key(params.get("model"), messages, options)
+
+
+def _cacheable(params: dict) -> bool:
+    # The API's default temperature is 1
+    return not params.get("stream") and params.get("temperature", 1) <= CACHEABLE_MAX_TEMPERATURE
+
+
+def _lookup(params: dict, use_cache: bool):
+    if not use_cache or _cache is None or not _cacheable(params):
+        return None, None
+    key = cache_key(params)
+    cached = _cache.get(key)
+    metrics.record_cache("llm", cached is not None)
+    if cached is not None:
+        return key, convert_to_openai_object(cached)
+    return key, None
+
+
+def _store(key: str, response):
+    if key is not None and _cache is not None:
+        _cache.set(key, response.to_dict_recursive() if hasattr(response, "to_dict_recursive") else response)
+
+
+def _record(task: str, params: dict, response, info: dict):
+    if not params.get("stream"):
+        metrics.record_usage(task, params.get("model"), response.get("usage"), info)
+
+
+def _remaining(deadline_at: float) -> float:
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise openai.error.Timeout("LLM call deadline exceeded")
+    return remaining
+
+
+class _GovernedStream:
+    """A streamed completion that keeps its governor slot until it is exhausted, closed or dropped.
+    Streams report no usage, so the estimated token charge stands."""
+
+    def __init__(self, gate, ticket, stream):
+        self._gate = gate
+        self._ticket = ticket
+        self._stream = stream
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self._gate.settle(self._ticket)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            self._gate.settle(self._ticket)
+
+    def __del__(self):
+        self._gate.settle(self._ticket)
+
+
+def _settle(gate, ticket, params: dict, response):
+    """Release a successful attempt's slot: at once with its reported usage, or when its stream ends"""
+    if params.get("stream"):
+        return _GovernedStream(gate, ticket, response)
+    gate.settle(ticket, (response.get("usage") or {}).get("total_tokens"))
+    return response
+
+
+def _settle_failed(gate, ticket, error: Exception):
+    """Refund the token charge of an attempt that produced no completion; connection errors were never
+    sent, so their request is refunded too. A 429 also pauses the governor."""
+    if isinstance(error, openai.error.RateLimitError):
+        # Pause first: settling frees a slot and dispatches, which must not send the next request into the same limit
+        gate.throttle(governor.retry_after(error))
+    gate.settle(ticket, 0, sent=not isinstance(error, openai.error.APIConnectionError))
+
+
+def _create(task: str, candidates: list, deadline_at: float):
+    """Try each routed model in turn, each attempt bounded by its budget and the call deadline.
+    Every attempt first waits for its turn in the process-wide governor."""
+    gate = governor.get_governor()
+    tokens = gate.estimate_tokens(candidates[0])
+    for attempt, attempt_params in enumerate(candidates):
+        ticket = gate.acquire(task, tokens, timeout=_remaining(deadline_at))
+        started = time.monotonic()
+        try:
+            attempt_params = dict(attempt_params, request_timeout=min(attempt_params["request_timeout"], _remaining(deadline_at)))
+            response = openai.ChatCompletion.create(**attempt_params)
+        except Exception as e:
+            _settle_failed(gate, ticket, e)
+            if attempt == len(candidates) - 1 or not model_router.should_fall_back(e):
+                raise
+            metrics.record_retry("llm", f"fallback:{type(e).__name__}")
+            continue
+        except BaseException:
+            gate.settle(ticket)  # cancelled mid-request: the request may have been served, keep the charge
+            raise
+        response = _settle(gate, ticket, attempt_params, response)
+        if not attempt_params.get("stream"):
+            model_router.record_latency(task, time.monotonic() - started)
+        return attempt_params, response
+
+
+async def _acreate(task: str, candidates: list, deadline_at: float):
+    gate = governor.get_governor()
+    tokens = gate.estimate_tokens(candidates[0])
+    for attempt, attempt_params in enumerate(candidates):
+        ticket = await gate.aacquire(task, tokens, timeout=_remaining(deadline_at))
+        started = time.monotonic()
+        try:
+            attempt_params = dict(attempt_params, request_timeout=min(attempt_params["request_timeout"], _remaining(deadline_at)))
+            # wait_for as well: request_timeout alone does not bound every stall of the async client
+            response = await asyncio.wait_for(openai.ChatCompletion.acreate(**attempt_params), attempt_params["request_timeout"])
+        except asyncio.TimeoutError:
+            error = openai.error.Timeout(f"{attempt_params['model']} exceeded {attempt_params['request_timeout']:.1f}s")
+            _settle_failed(gate, ticket, error)
+            if attempt == len(candidates) - 1:
+                raise error
+            metrics.record_retry("llm", "fallback:Timeout")
+            continue
+        except Exception as e:
+            _settle_failed(gate, ticket, e)
+            if attempt == len(candidates) - 1 or not model_router.should_fall_back(e):
+                raise
+            metrics.record_retry("llm", f"fallback:{type(e).__name__}")
+            continue
+        except BaseException:
+            gate.settle(ticket)  # cancelled mid-request: the request may have been served, keep the charge
+            raise
+        response = _settle(gate, ticket, attempt_params, response)
+        if not attempt_params.get("stream"):
+            model_router.record_latency(task, time.monotonic() - started)
+        return attempt_params, response
+
+
+def _hedged(task: str, call):
+    """Run call(); if it is still pending after the task's hedge delay, race a duplicate against it.
+    The first success wins (a losing thread cannot be interrupted, its result is discarded)."""
+    context = contextvars.copy_context()
+    primary = _hedge_executor.submit(context.copy().run, call)
+    try:
+        return primary.result(timeout=model_router.hedge_delay(task))
+    except FuturesTimeout:
+        pass
+    if governor.get_governor().queued():
+        # Requests are already waiting for quota; a duplicate would only add to the backlog
+        return primary.result()
+    metrics.record_retry("llm", "hedge")
+    pending = {primary, _hedge_executor.submit(context.copy().run, call)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def _ahedged(task: str, call):
+    """Async counterpart of _hedged; the losing request is cancelled"""
+    primary = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({primary}, timeout=model_router.hedge_delay(task))
+    if done or governor.get_governor().queued():
+        return await primary
+    metrics.record_retry("llm", "hedge")
+    pending = {primary, asyncio.ensure_future(call())}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _should_hedge(route, params: dict) -> bool:
+    return _hedging_enabled and route.hedge and not params.get("stream")
+
+
+def chat_completion(cache: bool = True, task: str = "chat", **params):
+    """openai.ChatCompletion.create with the shared response cache in front of it
+    (for calls at temperature <= CACHEABLE_MAX_TEMPERATURE).
+
+    `task` names the call site for metrics (e.g. "extract", "reply", "itinerary") and
+    selects its model route (see model_router): the tier's models are tried in order,
+    each within the route's latency budget and all within its deadline, falling back
+    on timeouts and overload. Idempotent tasks are hedged after their observed p95.
+    Every request is admitted by the process-wide governor (see governor.py).
+    """
+    route = model_router.route_for(task)
+    candidates = model_router.attempts(task, params)
+    with metrics.span(f"llm.{task}", model=candidates[0]["model"]) as info:
+        key, cached = _lookup(candidates[0], cache)
+        if cached is not None:
+            info["cached"] = True
+            return cached
+        deadline_at = time.monotonic() + route.deadline
+        if _should_hedge(route, params):
+            attempt_params, response = _hedged(task, lambda: _create(task, candidates, deadline_at))
+        else:
+            attempt_params, response = _create(task, candidates, deadline_at)
+        info["model"] = attempt_params["model"]
+        _record(task, attempt_params, response, info)
+        # The key is the primary model's; a fallback model's answer must not be served as the primary's
+        if attempt_params["model"] == candidates[0]["model"]:
+            _store(key, response)
+        return response
+
+
+async def achat_completion(cache: bool = True, task: str = "chat", **params):
+    """openai.ChatCompletion.acreate with the shared response cache, model routing, deadlines and hedging"""
+    route = model_router.route_for(task)
+    candidates = model_router.attempts(task, params)
+    with metrics.span(f"llm.{task}", model=candidates[0]["model"]) as info:
+        key, cached = _lookup(candidates[0], cache)
+        if cached is not None:
+            info["cached"] = True
+            return cached
+        deadline_at = time.monotonic() + route.deadline
+        if _should_hedge(route, params):
+            attempt_params, response = await _ahedged(task, lambda: _acreate(task, candidates, deadline_at))
+        else:
+            attempt_params, response = await _acreate(task, candidates, deadline_at)
+        info["model"] = attempt_params["model"]
+        _record(task, attempt_params, response, info)
+        # The key is the primary model's; a fallback model's answer must not be served as the primary's
+        if attempt_params["model"] == candidates[0]["model"]:
+            _store(key, response)
+        return response
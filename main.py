@@ -1,10 +1,22 @@
 import openai
+import asyncio
 import json
 import os
+import re
 from typing import Dict, Any
 import datetime
-from dateutil import parser
-from dateutil.relativedelta import relativedelta
+import history
+from date_normalizer import annotate_when, duration_text, normalize_duration, normalize_when
+import metrics
+import model_router
+from metrics import instrumented
+from history import HistoryCompactor, summary_message
+from json_stream import loads_lenient, salvage_fields
+from llm_client import chat_completion, achat_completion
+from prompts import (
+    CHANGE_SYSTEM, CHAT_SYSTEM_PROMPTS, DELTA_EXTRACTION, DESCRIPTION, EXTRACTION, FIELD_RETRY
+)
+from quick_extract import MIN_CONFIDENCE, expected_fields, quick_extract
 
 
 ##################################################################
@@ -54,11 +66,73 @@ LANGUAGE_TEXTS = {
     }
 }
 
+DEFAULT_TRIP_DESCRIPTION = "A personalized travel experience based on the traveler's preferences and requirements discussed in the conversation."
+
+CONFIRMATION_PHRASES = {
+    # Basic affirmations
+    "yes", "yeah", "yep", "yup", "sure", "sure thing", "correct", "confirmed",
+    "okay", "ok", "k", "roger", "roger that", "aye", "indeed", "absolutely",
+    "definitely", "totally", "exactly", "right", "true", "affirmative",
+
+    # Casual affirmations
+    "looks good", "sounds good", "works for me", "fine by me", "all good",
+    "that's fine", "no problem", "cool", "alright", "that's right", "you got it",
+    "makes sense", "that's correct", "on point", "go ahead", "it’s okay", "that’ll do",
+    "i’m okay with that", "okie", "okie dokie", "okey-dokey",
+
+    # Positive feedback
+    "perfect", "great", "awesome", "nailed it", "well done", "love it",
+    "exact match", "beautiful", "fantastic", "excellent", "spot on", "brilliant",
+
+    # Emojis and shorthand
+    "👍", "👌", "✅", "🆗", "💯", "👍🏼", "👍🏽", "👍🏾", "👍🏿",
+
+    # Informal variations
+    "yea", "ya", "yah", "yass", "yasss", "yessir", "yesss", "yas", "aight",
+
+    # Other common confirmations
+    "that's it", "done", "agreed", "i agree", "exactly right", "precisely", 
+    "you’re right", "just what i wanted", "as expected", "matches", "confirmed and agreed"
+}
+
+# Fields filled by the extraction calls ('descriptions of the trip' is generated separately)
+EXTRACTION_FIELDS = ('from', 'to', 'traveling_with', 'when', 'duration', 'purpose', 'transportation')
+
+# Models that accept `tools`; extraction asks them for schema-shaped arguments instead of free-form JSON
+STRUCTURED_OUTPUT_MODELS = {
+    "gpt-4-turbo", "gpt-4-1106-preview", "gpt-4-0125-preview", "gpt-4o", "gpt-4o-mini",
+    "gpt-3.5-turbo", "gpt-3.5-turbo-1106", "gpt-3.5-turbo-0125",
+}
+
+
+def extraction_tool(fields) -> dict:
+    """Function schema for recording the given travel fields (each a string or null)"""
+    return {
+        "type": "function",
+        "function": {
+            "name": "record_travel_info",
+            "description": "Record the travel information the user provided. Use null for anything not stated.",
+            "parameters": {
+                "type": "object",
+                "properties": {field: {"type": ["string", "null"]} for field in fields},
+            },
+        },
+    }
+
+
+def completion_json_text(response) -> str:
+    """The JSON text of an extraction response: tool-call arguments if present, else the message content"""
+    message = response.choices[0].message
+    tool_calls = message.get("tool_calls")
+    if tool_calls:
+        return tool_calls[0].function.arguments
+    return (message.get("content") or "").strip()
+
 #########################################################################
 
 
 class TravelChatbot:
-    def __init__(self, api_key: str = None, language: str = "english"):
+    def __init__(self, api_key: str = None, language: str = "english", incremental_extraction: bool = True):
         # Set up OpenAI API key
         if api_key:
             openai.api_key = api_key
@@ -85,77 +159,28 @@ class TravelChatbot:
         self.collected_info = set()
         self.conversation_history = []
         self.confirmed = False
+        self.session_id = None  # set by hosting code; used to tag metrics and traces
+        
+        # Incremental extraction sends only the current state and the newest turn
+        # instead of the whole transcript; the full-transcript path is the fallback.
+        self.incremental_extraction = incremental_extraction
+        self.delta_include_assistant_turn = True
+        # Short replies the local rules fully understand ("10 days", "by train") skip the LLM
+        self.quick_extraction = True
+        
+        # Older turns are folded into a running summary in the background (see history.py),
+        # keeping per-turn prompt size and per-session memory bounded.
+        self.history_compactor = HistoryCompactor()
+        self.history_summary = None
+        self._pending_compaction = None  # (future/task, messages folded, last folded message)
         
         # Language texts selection based on the selected language
         self.language_texts = LANGUAGE_TEXTS["Chinese"] if language == "chinese" else LANGUAGE_TEXTS["English"]
 
-        if self.language == "chinese":
-            language_instruction = "Please respond ONLY in Traditional Chinese throughout this entire conversation."
-        else:
-            language_instruction = "Please respond ONLY in English throughout this conversation."
-
-        base_prompt = """
-        **System Overview:**
-        You are Martin, a warm and experienced travel planning assistant from Travel Labs. You have a genuine passion for helping people create amazing memories. You're excited about someone's upcoming trip and speak with enthusiasm and warmth. You have extensive knowledge about destinations worldwide and love sharing insider tips and recommendations.
-
-        **Personality Traits:**
-        - Warm, friendly, and enthusiastic about travel.
-        - Knowledgeable but approachable, explaining things clearly without overwhelming the user.
-        - Encouraging and positive, making people excited about their trips.
-        - Naturally curious about what travelers are looking for.
-        - Professional but personable, like talking to a well-traveled friend who happens to be great at planning.
-
-        **Speaking Style:**
-        - Use conversational, warm language.
-        - Show genuine interest in their trip ("That sounds amazing!", "Great choice!").
-        - Occasionally share brief insights or tips that show your expertise.
-        - Keep things natural and flowing — not robotic or overly formal.
-        - Express enthusiasm appropriately for their destination or plans.
-
-        **Primary Goal:**
-        Your main objective is to collect travel preferences in a natural and conversational way while also answering travel-related questions and providing personalized recommendations as needed.
-
-        **Travel Information Collection (In Order):**
-        1. **Destination (to)** – Where the user is going for vacation.
-        2. **Starting Location (from)** – Where they're coming from.
-        3. **Traveling With** – Who they’re traveling with and how many people.
-        4. **Travel Dates (when)** – The dates of their travel.
-        5. **Trip Duration (duration)** – How long they will stay.
-        6. **Purpose** – The type of trip (sightseeing, foodie, cultural, mix, etc.).
-        7. **Transportation** – How they want to travel in the country.
-        8. **Trip Description** – A summary of the collected info and the full conversation to create a custom travel plan.
-
-        **Important Rules to Follow:**
-        1. **Start the conversation** with a warm welcome message and introduction about yourself.
-        2. Whenever possible, **ask multiple questions at once** to gather more information efficiently.
-        3. Ensure your responses are **detailed, personalized, and engaging** to create a meaningful user experience.
-        4. **Explicitly ask for the next missing field** (e.g., "Can you please share your destination?").
-        5. If the user provides information for a different field, **acknowledge it** but redirect to the current field.
-        6. **Preserve all collected information** — do not overwrite it.
-        7. When all information is gathered and the **status is complete** (i.e., no missing fields), **immediately move to the predefined confirmation message** without giving any other message.
-        8. **Do not provide any summary of the trip details** until the confirmation phase.
-        9. If the user asks questions related to travel, **answer them fully and thoughtfully**. Engage in conversation on the topic and return to missing information afterward.
-        10. **Engage in a sub-discussion** about some travel topic if the user is interested, then return to collecting missing information after that conversation is over.
-
-        **Response Format (MUST USE):**
-        - ORGANIZE the text so it has a asthetic feel
-        - **Bold text** using double asterisks (e.g., **Important**).
-        - _Italicize_ using single underscores (e.g., _Friendly note_).
-        - ~~Strikethrough~~ to indicate deprecated information (e.g., ~~Old info~~).
-        - Use triple backticks (```) for technical details or code (e.g., `Code: 1234`).
-        - Use **bullet lists** (hyphens or asterisks) for clarity.
-        - Use **numbered lists** (1., 2., 3.) for ordered sequences.
-        - Separate paragraphs with blank lines for readability.
-
-        **Ensure consistent and clear formatting** to make your responses professional, easy to read, and compatible across different platforms.
-
-        **Answering Travel Questions:**
-        - Respond to travel-related inquiries (e.g., destination tips, visa requirements, travel advice) with **accurate, concise, and personalized answers**.
-        - Provide thoughtful recommendations when appropriate (e.g., activities, dining, or logistics based on the user's preferences).
-        - If the user asks questions that are **unrelated to travel**, politely ignore them and redirect to the next missing field or relevant travel topic.
-        """
-
-        self.system_prompt = base_prompt + "\n\n" + language_instruction
+    @property
+    def system_prompt(self) -> str:
+        # Rendered once per language in prompts.py and shared by every session
+        return CHAT_SYSTEM_PROMPTS[self.language]
 
     def get_text(self, key: str, **kwargs) -> str:
         """Retrieve the text template for the current language and format it with kwargs."""
@@ -164,35 +189,27 @@ class TravelChatbot:
             return template.format(**kwargs)
         return template
 
+    def _build_description_prompt(self, conversation_text: str) -> str:
+        """Build the prompt used to summarise the trip into a free-text description"""
+        return DESCRIPTION.render(
+            conversation_text=conversation_text,
+            from_=self.travel_info.get('from', 'Not specified'),
+            to=self.travel_info.get('to', 'Not specified'),
+            traveling_with=self.travel_info.get('traveling_with', 'Not specified'),
+            when=self.travel_info.get('when', 'Not specified'),
+            duration=self.travel_info.get('duration', 'Not specified'),
+            purpose=self.travel_info.get('purpose', 'Not specified'),
+            transportation=self.travel_info.get('transportation', 'Not specified'),
+        )
+
+    @instrumented("generate_trip_description")
     def generate_trip_description(self, conversation_text: str) -> str:
         """Generate a comprehensive trip description based on all collected information and conversation history"""
-        description_prompt = f"""
-        Based on the entire conversation and collected travel information, create a comprehensive trip description that captures:
-        1. The essence of what this trip is about
-        2. How the trip is organized
-        3. What the user wants to get out of this trip
-        4. Any specific preferences, interests, or requirements mentioned
-        5. The overall travel experience they're seeking
-
-        Conversation: {conversation_text}
-
-        Current travel information:
-        - From: {self.travel_info.get('from', 'Not specified')}
-        - To: {self.travel_info.get('to', 'Not specified')}
-        - Traveling with: {self.travel_info.get('traveling_with', 'Not specified')}
-        - When: {self.travel_info.get('when', 'Not specified')}
-        - Duration: {self.travel_info.get('duration', 'Not specified')}
-        - Purpose: {self.travel_info.get('purpose', 'Not specified')}
-        - Transportation: {self.travel_info.get('transportation', 'Not specified')}
-
-        Create a detailed description (2-3 paragraphs) that would help a travel planner understand exactly what kind of trip this is and what the traveler is looking for. Focus on the traveler's motivations, preferences, and desired experiences based on the conversation.
-
-        Return only the description text, no additional formatting or labels.
-        """
+        description_prompt = self._build_description_prompt(conversation_text)
         
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4-turbo",
+            response = chat_completion(
+                task="description",
                 messages=[{"role": "user", "content": description_prompt}],
                 max_tokens=1200,
                 temperature=0.7
@@ -202,291 +219,354 @@ class TravelChatbot:
             
         except Exception as e:
             print(f"Error generating trip description: {str(e)}")
-            return "A personalized travel experience based on the traveler's preferences and requirements discussed in the conversation."
+            return DEFAULT_TRIP_DESCRIPTION
 
-    def chat_with_openai(self, user_message: str) -> str:
-        """Send message to OpenAI and get response"""
+    def _record_user_message(self, user_message: str):
         if user_message:  # Only add non-empty messages
             self.conversation_history.append({
                 "role": "user", 
                 "content": user_message
             })
+
+    def _record_assistant_message(self, content: str):
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": content
+        })
+        self._schedule_compaction()
+
+    def _history_messages(self) -> list:
+        """Running summary (if any) followed by the verbatim recent history"""
+        if self.history_summary:
+            return [summary_message(self.history_summary, self.travel_info)] + self.conversation_history
+        return list(self.conversation_history)
+
+    def _apply_compaction(self):
+        """Swap in a finished background summary; never waits for one"""
+        if self._pending_compaction is None or not self._pending_compaction[0].done():
+            return
+        task, folded, last_folded = self._pending_compaction
+        self._pending_compaction = None
+        try:
+            summary = task.result()
+        except Exception as e:
+            print(f"Error compacting conversation history: {str(e)}")
+            return
+        if summary and len(self.conversation_history) >= folded and self.conversation_history[folded - 1] is last_folded:
+            self.history_summary = summary
+            del self.conversation_history[:folded]
+
+    def _compaction_request(self):
+        self._apply_compaction()
+        if self._pending_compaction is not None or not self.history_compactor.needs_compaction(self.conversation_history):
+            return None
+        older, _ = self.history_compactor.split(self.conversation_history)
+        if not older:
+            return None
+        return older, self.history_compactor.build_summary_request(self.history_summary, older, self.travel_info)
+
+    def _schedule_compaction(self):
+        request = self._compaction_request()
+        if request is not None:
+            older, params = request
+            self._pending_compaction = (history.submit(self._summarize_history, params), len(older), older[-1])
+
+    def _summarize_history(self, params: dict) -> str:
+        response = chat_completion(task="summary", **params)
+        return response.choices[0].message.content.strip()
+
+    def _build_chat_messages(self, missing_info: list) -> list:
+        """Build the chat request used to ask the user for the next missing field"""
+        context_prompt = self.system_prompt + f"\n\nStill missing: {missing_info}. Keep responses SHORT (1-2 sentences). Just ask for the next missing field."
+        
+        return [
+            {"role": "system", "content": context_prompt}
+        ] + self._history_messages()
+
+    @instrumented("chat_with_openai")
+    def chat_with_openai(self, user_message: str) -> str:
+        """Send message to OpenAI and get response"""
+        self._record_user_message(user_message)
         
         missing_info = self.get_missing_info()
         
         # If no missing info, immediately return the confirmation message
         if not missing_info:
-            when_display = self.travel_info.get('when', '')
-            if when_display and '(' in when_display:
-                when_display = when_display.split('(')[0].strip()
-            
-            confirmation_message = self.get_text(
-                "confirmation_prompt",
-                from_=self.travel_info.get('from', ''),
-                to=self.travel_info.get('to', ''),
-                traveling_with=self.travel_info.get('traveling_with', ''),
-                when=when_display,
-                duration=self.travel_info.get('duration', ''),
-                purpose=self.travel_info.get('purpose', ''),
-                transportation=self.travel_info.get('transportation', '')
-            )
-            
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": confirmation_message
-            })
+            confirmation_message = self.get_confirmation_message()
+            self._record_assistant_message(confirmation_message)
             return confirmation_message
         
         # If missing info, continue with normal conversation
-        context_prompt = self.system_prompt + f"\n\nStill missing: {missing_info}. Keep responses SHORT (1-2 sentences). Just ask for the next missing field."
-        
-        messages = [
-            {"role": "system", "content": context_prompt}
-        ] + self.conversation_history
+        messages = self._build_chat_messages(missing_info)
         
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4-turbo",
+            response = chat_completion(
+                task="reply",
                 messages=messages,
                 max_tokens=600,
                 temperature=0.7
             )
             
             assistant_response = response.choices[0].message.content
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_response
-            })
+            self._record_assistant_message(assistant_response)
             
             return assistant_response
             
         except Exception as e:
             return self.get_text("error_message")
+
+    def _build_extraction_prompt(self, conversation_text: str, current_date: datetime.date) -> str:
+        """Build the prompt that asks the model to extract travel fields as JSON"""
+        return EXTRACTION.render(current_date=current_date, conversation_text=conversation_text)
+
+    def _extraction_params(self, task: str, prompt: str, max_tokens: int, fields=EXTRACTION_FIELDS) -> dict:
+        """Completion parameters for an extraction call, using function calling where the routed models support it"""
+        params = {
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.3,
+        }
+        if all(model in STRUCTURED_OUTPUT_MODELS for model in model_router.route_for(task).models):
+            params["tools"] = [extraction_tool(fields)]
+            params["tool_choice"] = {"type": "function", "function": {"name": "record_travel_info"}}
+        return params
+
+    def _parse_extraction(self, extracted_text: str, fields=EXTRACTION_FIELDS) -> tuple:
+        """Parse an extraction response leniently.
+
+        Returns (field values, fields that could not be read). Fenced, truncated or
+        otherwise malformed JSON is repaired locally; when that fails, whatever
+        fields can still be read are salvaged and the rest are reported as failed.
+        """
+        try:
+            extracted_info = loads_lenient(extracted_text)
+            if not isinstance(extracted_info, dict):
+                raise ValueError("extraction response is not a JSON object")
+            # Keys the response started but repair had to drop (e.g. cut off mid-value)
+            failed = [
+                field for field in fields
+                if field not in extracted_info and re.search(r"[\"']" + re.escape(field) + r"[\"']\s*:", extracted_text)
+            ]
+        except ValueError:
+            extracted_info, failed = salvage_fields(extracted_text, fields)
+        values = {}
+        for field in fields:
+            value = extracted_info.get(field)
+            if value is not None and not isinstance(value, str):
+                value = str(value)
+            if field in extracted_info:
+                values[field] = value
+        return values, failed
+
+    def _build_field_retry_prompt(self, fields: list, source_text: str, current_date: datetime.date) -> str:
+        """Build a narrow extraction prompt for the fields a previous response left unreadable"""
+        return FIELD_RETRY.render(fields=", ".join(fields), current_date=current_date, source_text=source_text)
+
+    def _retry_fields(self, fields: list, source_text: str, current_date: datetime.date) -> dict:
+        """One targeted re-extraction of the failed fields; fields that fail again are dropped"""
+        metrics.record_retry("llm", "extract_fields")
+        prompt = self._build_field_retry_prompt(fields, source_text, current_date)
+        response = chat_completion(
+            task="extract_retry", **self._extraction_params("extract_retry", prompt, 40 + 40 * len(fields), fields)
+        )
+        values, failed = self._parse_extraction(completion_json_text(response), fields)
+        if failed:
+            print(f"Error: could not extract {', '.join(failed)} from OpenAI response")
+        return values
+
+    def _merge_fields(self, extracted_info: dict, current_date: datetime.date, overwrite: bool = False):
+        """Normalise 'when'/'duration' of an extracted field dict and merge it into travel_info"""
+        # Annotate 'when' with the normalised date(s) unless the model already did
+        if extracted_info.get("when") and extracted_info["when"] != "null":
+            extracted_info["when"] = annotate_when(extracted_info["when"], current_date)
+        
+        # Express 'duration' in days ("2 weeks" -> "14 days")
+        if extracted_info.get("duration") and extracted_info["duration"] != "null":
+            if "day" not in extracted_info["duration"].lower():
+                days = normalize_duration(extracted_info["duration"])
+                if days:
+                    extracted_info["duration"] = duration_text(days)
+        
+        # Merge with existing travel_info, only updating null or new values
+        for key, value in extracted_info.items():
+            if overwrite and key not in self.travel_info:
+                continue
+            if value != "null" and value is not None:
+                # If we're not in confirmation mode, preserve existing non-null values
+                # If we are updating (like during confirmation changes), allow overwriting
+                if self.travel_info[key] is None or overwrite or hasattr(self, '_updating_from_confirmation'):
+                    self.travel_info[key] = value
+                    self.collected_info.add(key)
+
+    def _needs_trip_description(self) -> bool:
+        return self.is_complete() and self.travel_info['descriptions of the trip'] is None
+
+    def _set_trip_description(self, trip_description: str):
+        self.travel_info['descriptions of the trip'] = trip_description
+        self.collected_info.add('descriptions of the trip')
     
+    @instrumented("extract_travel_info")
     def extract_travel_info(self, conversation_text: str):
         current_date = datetime.date.today()  # May 19, 2025
-        extraction_prompt = f"""
-        Based on the entire conversation provided, extract travel information in JSON format.
-        Include ALL information provided by the user throughout the conversation.
-        For 'when', provide the original user input followed by the approximate date in parentheses.
-        For 'duration', convert to a string with 'days'.
-        Do NOT generate 'descriptions of the trip' here - leave it as null.
-        
-        IMPORTANT: Focus on the most recent user input for any field changes. If the user has updated any information in their latest message, make sure to extract the NEW value, not the old one.
-        
-        Current date: {current_date}
-
-        Conversation: {conversation_text}
-
-        Extract to this format:
-        {{
-            "from": "starting location or null",
-            "to": "destination or null", 
-            "traveling_with": "who they're traveling with (find the total number of people from the response) or null",
-            "when": "original text (approximate date) or null",
-            "duration": "trip length as string with 'days' or null",
-            "purpose": "trip type/purpose (What type of trip this is) or null",
-            "transportation": "travel method or null",
-            "descriptions of the trip": null
-        }}
-
-        Only include explicit values. Use null for missing information.
-        Respond with only the JSON object.
-        """
+        extraction_prompt = self._build_extraction_prompt(conversation_text, current_date)
         
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4-turbo",
-                messages=[{"role": "user", "content": extraction_prompt}],
-                max_tokens=600,
-                temperature=0.3
-            )
-            
-            extracted_text = response.choices[0].message.content.strip()
-            if not extracted_text:
-                print("Error: Empty response from OpenAI")
-                return
-            
-            extracted_info = json.loads(extracted_text)
-            
-            # Process 'when' field to avoid duplicate dates
-            if extracted_info.get("when") and extracted_info["when"] != "null":
-                when_value = extracted_info["when"]
-                if '(' not in when_value:
-                    try:
-                        when_text = when_value.lower()
-                        parsed_date = current_date
-                        if "2nd week of next month" in when_text or "second week of next month" in when_text:
-                            parsed_date = current_date + relativedelta(months=1)
-                            parsed_date = parsed_date.replace(day=8)
-                        elif "next month" in when_text:
-                            parsed_date = current_date + relativedelta(months=1)
-                        elif "next week" in when_text:
-                            parsed_date = current_date + datetime.timedelta(days=7)
-                        elif "end of this month" in when_text:
-                            parsed_date = (current_date + relativedelta(months=1)).replace(day=1) - datetime.timedelta(days=1)
-                        else:
-                            try:
-                                parsed_date = parser.parse(when_text, default=current_date, fuzzy=True)
-                            except:
-                                parsed_date = current_date
-                        
-                        approx_date = parsed_date.strftime("%Y-%m-%d")
-                        extracted_info["when"] = f"{when_value} ({approx_date})"
-                    except Exception:
-                        extracted_info["when"] = when_value
-            
-            # Process 'duration' field
-            if extracted_info.get("duration") and extracted_info["duration"] != "null":
-                duration_text = extracted_info["duration"].lower()
-                try:
-                    if "day" not in duration_text:
-                        import re
-                        numbers = re.findall(r'\d+', duration_text)
-                        if numbers:
-                            num = numbers[0]
-                            extracted_info["duration"] = f"{num} days"
-                except Exception:
-                    pass
+            response = chat_completion(task="extract", **self._extraction_params("extract", extraction_prompt, max_tokens=600))
             
-            # Merge with existing travel_info, only updating null or new values
-            for key, value in extracted_info.items():
-                if value != "null" and value is not None:
-                    # If we're not in confirmation mode, preserve existing non-null values
-                    # If we are updating (like during confirmation changes), allow overwriting
-                    if self.travel_info[key] is None or hasattr(self, '_updating_from_confirmation'):
-                        self.travel_info[key] = value
-                        self.collected_info.add(key)
+            extracted_info, failed = self._parse_extraction(completion_json_text(response))
+            if failed:
+                extracted_info.update(self._retry_fields(failed, conversation_text, current_date))
+            self._merge_fields(extracted_info, current_date)
             
             # Generate trip description if all other info is collected
-            if self.is_complete() and self.travel_info['descriptions of the trip'] is None:
-                trip_description = self.generate_trip_description(conversation_text)
-                self.travel_info['descriptions of the trip'] = trip_description
-                self.collected_info.add('descriptions of the trip')
+            if self._needs_trip_description():
+                self._set_trip_description(self.generate_trip_description(conversation_text))
                     
-        except json.JSONDecodeError as e:
-            print(f"Error: Invalid JSON response from OpenAI: {extracted_text}")
-            return
         except Exception as e:
             print(f"Error extracting info: {str(e)}")
             return
-    
-    def handle_user_confirmation(self, user_response: str) -> tuple[bool, str]:
-        user_response = user_response.lower().strip()
-        
-        if user_response in [
-            # Basic affirmations
-            "yes", "yeah", "yep", "yup", "sure", "sure thing", "correct", "confirmed",
-            "okay", "ok", "k", "roger", "roger that", "aye", "indeed", "absolutely",
-            "definitely", "totally", "exactly", "right", "true", "affirmative",
 
-            # Casual affirmations
-            "looks good", "sounds good", "works for me", "fine by me", "all good",
-            "that's fine", "no problem", "cool", "alright", "that's right", "you got it",
-            "makes sense", "that's correct", "on point", "go ahead", "it’s okay", "that’ll do",
-            "i’m okay with that", "okie", "okie dokie", "okey-dokey",
+    def _last_assistant_message(self) -> str:
+        for msg in reversed(self.conversation_history):
+            if msg["role"] == "assistant":
+                return msg["content"]
+        return None
 
-            # Positive feedback
-            "perfect", "great", "awesome", "nailed it", "well done", "love it",
-            "exact match", "beautiful", "fantastic", "excellent", "spot on", "brilliant",
+    def _build_delta_extraction_prompt(self, user_message: str, current_date: datetime.date) -> str:
+        """Build the incremental extraction prompt: current state + newest turn only, answered with a patch"""
+        current_state = json.dumps(
+            {key: value for key, value in self.travel_info.items() if key != 'descriptions of the trip'},
+            ensure_ascii=False
+        )
+        last_assistant = self._last_assistant_message() if self.delta_include_assistant_turn else None
+        assistant_line = f"Last assistant message: {last_assistant}\n" if last_assistant else ""
+        return DELTA_EXTRACTION.render(
+            current_date=current_date,
+            current_state=current_state,
+            assistant_line=assistant_line,
+            user_message=user_message,
+        )
 
-            # Emojis and shorthand
-            "👍", "👌", "✅", "🆗", "💯", "👍🏼", "👍🏽", "👍🏾", "👍🏿",
+    def _conversation_text_with(self, user_message: str) -> str:
+        """Full transcript text including user_message, whether or not it was recorded yet"""
+        conversation_text = self._conversation_text()
+        if not self.conversation_history or self.conversation_history[-1] != {"role": "user", "content": user_message}:
+            conversation_text += f" user: {user_message}"
+        return conversation_text
 
-            # Informal variations
-            "yea", "ya", "yah", "yass", "yasss", "yessir", "yesss", "yas", "aight",
+    @instrumented("extract_travel_info_delta")
+    def extract_travel_info_delta(self, user_message: str) -> bool:
+        """Incrementally update travel_info from the newest user message.
 
-            # Other common confirmations
-            "that's it", "done", "agreed", "i agree", "exactly right", "precisely", 
-            "you’re right", "just what i wanted", "as expected", "matches", "confirmed and agreed"
-        ]:
-            self.confirmed = True
-            return True, self.get_text("change_acknowledgement")
-        
-        # If not a simple confirmation, process as natural language change
-        # Use the same system that was used to collect information initially
-        change_system_prompt = """You are Martin, helping a user modify their travel information. 
-        The user is providing changes in natural language. Extract any travel information they're updating.
-        Be conversational and acknowledge their changes naturally.
-        
-        Travel fields that can be updated:
-        - from: Starting location
-        - to: Destination
-        - traveling_with: Who they're traveling with
-        - when: Travel dates
-        - duration: Trip length
-        - purpose: Type of trip
-        - transportation: Travel method
-        
-        Respond naturally acknowledging the change, then ask if there are any other changes needed.
-        Keep your response SHORT (1-2 sentences).
+        Returns False if the patch could not be obtained, so the caller can fall
+        back to full-transcript extraction.
         """
+        current_date = datetime.date.today()
+        extraction_prompt = self._build_delta_extraction_prompt(user_message, current_date)
         
-        # Add the user's change request to conversation history
-        self.conversation_history.append({
-            "role": "user", 
-            "content": user_response
-        })
+        try:
+            response = chat_completion(task="extract_delta", **self._extraction_params("extract_delta", extraction_prompt, max_tokens=300))
+            
+            patch, failed = self._parse_extraction(completion_json_text(response))
+            if failed:
+                patch.update(self._retry_fields(failed, f"user: {user_message}", current_date))
+            self._merge_fields(patch, current_date, overwrite=True)
+        except Exception as e:
+            print(f"Incremental extraction failed, falling back to full transcript: {str(e)}")
+            return False
         
-        # Get conversation text for extraction
+        if self._needs_trip_description():
+            self._set_trip_description(self.generate_trip_description(self._conversation_text_with(user_message)))
+        return True
+
+    @instrumented("quick_extract")
+    def _quick_extract(self, user_message: str) -> bool:
+        """Fill travel_info from a short reply the local rules fully understand; False means ask the LLM"""
+        if not self.quick_extraction:
+            return False
+        expected = expected_fields(self._last_assistant_message(), self.get_missing_info())
+        patch, confidence = quick_extract(user_message, self.language, expected)
+        if not patch or confidence < MIN_CONFIDENCE:
+            return False
+        self._merge_fields(patch, datetime.date.today(), overwrite=True)
+        return True
+
+    def update_travel_info(self, user_message: str):
+        """Update travel_info for a new user message, using the local and incremental paths when enabled"""
+        if self._quick_extract(user_message):
+            if self._needs_trip_description():
+                self._set_trip_description(self.generate_trip_description(self._conversation_text_with(user_message)))
+            return
+        if self.incremental_extraction and self.extract_travel_info_delta(user_message):
+            return
+        self.extract_travel_info(self._conversation_text_with(user_message))
+
+    def _is_affirmation(self, user_response: str) -> bool:
+        return user_response in CONFIRMATION_PHRASES
+
+    def _build_change_messages(self) -> list:
+        """Build the chat request that acknowledges a change made during confirmation"""
+        return [
+            {"role": "system", "content": CHANGE_SYSTEM.render()}
+        ] + self.conversation_history[-5:]  # Include recent context
+
+    def _conversation_text(self) -> str:
         conversation_text = " ".join([
             f"{msg['role']}: {msg['content']}" 
             for msg in self.conversation_history
         ])
+        if self.history_summary:
+            conversation_text = f"(summary of earlier conversation: {self.history_summary}) " + conversation_text
+        return conversation_text
+    
+    @instrumented("handle_user_confirmation")
+    def handle_user_confirmation(self, user_response: str) -> tuple[bool, str]:
+        user_response = user_response.lower().strip()
+        
+        if self._is_affirmation(user_response):
+            self.confirmed = True
+            return True, self.get_text("change_acknowledgement")
+        
+        # If not a simple confirmation, process as natural language change
+        # Use the same system that was used to collect information initially
+        # Add the user's change request to conversation history
+        self._record_user_message(user_response)
         
         # Set flag to allow overwriting during confirmation updates
         self._updating_from_confirmation = True
         
         # Extract any new information from the change request
-        self.extract_travel_info(conversation_text)
+        self.update_travel_info(user_response)
         
         # Remove the flag
         delattr(self, '_updating_from_confirmation')
         
         # Use OpenAI to generate a natural response acknowledging the changes
         try:
-            messages = [
-                {"role": "system", "content": change_system_prompt}
-            ] + self.conversation_history[-5:]  # Include recent context
+            messages = self._build_change_messages()
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4-turbo",
+            response = chat_completion(
+                task="change_ack",
                 messages=messages,
                 max_tokens=450,
                 temperature=0.7
             )
             
             change_response = response.choices[0].message.content
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": change_response
-            })
-            
-            # After acknowledging the change, show updated confirmation
-            when_display = self.travel_info.get('when', '')
-            if when_display and '(' in when_display:
-                when_display = when_display.split('(')[0].strip()
-            
-            confirmation_message = self.get_text(
-                "confirmation_prompt",
-                from_=self.travel_info.get('from', ''),
-                to=self.travel_info.get('to', ''),
-                traveling_with=self.travel_info.get('traveling_with', ''),
-                when=when_display,
-                duration=self.travel_info.get('duration', ''),
-                purpose=self.travel_info.get('purpose', ''),
-                transportation=self.travel_info.get('transportation', '')
-            )
-            
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": confirmation_message
-            })
-            
-            return False, f"{change_response}\n\n{confirmation_message}"
+            return False, self._finish_change_response(change_response)
             
         except Exception as e:
             return False, self.get_confirmation_message()
+
+    def _finish_change_response(self, change_response: str) -> str:
+        """Record the change acknowledgement followed by the updated confirmation summary"""
+        self._record_assistant_message(change_response)
+        
+        # After acknowledging the change, show updated confirmation
+        confirmation_message = self.get_confirmation_message()
+        self._record_assistant_message(confirmation_message)
+        
+        return f"{change_response}\n\n{confirmation_message}"
     
     def get_confirmation_message(self) -> str:
         when_display = self.travel_info.get('when', '')
@@ -513,12 +593,17 @@ class TravelChatbot:
         return all(self.travel_info[key] is not None for key in essential_fields)
     
     def get_travel_info_json(self) -> dict:
-        return {
+        travel_json = {
             "travel_info": {key: value for key, value in self.travel_info.items() if value},
             "status": "complete" if self.is_complete() else "incomplete",
             "missing_info": self.get_missing_info(),
             "confirmed": self.confirmed
         }
+        # Normalised once here so later stages (e.g. the itinerary prompt) need not re-parse 'when'
+        travel_dates = normalize_when(self.travel_info.get('when'))
+        if travel_dates:
+            travel_json["travel_dates"] = travel_dates.as_dict()
+        return travel_json
     
     def start_conversation(self):
             welcome_msg = self.get_text("welcome_message")
@@ -528,6 +613,350 @@ class TravelChatbot:
 
 
 
+class AsyncTravelChatbot(TravelChatbot):
+    """Asyncio variant of TravelChatbot.
+
+    Shares all prompts and state handling with the sync class, but every LLM call
+    is awaitable (llm_client.achat_completion), so a single event loop can
+    serve many conversations at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._description_task = None
+
+    def _schedule_compaction(self):
+        request = self._compaction_request()
+        if request is not None:
+            older, params = request
+            self._pending_compaction = (asyncio.create_task(self._summarize_history(params)), len(older), older[-1])
+
+    async def _summarize_history(self, params: dict) -> str:
+        response = await achat_completion(task="summary", **params)
+        return response.choices[0].message.content.strip()
+
+    @instrumented("generate_trip_description")
+    async def generate_trip_description(self, conversation_text: str) -> str:
+        description_prompt = self._build_description_prompt(conversation_text)
+        
+        try:
+            response = await achat_completion(
+                task="description",
+                messages=[{"role": "user", "content": description_prompt}],
+                max_tokens=1200,
+                temperature=0.7
+            )
+            
+            return response.choices[0].message.content.strip()
+            
+        except Exception as e:
+            print(f"Error generating trip description: {str(e)}")
+            return DEFAULT_TRIP_DESCRIPTION
+
+    @instrumented("chat_with_openai")
+    async def chat_with_openai(self, user_message: str) -> str:
+        self._record_user_message(user_message)
+        
+        missing_info = self.get_missing_info()
+        
+        if not missing_info:
+            confirmation_message = self.get_confirmation_message()
+            self._record_assistant_message(confirmation_message)
+            return confirmation_message
+        
+        messages = self._build_chat_messages(missing_info)
+        
+        try:
+            assistant_response = await self._complete_reply(messages)
+            self._record_assistant_message(assistant_response)
+            
+            return assistant_response
+            
+        except Exception as e:
+            return self.get_text("error_message")
+
+    async def _complete_reply(self, messages: list) -> str:
+        response = await achat_completion(
+            task="reply",
+            messages=messages,
+            max_tokens=600,
+            temperature=0.7
+        )
+        return response.choices[0].message.content
+
+    async def _retry_fields(self, fields: list, source_text: str, current_date: datetime.date) -> dict:
+        metrics.record_retry("llm", "extract_fields")
+        prompt = self._build_field_retry_prompt(fields, source_text, current_date)
+        response = await achat_completion(
+            task="extract_retry", **self._extraction_params("extract_retry", prompt, 40 + 40 * len(fields), fields)
+        )
+        values, failed = self._parse_extraction(completion_json_text(response), fields)
+        if failed:
+            print(f"Error: could not extract {', '.join(failed)} from OpenAI response")
+        return values
+
+    @instrumented("extract_travel_info")
+    async def extract_travel_info(self, conversation_text: str, describe: bool = True):
+        current_date = datetime.date.today()
+        extraction_prompt = self._build_extraction_prompt(conversation_text, current_date)
+        
+        try:
+            response = await achat_completion(task="extract", **self._extraction_params("extract", extraction_prompt, max_tokens=600))
+            
+            extracted_info, failed = self._parse_extraction(completion_json_text(response))
+            if failed:
+                extracted_info.update(await self._retry_fields(failed, conversation_text, current_date))
+            self._merge_fields(extracted_info, current_date)
+            
+            if describe and self._needs_trip_description():
+                self._set_trip_description(await self.generate_trip_description(conversation_text))
+                    
+        except Exception as e:
+            print(f"Error extracting info: {str(e)}")
+            return
+
+    @instrumented("extract_travel_info_delta")
+    async def extract_travel_info_delta(self, user_message: str, describe: bool = True) -> bool:
+        current_date = datetime.date.today()
+        extraction_prompt = self._build_delta_extraction_prompt(user_message, current_date)
+        
+        try:
+            response = await achat_completion(task="extract_delta", **self._extraction_params("extract_delta", extraction_prompt, max_tokens=300))
+            
+            patch, failed = self._parse_extraction(completion_json_text(response))
+            if failed:
+                patch.update(await self._retry_fields(failed, f"user: {user_message}", current_date))
+            self._merge_fields(patch, current_date, overwrite=True)
+        except Exception as e:
+            print(f"Incremental extraction failed, falling back to full transcript: {str(e)}")
+            return False
+        
+        if describe and self._needs_trip_description():
+            self._set_trip_description(await self.generate_trip_description(self._conversation_text_with(user_message)))
+        return True
+
+    async def update_travel_info(self, user_message: str, describe: bool = True, quick: bool = True):
+        if quick and self._quick_extract(user_message):
+            if describe and self._needs_trip_description():
+                self._set_trip_description(await self.generate_trip_description(self._conversation_text_with(user_message)))
+            return
+        if self.incremental_extraction and await self.extract_travel_info_delta(user_message, describe=describe):
+            return
+        await self.extract_travel_info(self._conversation_text_with(user_message), describe=describe)
+
+    @instrumented("process_turn")
+    async def process_turn(self, user_message: str) -> str:
+        """Handle one information-collection turn with extraction and the reply running concurrently.
+
+        The reply is requested speculatively for the current missing-field set while
+        extraction runs. If extraction changes that set, the speculative reply is
+        cancelled and either re-requested or replaced by the confirmation message.
+        The trip description is generated in the background (see ensure_trip_description).
+        """
+        speculative_missing = self.get_missing_info()
+        if not speculative_missing:
+            return await self.chat_with_openai(user_message)
+        
+        if self._quick_extract(user_message):
+            # Parsed locally, so the missing-field set is already final: nothing to speculate on
+            speculative_missing, reply_task = None, None
+        else:
+            speculative_messages = self._build_chat_messages(speculative_missing)
+            if user_message:
+                speculative_messages.append({"role": "user", "content": user_message})
+            reply_task = asyncio.create_task(self._complete_reply(speculative_messages))
+            
+            try:
+                await self.update_travel_info(user_message, describe=False, quick=False)
+            except BaseException:
+                reply_task.cancel()
+                raise
+        
+        self._record_user_message(user_message)
+        
+        if self.is_complete():
+            if reply_task is not None:
+                reply_task.cancel()
+            self._schedule_trip_description()
+            confirmation_message = self.get_confirmation_message()
+            self._record_assistant_message(confirmation_message)
+            return confirmation_message
+        
+        missing_info = self.get_missing_info()
+        if missing_info != speculative_missing:
+            if reply_task is not None:
+                reply_task.cancel()
+            reply_task = asyncio.create_task(self._complete_reply(self._build_chat_messages(missing_info)))
+        
+        try:
+            assistant_response = await reply_task
+        except Exception as e:
+            return self.get_text("error_message")
+        
+        self._record_assistant_message(assistant_response)
+        return assistant_response
+
+    async def _stream_reply(self, messages: list, task: str = "reply", max_tokens: int = 600):
+        response = await achat_completion(
+            task=task,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.7,
+            stream=True
+        )
+        async for chunk in response:
+            content = chunk.choices[0].delta.get("content") if chunk.choices else None
+            if content:
+                yield content
+
+    async def _pump_reply(self, messages: list, queue: asyncio.Queue):
+        try:
+            async for piece in self._stream_reply(messages):
+                await queue.put(piece)
+        finally:
+            queue.put_nowait(None)
+
+    async def stream_turn(self, user_message: str):
+        """Streaming variant of process_turn: yields the reply piece by piece.
+
+        The speculative reply is buffered until extraction confirms the missing-field
+        set, so nothing is shown to the user that later has to be retracted.
+        """
+        speculative_missing = self.get_missing_info()
+        if not speculative_missing:
+            yield await self.chat_with_openai(user_message)
+            return
+        
+        queue = asyncio.Queue()
+        if self._quick_extract(user_message):
+            speculative_missing, pump_task = None, None
+        else:
+            speculative_messages = self._build_chat_messages(speculative_missing)
+            if user_message:
+                speculative_messages.append({"role": "user", "content": user_message})
+            pump_task = asyncio.create_task(self._pump_reply(speculative_messages, queue))
+        
+        try:
+            if pump_task is not None:
+                await self.update_travel_info(user_message, describe=False, quick=False)
+            self._record_user_message(user_message)
+            
+            if self.is_complete():
+                if pump_task is not None:
+                    pump_task.cancel()
+                self._schedule_trip_description()
+                confirmation_message = self.get_confirmation_message()
+                self._record_assistant_message(confirmation_message)
+                yield confirmation_message
+                return
+            
+            missing_info = self.get_missing_info()
+            if missing_info != speculative_missing:
+                if pump_task is not None:
+                    pump_task.cancel()
+                queue = asyncio.Queue()
+                pump_task = asyncio.create_task(self._pump_reply(self._build_chat_messages(missing_info), queue))
+            
+            pieces = []
+            while True:
+                piece = await queue.get()
+                if piece is None:
+                    break
+                pieces.append(piece)
+                yield piece
+            
+            try:
+                await pump_task
+            except Exception as e:
+                if not pieces:
+                    yield self.get_text("error_message")
+                    return
+            
+            self._record_assistant_message("".join(pieces))
+        finally:
+            if pump_task is not None and not pump_task.done():
+                pump_task.cancel()
+
+    def _schedule_trip_description(self):
+        """Start generating the trip description off the critical path of the current turn"""
+        if self._needs_trip_description() and self._description_task is None:
+            self._description_task = asyncio.create_task(
+                self._fill_trip_description(self._conversation_text())
+            )
+
+    async def _fill_trip_description(self, conversation_text: str):
+        trip_description = await self.generate_trip_description(conversation_text)
+        if self.travel_info['descriptions of the trip'] is None:
+            self._set_trip_description(trip_description)
+
+    async def ensure_trip_description(self) -> str:
+        """Wait for (or generate) the trip description; call before building the itinerary"""
+        if self._description_task is not None:
+            await self._description_task
+        elif self._needs_trip_description():
+            self._set_trip_description(await self.generate_trip_description(self._conversation_text()))
+        return self.travel_info['descriptions of the trip']
+
+    async def _apply_confirmation_response(self, user_response: str) -> bool:
+        """True when the user confirmed; otherwise their changes are merged into travel_info"""
+        if self._is_affirmation(user_response):
+            self.confirmed = True
+            return True
+        
+        self._record_user_message(user_response)
+        
+        self._updating_from_confirmation = True
+        try:
+            await self.update_travel_info(user_response)
+        finally:
+            delattr(self, '_updating_from_confirmation')
+        return False
+
+    @instrumented("handle_user_confirmation")
+    async def handle_user_confirmation(self, user_response: str) -> tuple[bool, str]:
+        user_response = user_response.lower().strip()
+        
+        if await self._apply_confirmation_response(user_response):
+            return True, self.get_text("change_acknowledgement")
+        
+        try:
+            response = await achat_completion(
+                task="change_ack",
+                messages=self._build_change_messages(),
+                max_tokens=450,
+                temperature=0.7
+            )
+            
+            change_response = response.choices[0].message.content
+            return False, self._finish_change_response(change_response)
+            
+        except Exception as e:
+            return False, self.get_confirmation_message()
+
+    async def stream_confirmation(self, user_response: str):
+        """Streaming variant of handle_user_confirmation: yields the change acknowledgement
+        piece by piece, then the updated summary (check self.confirmed afterwards)."""
+        user_response = user_response.lower().strip()
+        
+        if await self._apply_confirmation_response(user_response):
+            yield self.get_text("change_acknowledgement")
+            return
+        
+        pieces = []
+        try:
+            async for piece in self._stream_reply(self._build_change_messages(), task="change_ack", max_tokens=450):
+                pieces.append(piece)
+                yield piece
+        except Exception as e:
+            if not pieces:
+                yield self.get_confirmation_message()
+                return
+        
+        change_response = "".join(pieces)
+        yield self._finish_change_response(change_response)[len(change_response):]
+
+
+
 # def main(user_input: str, language: str, conversation_history: list = None) -> tuple[str, dict]:
 #     bot = TravelChatbot(language=language)
    
@@ -583,11 +1012,7 @@ def main():
                 continue
         
         # Normal conversation mode
-        conversation_text = " ".join([
-            f"{msg['role']}: {msg['content']}" 
-            for msg in bot.conversation_history
-        ])
-        bot.extract_travel_info(conversation_text + f" user: {user_input}")
+        bot.update_travel_info(user_input)
         
         if bot.is_complete():
             confirmation_mode = True
@@ -0,0 +1,241 @@
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_session = contextvars.ContextVar("metrics_session", default=(None, None))  # (session_id, language)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.kind = "counter"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def expose(self) -> list:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.kind = "histogram"
+        self.buckets = buckets
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def expose(self) -> list:
+        lines = []
+        with self._lock:
+            for key, entry in self._values.items():
+                for bound, count in zip(self.buckets, entry):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', str(bound)),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {round(entry[-2], 6)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {entry[-1]}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.kind = "gauge"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def expose(self) -> list:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+STAGE_DURATION = Histogram("travel_stage_duration_seconds", "Time spent per pipeline stage or external call")
+STAGE_ERRORS = Counter("travel_stage_errors_total", "Errors raised per pipeline stage or external call")
+LLM_TOKENS = Counter("travel_llm_tokens_total", "Tokens reported in completion usage")
+CACHE_REQUESTS = Counter("travel_cache_requests_total", "Cache lookups by layer and result")
+RETRIES = Counter("travel_retries_total", "Retried external requests")
+
+REGISTRY = [STAGE_DURATION, STAGE_ERRORS, LLM_TOKENS, CACHE_REQUESTS, RETRIES]
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+##################################################################
+# Per-conversation traces
+##################################################################
+
+class TraceStore:
+    """Bounded in-memory span log per session (oldest sessions dropped first)."""
+
+    def __init__(self, max_sessions: int = 1000, max_spans: int = 500):
+        self.max_sessions = max_sessions
+        self.max_spans = max_spans
+        self._traces = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session_id: str, span: dict):
+        with self._lock:
+            spans = self._traces.get(session_id)
+            if spans is None:
+                spans = self._traces[session_id] = deque(maxlen=self.max_spans)
+                while len(self._traces) > self.max_sessions:
+                    self._traces.popitem(last=False)
+            self._traces.move_to_end(session_id)
+            spans.append(span)
+
+    def get(self, session_id: str) -> list:
+        with self._lock:
+            return list(self._traces.get(session_id, ()))
+
+    def dump(self, session_id: str) -> str:
+        return json.dumps({"session_id": session_id, "spans": self.get(session_id)}, ensure_ascii=False, indent=2)
+
+
+traces = TraceStore()
+
+
+@contextmanager
+def session_context(session_id: str = None, language: str = None):
+    """Tag every span recorded inside this block with the session and language"""
+    token = _session.set((session_id, language))
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session_id() -> str:
+    return _session.get()[0]
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Time a stage or external call; records duration, errors and a trace entry.
+
+    Yields a dict the caller may add attributes to (e.g. token usage).
+    """
+    session_id, language = _session.get()
+    info = dict(attributes)
+    started = time.time()
+    began = time.perf_counter()
+    error = None
+    try:
+        yield info
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - began
+        STAGE_DURATION.observe(duration, stage=stage, language=language)
+        if error is not None:
+            STAGE_ERRORS.inc(stage=stage, language=language, error=error)
+        if session_id is not None:
+            traces.add(session_id, {"stage": stage, "start": round(started, 6), "duration": round(duration, 6),
+                                    "error": error, **info})
+
+
+def instrumented(stage: str):
+    """Decorator for TravelChatbot methods: a span tagged with the bot's session and language"""
+    def decorate(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                with session_context(getattr(self, "session_id", None), getattr(self, "language", None)):
+                    with span(stage):
+                        return await method(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with session_context(getattr(self, "session_id", None), getattr(self, "language", None)):
+                with span(stage):
+                    return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_usage(task: str, model: str, usage, info: dict = None):
+    if not usage:
+        return
+    _, language = _session.get()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = usage.get(kind) or 0
+        LLM_TOKENS.inc(count, task=task, model=model, kind=kind.replace("_tokens", ""), language=language)
+        if info is not None:
+            info[kind] = count
+
+
+def record_cache(layer: str, hit: bool):
+    CACHE_REQUESTS.inc(layer=layer, result="hit" if hit else "miss")
+
+
+def record_retry(service: str, reason: str):
+    RETRIES.inc(service=service, reason=reason)
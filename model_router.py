@@ -0,0 +1,139 @@
+import os
+import threading
+from collections import defaultdict, deque
+
+import openai
+
+# Model tiers, best first; the later models are fallbacks on timeout or overload.
+# Override with e.g. LLM_MODELS_FAST="gpt-4o-mini,gpt-3.5-turbo".
+TIERS = {
+    "fast": ("gpt-4o-mini", "gpt-3.5-turbo"),
+    "standard": ("gpt-4o", "gpt-4-turbo"),
+    "large": ("gpt-4-turbo", "gpt-4o"),
+}
+
+
+class Route:
+    """Routing policy for one task type.
+
+    tier picks the models, latency_budget (seconds) bounds each attempt, deadline bounds
+    the whole call including fallbacks, and hedge allows a duplicate request for
+    idempotent calls once the first one is slower than the task's observed p95.
+    """
+
+    __slots__ = ("tier", "latency_budget", "max_tokens", "deadline", "hedge")
+
+    def __init__(self, tier: str, latency_budget: float, max_tokens: int = None, deadline: float = None,
+                 hedge: bool = False):
+        self.tier = tier
+        self.latency_budget = latency_budget
+        self.max_tokens = max_tokens
+        self.deadline = deadline if deadline is not None else 2 * latency_budget
+        self.hedge = hedge
+
+    @property
+    def models(self) -> tuple:
+        configured = os.getenv(f"LLM_MODELS_{self.tier.upper()}")
+        if configured:
+            return tuple(model.strip() for model in configured.split(",") if model.strip())
+        return TIERS[self.tier]
+
+
+# High-frequency conversational work goes to the fast tier; the big model is kept for itineraries
+TASK_ROUTES = {
+    "reply": Route("fast", latency_budget=10, max_tokens=600, deadline=20),
+    "change_ack": Route("fast", latency_budget=8, max_tokens=450, deadline=12),
+    "extract": Route("fast", latency_budget=15, max_tokens=600, deadline=25, hedge=True),
+    "extract_delta": Route("fast", latency_budget=10, max_tokens=300, deadline=15, hedge=True),
+    "extract_retry": Route("fast", latency_budget=8, max_tokens=320, deadline=10, hedge=True),
+    "summary": Route("fast", latency_budget=20, max_tokens=300, deadline=30),
+    "description": Route("standard", latency_budget=30, max_tokens=1200, deadline=45),
+    "translate": Route("standard", latency_budget=60, max_tokens=4000, deadline=90, hedge=True),
+    "itinerary": Route("large", latency_budget=150, max_tokens=4000, deadline=240),
+    "itinerary_plan": Route("large", latency_budget=60, max_tokens=1500, deadline=90),
+    "itinerary_chunk": Route("large", latency_budget=90, max_tokens=2200, deadline=150),
+}
+
+DEFAULT_ROUTE = Route("standard", latency_budget=60)
+
+# Failures worth retrying on the next model of the tier
+FALLBACK_ERRORS = (
+    openai.error.Timeout,
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.TryAgain,
+)
+
+
+def configure_route(task: str, tier: str = None, latency_budget: float = None, max_tokens: int = None,
+                    deadline: float = None, hedge: bool = None):
+    """Change the routing of one task type (unspecified settings are kept)"""
+    current = TASK_ROUTES.get(task, DEFAULT_ROUTE)
+    TASK_ROUTES[task] = Route(
+        tier or current.tier,
+        current.latency_budget if latency_budget is None else latency_budget,
+        current.max_tokens if max_tokens is None else max_tokens,
+        current.deadline if deadline is None else deadline,
+        current.hedge if hedge is None else hedge,
+    )
+
+
+def route_for(task: str) -> Route:
+    return TASK_ROUTES.get(task, DEFAULT_ROUTE)
+
+
+def primary_model(task: str) -> str:
+    return route_for(task).models[0]
+
+
+def should_fall_back(error: Exception) -> bool:
+    if isinstance(error, FALLBACK_ERRORS):
+        return True
+    # Upstream 5xx / overloaded responses surface as a plain APIError
+    return isinstance(error, openai.error.APIError) and (error.http_status or 500) >= 500
+
+
+def attempts(task: str, params: dict) -> list:
+    """Completion parameters for each model to try, in order.
+
+    An explicit model in params is tried first, then the task's tier; each attempt
+    gets the tier's latency budget as its request timeout and max_tokens capped by the route.
+    """
+    route = route_for(task)
+    models = list(dict.fromkeys(([params["model"]] if params.get("model") else []) + list(route.models)))
+    base = dict(params)
+    if route.max_tokens:
+        base["max_tokens"] = min(base.get("max_tokens") or route.max_tokens, route.max_tokens)
+    base.setdefault("request_timeout", route.latency_budget)
+    return [dict(base, model=model) for model in models]
+
+
+##################################################################
+# Observed latencies, for adaptive hedging delays
+##################################################################
+
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+MIN_HEDGE_DELAY = 0.25
+
+_latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+_latencies_lock = threading.Lock()
+
+
+def record_latency(task: str, seconds: float):
+    """Record the duration of a successful upstream call (cache hits excluded)"""
+    with _latencies_lock:
+        _latencies[task].append(seconds)
+
+
+def hedge_delay(task: str) -> float:
+    """How long to wait before hedging: the task's p95 latency once enough calls were seen,
+    otherwise half the latency budget"""
+    route = route_for(task)
+    with _latencies_lock:
+        samples = sorted(_latencies[task])
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        return route.latency_budget / 2
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    return min(max(p95, MIN_HEDGE_DELAY), route.latency_budget)
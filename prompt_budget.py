@@ -0,0 +1,129 @@
+import math
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4-turbo") -> int:
+    """Local token count: exact with tiktoken, otherwise ~4 chars/token (1 per CJK character)"""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text))
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def count_message_tokens(messages: list, model: str = "gpt-4-turbo") -> int:
+    # ~4 tokens of framing per message plus 3 for the reply primer
+    return sum(count_tokens(message.get("content") or "", model) + 4 for message in messages) + 3
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4-turbo") -> str:
+    """Cut text to at most max_tokens, preferring a sentence or word boundary"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    if tiktoken is not None:
+        encoding = _encoding(model)
+        cut = encoding.decode(encoding.encode(text)[:max_tokens])
+    else:
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(text[:middle], model) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        cut = text[:low]
+    boundary = max(cut.rfind(". "), cut.rfind("。"))
+    if boundary > len(cut) // 2:
+        return cut[:boundary + 1]
+    space = cut.rfind(" ")
+    return cut[:space] if space > len(cut) // 2 else cut
+
+
+HOTEL_COLUMNS = ("name", "price", "url", "image", "tags")
+
+
+def serialize_hotels(hotels: list, max_tags: int = None) -> str:
+    """Compact tabular form: one header line, then one pipe-separated line per hotel (ranked order)"""
+    lines = ["|".join(HOTEL_COLUMNS)]
+    for hotel in hotels:
+        tags = [tag.strip() for tag in (hotel.get("tags") or "").split(",") if tag.strip()]
+        if max_tags is not None:
+            tags = tags[:max_tags]
+        row = [str(hotel.get(column, "")) for column in HOTEL_COLUMNS[:-1]] + [";".join(tags)]
+        lines.append("|".join(value.replace("|", "/") for value in row))
+    return "\n".join(lines)
+
+
+def fit_hotels(hotels: list, budget: int, model: str = "gpt-4-turbo", min_tags: int = 3) -> tuple:
+    """Serialize ranked hotels within a token budget.
+
+    Degrades in steps: all tags, then progressively fewer tags per hotel (down to
+    min_tags), then dropping the lowest-ranked hotels. Returns (text, hotels kept).
+    """
+    kept = list(hotels)
+    while kept:
+        text = serialize_hotels(kept)
+        if count_tokens(text, model) <= budget:
+            return text, len(kept)
+        most_tags = max(len((hotel.get("tags") or "").split(",")) for hotel in kept)
+        for max_tags in range(most_tags - 1, min_tags - 1, -1):
+            text = serialize_hotels(kept, max_tags)
+            if count_tokens(text, model) <= budget:
+                return text, len(kept)
+        kept.pop()
+    return "", 0
+
+
+class PromptBudget:
+    """Token budget for one request, split into named sections.
+
+    The fixed instructions are counted first; each flexible section is then fitted
+    into min(its own budget, what is left of the total).
+    """
+
+    def __init__(self, total: int, sections: dict, model: str = "gpt-4-turbo"):
+        self.total = total
+        self.sections = dict(sections)
+        self.model = model
+        self.used = {}
+
+    def remaining(self) -> int:
+        return self.total - sum(self.used.values())
+
+    def add_fixed(self, name: str, text: str = "", tokens: int = None) -> str:
+        """Charge a section that cannot shrink; tokens is its count if already known (e.g. PromptTemplate.count_tokens)"""
+        self.used[name] = self.used.get(name, 0) + (count_tokens(text, self.model) if tokens is None else tokens)
+        return text
+
+    def allowance(self, name: str) -> int:
+        return max(0, min(self.sections.get(name, self.remaining()), self.remaining()))
+
+    def fit_text(self, name: str, text: str) -> str:
+        text = truncate_to_tokens(text, self.allowance(name), self.model)
+        self.used[name] = count_tokens(text, self.model)
+        return text
+
+    def fit_hotels(self, name: str, hotels: list) -> tuple:
+        text, kept = fit_hotels(hotels, self.allowance(name), self.model)
+        self.used[name] = count_tokens(text, self.model)
+        return text, kept
+
+    def report(self) -> dict:
+        return {"total": self.total, "used": dict(self.used), "remaining": self.remaining()}
@@ -0,0 +1,397 @@
+import datetime
+import re
+
+import geo_index
+from date_normalizer import EN_NUM, ZH_NUM, duration_text, find_dates, find_durations, fold, parse_number
+
+# Patches below this confidence are left to the LLM extraction
+MIN_CONFIDENCE = 0.8
+# Longer messages are rarely a bare answer; they always go to the LLM
+MAX_MESSAGE_CHARS = 120
+
+CONF_EXPLICIT = 0.95  # unambiguous form, e.g. "10 days", "from Dhaka", "2 adults"
+CONF_BARE = 0.9  # bare value that is only unambiguous given the question, e.g. "Paris"
+CONF_WEAK = 0.7  # plausible reading, but let the LLM decide
+UNASKED_FACTOR = 0.9  # applied when a field other than the one being asked for is filled
+
+_CJK_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+
+
+##################################################################
+# Duration, party size, transportation
+##################################################################
+
+APPROXIMATE_DURATION_UNITS = {"晚", "夜", "月"}
+
+_PARTY_UNITS_EN = {
+    "adult": "adult", "adults": "adult", "grown-ups": "adult", "grownups": "adult", "people": "adult",
+    "persons": "adult", "person": "adult", "pax": "adult", "travelers": "adult", "travellers": "adult",
+    "guests": "adult", "of us": "adult", "seniors": "adult", "senior": "adult",
+    "kids": "companion", "kid": "companion", "children": "companion", "child": "companion",
+    "teens": "companion", "teenagers": "companion", "babies": "companion", "baby": "companion",
+    "infants": "companion", "infant": "companion", "toddlers": "companion", "toddler": "companion",
+    "friends": "companion", "friend": "companion", "colleagues": "companion", "colleague": "companion",
+    "coworkers": "companion", "coworker": "companion",
+}
+_PARTY_UNITS_ZH = {
+    "大人": "adult", "成人": "adult", "成年人": "adult", "人": "adult", "老人": "adult",
+    "孩子": "companion", "小孩": "companion", "儿童": "companion", "兒童": "companion",
+    "朋友": "companion", "同事": "companion",
+}
+_EN_UNIT = "|".join(re.escape(unit) for unit in sorted(_PARTY_UNITS_EN, key=len, reverse=True))
+_ZH_UNIT = "|".join(re.escape(unit) for unit in sorted(_PARTY_UNITS_ZH, key=len, reverse=True))
+_EN_GROUP = rf"(?:{EN_NUM})\s+(?:{_EN_UNIT})\b"
+_ZH_GROUP = rf"(?:{ZH_NUM})\s*(?:个|個|位|名)?\s*(?:{_ZH_UNIT})"
+_EN_GROUP_RE = re.compile(rf"(?P<count>{EN_NUM})\s+(?P<unit>{_EN_UNIT})\b")
+_ZH_GROUP_RE = re.compile(rf"(?P<count>{ZH_NUM})\s*(?:个|個|位|名)?\s*(?P<unit>{_ZH_UNIT})")
+
+_PARTNERS_EN = r"wife|husband|partner|spouse|girlfriend|boyfriend|fiancee|fiance"
+_PARTNERS_ZH = r"老婆|老公|妻子|丈夫|太太|先生|女朋友|男朋友|女友|男友|爱人|愛人|伴侣|伴侶"
+
+# (pattern, fixed head count or None to count the groups, confidence)
+PARTY_RULES = [
+    (re.compile(r"\b(?:just\s+|only\s+)?(?:solo|alone|by\s+myself|on\s+my\s+own|just\s+me|only\s+me)\b"), 1, CONF_EXPLICIT),
+    (re.compile(rf"\b(?:(?:me|i)\s+and\s+my\s+(?:{_PARTNERS_EN})|(?:with\s+)?my\s+(?:{_PARTNERS_EN})(?:\s+and\s+(?:me|i))?)\b"), 2, CONF_BARE),
+    (re.compile(r"\b(?:as\s+)?a\s+couple\b"), 2, CONF_BARE),
+    (re.compile(rf"\b(?:with\s+)?(?:a\s+|my\s+)?family\s+of\s+(?P<count>{EN_NUM})\b"), None, CONF_EXPLICIT),
+    (re.compile(rf"\b(?:with\s+)?(?:{_EN_GROUP})(?:\s*(?:,|and|&|\+|plus|with)\s*(?:{_EN_GROUP}))*"), None, CONF_EXPLICIT),
+    (re.compile(r"(?:自己)?(?:一个人|一個人|独自|獨自|单人|單人|就我(?:自己)?|只有我)"), 1, CONF_EXPLICIT),
+    (re.compile(rf"(?:我)?(?:和|跟|与|與|带|帶)(?:我)?(?:的)?(?:{_PARTNERS_ZH})"), 2, CONF_BARE),
+    (re.compile(rf"(?:全家|一家)(?P<count>{ZH_NUM})口"), None, CONF_EXPLICIT),
+    (re.compile(rf"(?:我们|我們)?(?:{_ZH_GROUP})(?:\s*(?:和|跟|加|、|，|,|\+)\s*(?:{_ZH_GROUP}))*"), None, CONF_EXPLICIT),
+]
+
+# canonical mode -> (English label, Chinese label, English pattern, Chinese pattern)
+TRANSPORT_MODES = {
+    "train": ("train", "火车", r"trains?|rail(?:way)?s?", r"火车|火車|高铁|高鐵|动车|動車"),
+    "plane": ("plane", "飞机", r"air|planes?|airplanes?|flights?|fly(?:ing)?", r"飞机|飛機|航班"),
+    "bus": ("bus", "巴士", r"bus(?:es)?|coach(?:es)?", r"大巴|巴士|公交|公車|客运|客運|长途汽车|長途汽車"),
+    "car": ("car", "自驾", r"(?:a\s+)?(?:rental\s+|hire\s+|rented\s+)?cars?|car\s+rental|self[\s-]drive|driv(?:e|ing)|road\s*trip",
+            r"自驾|自駕|开车|開車|租车|租車|汽车|汽車"),
+    "public transport": ("public transport", "公共交通", r"public\s+transport(?:ation)?|metro|subway|underground",
+                         r"公共交通|地铁|地鐵|捷运|捷運"),
+    "ferry": ("ferry", "轮渡", r"ferry|ferries|boat|ship|cruise", r"轮渡|渡轮|渡輪|轮船|輪船|游轮|郵輪|船"),
+    "taxi": ("taxi", "出租车", r"taxis?|cabs?|uber", r"出租车|出租車|计程车|計程車|打车|打車"),
+    "walking": ("walking", "步行", r"walk(?:ing)?|on\s+foot", r"步行|走路"),
+}
+TRANSPORT_RULES = [
+    (mode, re.compile(rf"\b(?P<prefix>(?:by|via|take|taking|use|using|rent|renting|on\s+the|on)\s+(?:a\s+|the\s+)?)?(?:{en})\b"),
+     re.compile(rf"(?P<prefix>坐|乘|搭|乘坐|搭乘|用)?(?:{zh})"))
+    for mode, (_, _, en, zh) in TRANSPORT_MODES.items()
+]
+
+
+##################################################################
+# Places (gazetteer)
+##################################################################
+
+# Chinese names (simplified and traditional) for places in the built-in city table
+ZH_PLACE_NAMES = {
+    "北京": "Beijing", "上海": "Shanghai", "杭州": "Hangzhou", "广州": "Guangzhou", "廣州": "Guangzhou",
+    "深圳": "Shenzhen", "成都": "Chengdu", "西安": "Xi'an", "香港": "Hong Kong", "澳门": "Macau", "澳門": "Macau",
+    "台北": "Taipei", "臺北": "Taipei", "台南": "Tainan", "臺南": "Tainan", "高雄": "Kaohsiung",
+    "东京": "Tokyo", "東京": "Tokyo", "京都": "Kyoto", "大阪": "Osaka", "奈良": "Nara", "札幌": "Sapporo",
+    "横滨": "Yokohama", "橫濱": "Yokohama", "首尔": "Seoul", "首爾": "Seoul", "釜山": "Busan",
+    "曼谷": "Bangkok", "清迈": "Chiang Mai", "清邁": "Chiang Mai", "普吉": "Phuket", "普吉岛": "Phuket", "普吉島": "Phuket",
+    "新加坡": "Singapore", "吉隆坡": "Kuala Lumpur", "巴厘岛": "Bali", "峇里島": "Bali", "河内": "Hanoi",
+    "胡志明市": "Ho Chi Minh City", "达卡": "Dhaka", "達卡": "Dhaka", "加德满都": "Kathmandu", "加德滿都": "Kathmandu",
+    "科伦坡": "Colombo", "可倫坡": "Colombo", "新德里": "New Delhi", "孟买": "Mumbai", "孟買": "Mumbai", "迪拜": "Dubai",
+    "杜拜": "Dubai", "多哈": "Doha", "伊斯坦布尔": "Istanbul", "伊斯坦堡": "Istanbul", "开罗": "Cairo", "開羅": "Cairo",
+    "巴黎": "Paris", "尼斯": "Nice", "里昂": "Lyon", "伦敦": "London", "倫敦": "London", "爱丁堡": "Edinburgh",
+    "愛丁堡": "Edinburgh", "都柏林": "Dublin", "罗马": "Rome", "羅馬": "Rome", "佛罗伦萨": "Florence",
+    "佛羅倫斯": "Florence", "威尼斯": "Venice", "米兰": "Milan", "米蘭": "Milan", "那不勒斯": "Naples",
+    "巴塞罗那": "Barcelona", "巴塞隆納": "Barcelona", "马德里": "Madrid", "馬德里": "Madrid", "里斯本": "Lisbon",
+    "雅典": "Athens", "柏林": "Berlin", "慕尼黑": "Munich", "维也纳": "Vienna", "維也納": "Vienna",
+    "布拉格": "Prague", "布达佩斯": "Budapest", "布達佩斯": "Budapest", "阿姆斯特丹": "Amsterdam",
+    "苏黎世": "Zurich", "蘇黎世": "Zurich", "哥本哈根": "Copenhagen", "斯德哥尔摩": "Stockholm",
+    "斯德哥爾摩": "Stockholm", "奥斯陆": "Oslo", "奧斯陸": "Oslo", "赫尔辛基": "Helsinki", "赫爾辛基": "Helsinki",
+    "雷克雅未克": "Reykjavík", "雷克雅維克": "Reykjavík", "纽约": "New York", "紐約": "New York",
+    "洛杉矶": "Los Angeles", "洛杉磯": "Los Angeles", "旧金山": "San Francisco", "舊金山": "San Francisco",
+    "拉斯维加斯": "Las Vegas", "拉斯維加斯": "Las Vegas", "檀香山": "Honolulu", "波士顿": "Boston",
+    "波士頓": "Boston", "芝加哥": "Chicago", "多伦多": "Toronto", "多倫多": "Toronto", "温哥华": "Vancouver",
+    "溫哥華": "Vancouver", "悉尼": "Sydney", "雪梨": "Sydney", "墨尔本": "Melbourne", "墨爾本": "Melbourne",
+    "奥克兰": "Auckland", "奧克蘭": "Auckland", "冰岛": "Iceland", "冰島": "Iceland", "日本": "Japan",
+    "韩国": "South Korea", "韓國": "South Korea", "泰国": "Thailand", "泰國": "Thailand", "越南": "Vietnam",
+    "法国": "France", "法國": "France", "意大利": "Italy", "義大利": "Italy", "英国": "United Kingdom",
+    "英國": "United Kingdom", "西班牙": "Spain", "德国": "Germany", "德國": "Germany", "匈牙利": "Hungary",
+    "美国": "United States", "美國": "United States", "加拿大": "Canada", "澳大利亚": "Australia", "澳洲": "Australia",
+    "中国": "China", "中國": "China", "台湾": "Taiwan", "臺灣": "Taiwan", "台灣": "Taiwan", "孟加拉": "Bangladesh",
+    "孟加拉国": "Bangladesh", "印度": "India", "尼泊尔": "Nepal", "尼泊爾": "Nepal", "马来西亚": "Malaysia",
+    "馬來西亞": "Malaysia", "印度尼西亚": "Indonesia", "印尼": "Indonesia", "土耳其": "Turkey", "希腊": "Greece",
+    "希臘": "Greece", "埃及": "Egypt", "瑞士": "Switzerland", "奥地利": "Austria", "奧地利": "Austria",
+    "葡萄牙": "Portugal", "荷兰": "Netherlands", "荷蘭": "Netherlands",
+}
+
+_FROM_PREFIX_EN = re.compile(
+    r"\b(?:from|leaving(?:\s+from)?|departing(?:\s+from)?|starting\s+(?:from|in)|coming\s+from|based\s+in|"
+    r"live\s+in|living\s+in|out\s+of|flying\s+from)\s+$"
+)
+_TO_PREFIX_EN = re.compile(
+    r"\b(?:to|visit|visiting|see|seeing|in|into|towards|explore|exploring|destination\s+is|going\s+to)\s+$"
+)
+_FROM_PREFIX_ZH = re.compile(r"(?:从|從|自|由)\s*$")
+_FROM_SUFFIX_ZH = re.compile(r"^\s*(?:出发|出發|起飞|起飛|走)")
+_TO_PREFIX_ZH = re.compile(r"(?:去|到|往|前往|飞往|飛往|飞|飛|游|遊|玩)\s*$")
+
+
+class Gazetteer:
+    """Known place names (cities and countries of the city index plus Chinese names) in one regex."""
+
+    def __init__(self, cities: list, aliases: dict = None):
+        self.names = {}  # folded name -> (display name, is country)
+        for city in cities:
+            self.names.setdefault(fold(city["country_name"]), (city["country_name"], True))
+            self.names[fold(city["name"])] = (city["name"], False)
+        for alias, name in (aliases or {}).items():
+            folded = fold(name)
+            self.names[alias] = (self.names.get(folded, (name, False))[0], folded in self.names and self.names[folded][1])
+        pattern = "|".join(re.escape(name) for name in sorted(self.names, key=len, reverse=True))
+        # Latin names need word boundaries; CJK names are usually written without spaces around them
+        self._regex = re.compile(rf"(?<![a-z0-9\u00c0-\u024f'])(?:{pattern})(?![a-z0-9\u00c0-\u024f'])")
+
+    def finditer(self, folded_text: str):
+        for match in self._regex.finditer(folded_text):
+            display, is_country = self.names[match.group()]
+            yield match, display, is_country
+
+
+_gazetteer = None
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer(geo_index.get_city_index().cities, ZH_PLACE_NAMES)
+    return _gazetteer
+
+
+##################################################################
+# Leftover words that do not carry travel information
+##################################################################
+
+FILLER_WORDS = {
+    "i", "i'm", "im", "i'll", "we", "we're", "we'll", "me", "us", "my", "our", "it", "it's", "its", "that", "this",
+    "will", "would", "be", "am", "are", "is", "was", "going", "go", "gonna", "want", "wanna", "like", "plan",
+    "planning", "planned", "think", "hope", "hoping", "travel", "traveling", "travelling", "trip", "journey",
+    "stay", "staying", "there", "for", "about", "around", "roughly", "approximately", "maybe", "probably",
+    "just", "only", "the", "a", "an", "and", "with", "by", "via", "on", "in", "at", "of", "to", "from", "so",
+    "please", "thanks", "thank", "you", "um", "uh", "umm", "hmm", "well", "oh", "yes", "yeah", "yep", "ok",
+    "okay", "sure", "sounds", "good", "great", "leaving", "departing", "starting", "start", "heading", "head",
+    "coming", "visit", "visiting", "actually", "instead", "rather", "change", "make", "let's", "lets",
+    "get", "getting", "mostly", "mainly", "prefer", "preferably", "total", "all",
+    "together", "time", "long", "let", "'s", "'ll", "'m", "'re",
+}
+ZH_FILLERS = sorted({
+    "我们", "我們", "咱们", "咱們", "我", "想要", "想", "要", "会", "會", "打算", "计划", "計劃", "准备", "準備",
+    "大概", "大约", "大約", "左右", "差不多", "可能", "应该", "應該", "吧", "的", "了", "呢", "啊", "呀", "哦",
+    "喔", "嗯", "是", "就", "在", "去", "从", "從", "到", "出发", "出發", "坐", "乘", "搭", "乘坐", "搭乘", "用",
+    "和", "跟", "与", "與", "一起", "旅行", "旅游", "旅遊", "玩", "待", "呆", "住", "时间", "時間", "行程",
+    "好", "好的", "对", "對", "出行", "交通", "方式", "改成", "改为", "改為", "然后", "然後", "主要", "一共",
+    "总共", "總共", "共", "吧", "那", "这", "這", "个", "個", "次", "前往", "出门", "出門",
+}, key=len, reverse=True)
+_EN_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|'[a-z]+")
+
+
+def _is_filler(leftover: str) -> bool:
+    for filler in ZH_FILLERS:
+        leftover = leftover.replace(filler, " ")
+    if _CJK_RE.search(leftover):
+        return False
+    return all(token in FILLER_WORDS for token in _EN_TOKEN_RE.findall(leftover))
+
+
+##################################################################
+# Extraction
+##################################################################
+
+# Words in the assistant's last message that tell which field it asked for
+QUESTION_KEYWORDS = {
+    "from": ("where are you from", "departing", "depart from", "starting from", "starting location", "leaving from",
+             "coming from", "travel from", "traveling from", "travelling from", "出发地", "出發地", "从哪", "從哪"),
+    "to": ("destination", "where to", "where would you like to go", "where are you going", "where do you want to go",
+           "heading to", "目的地", "去哪", "想去"),
+    "traveling_with": ("who", "traveling with", "travelling with", "how many people", "how many of you",
+                       "how many travelers", "how many travellers", "party", "同行", "几位", "幾位", "多少人",
+                       "和谁", "和誰", "几个人", "幾個人"),
+    "when": ("when", "what dates", "travel dates", "which dates", "what time of year", "什么时候", "什麼時候",
+             "何时", "何時", "日期", "哪天"),
+    "duration": ("how long", "how many days", "duration", "多久", "几天", "幾天", "多长", "多長"),
+    "transportation": ("transport", "get around", "getting around", "travel around", "how will you travel",
+                       "how would you like to travel", "car or", "交通", "出行方式"),
+}
+
+
+def expected_fields(assistant_message: str, missing: list) -> set:
+    """Missing fields the assistant's last message asked for (empty when it is not clear)"""
+    if not assistant_message:
+        return set()
+    text = fold(assistant_message)
+    return {
+        field for field, keywords in QUESTION_KEYWORDS.items()
+        if field in missing and any(keyword in text for keyword in keywords)
+    }
+
+
+class _Matches:
+    """Accepted matches over the folded message; matched spans are blanked out so rules never overlap."""
+
+    def __init__(self, message: str):
+        self.original = message
+        self.text = fold(message)
+        self.fields = {}  # field -> [(value, confidence), ...]
+
+    def take(self, span: tuple) -> str:
+        start, end = span
+        surface = self.original[start:end].strip()
+        self.text = self.text[:start] + " " * (end - start) + self.text[end:]
+        return surface
+
+    def add(self, field: str, value: str, confidence: float):
+        self.fields.setdefault(field, []).append((value, confidence))
+
+
+def _extract_when(matches: _Matches, today: datetime.date):
+    for span, date_range in find_dates(matches.text, today):
+        surface = matches.take(span)
+        matches.add("when", f"{surface} ({date_range.iso()})", CONF_EXPLICIT)
+
+
+def _extract_duration(matches: _Matches, expected: set):
+    for span, days, unit in find_durations(matches.text):
+        matches.take(span)
+        # nights and months only approximate the number of days
+        approximate = unit.startswith(("night", "month")) or unit in APPROXIMATE_DURATION_UNITS
+        matches.add("duration", duration_text(days), CONF_WEAK if approximate else CONF_EXPLICIT)
+    if "duration" in expected and expected & {"duration", "traveling_with"} == {"duration"}:
+        bare = re.fullmatch(rf"\s*(?P<count>{EN_NUM}|{ZH_NUM})\s*", matches.text)
+        if bare and parse_number(bare.group("count")):
+            matches.add("duration", duration_text(parse_number(fold(matches.take(bare.span())))), CONF_BARE)
+
+
+def _party_size(match) -> tuple:
+    """(head count, only companions counted) for a run of '2 adults and 1 child' groups"""
+    adults = companions = 0
+    for group_re, units in ((_EN_GROUP_RE, _PARTY_UNITS_EN), (_ZH_GROUP_RE, _PARTY_UNITS_ZH)):
+        for group in group_re.finditer(match.group()):
+            count = parse_number(group.group("count")) or 0
+            if units[group.group("unit")] == "adult":
+                adults += count
+            else:
+                companions += count
+    if adults:
+        return adults + companions, False
+    return companions + 1, True  # "with 2 kids": the speaker comes too
+
+
+def _extract_party(matches: _Matches, language: str, expected: set):
+    for pattern, fixed, confidence in PARTY_RULES:
+        for match in list(pattern.finditer(matches.text)):
+            if fixed is not None:
+                count = fixed
+            elif "count" in pattern.groupindex:
+                count = parse_number(match.group("count"))
+            else:
+                count, companions_only = _party_size(match)
+                if companions_only:
+                    confidence = CONF_WEAK
+            if not count:
+                continue
+            surface = matches.take(match.span())
+            matches.add("traveling_with", _party_value(surface, count, language), confidence)
+    if "traveling_with" in expected and expected & {"duration", "traveling_with"} == {"traveling_with"}:
+        bare = re.fullmatch(rf"\s*(?P<count>{EN_NUM}|{ZH_NUM})\s*", matches.text)
+        if bare and parse_number(bare.group("count")):
+            count = parse_number(fold(matches.take(bare.span())))
+            value = f"{count}人" if language == "chinese" else f"{count} {'person' if count == 1 else 'people'}"
+            matches.add("traveling_with", value, CONF_BARE)
+
+
+def _party_value(surface: str, count: int, language: str) -> str:
+    if language == "chinese":
+        return f"{surface} (共{count}人)"
+    return f"{surface} ({count} {'person' if count == 1 else 'people'})"
+
+
+def _extract_transport(matches: _Matches, language: str):
+    modes = []
+    confidence = CONF_EXPLICIT
+    for mode, en_pattern, zh_pattern in TRANSPORT_RULES:
+        for pattern in (en_pattern, zh_pattern):
+            for match in list(pattern.finditer(matches.text)):
+                if mode not in modes:
+                    modes.append(mode)
+                if not match.group("prefix"):
+                    confidence = min(confidence, 0.85)
+                matches.take(match.span())
+    if modes:
+        labels = [TRANSPORT_MODES[mode][1 if language == "chinese" else 0] for mode in modes]
+        matches.add("transportation", ("和" if language == "chinese" else " and ").join(labels), confidence)
+
+
+def _extract_places(matches: _Matches, expected: set):
+    places = []  # [match, display name, role]
+    for match, display, is_country in list(get_gazetteer().finditer(matches.text)):
+        start, end = match.span()
+        surface = matches.original[start:end]
+        if places and is_country and re.fullmatch(r"\s*,?\s*", matches.text[places[-1][0].end():start]):
+            matches.take(match.span())  # "Dhaka, Bangladesh": the country only qualifies the city before it
+            continue
+        before, after = matches.text[max(0, start - 40):start], matches.text[end:end + 10]
+        if _FROM_PREFIX_EN.search(before) or _FROM_PREFIX_ZH.search(before) or _FROM_SUFFIX_ZH.match(after):
+            role = "from"
+        elif _TO_PREFIX_EN.search(before) or _TO_PREFIX_ZH.search(before):
+            role = "to"
+        elif surface[:1].isupper() or _CJK_RE.match(surface):
+            role = None
+        else:
+            continue  # lowercase common word that happens to be a place ("nice")
+        value = surface if _CJK_RE.match(surface) else display
+        places.append([match, value, role])
+
+    roles = {role for _, _, role in places if role}
+    for place in places:
+        if place[2] is None:
+            open_roles = ({"from", "to"} & expected) - roles if expected else set()
+            if len(open_roles) == 1:
+                place[2] = open_roles.pop()
+            elif roles == {"to"} and len(places) == 2:
+                place[2] = "from"  # "Dhaka to Paris"
+            else:
+                return  # cannot tell origin from destination; leave it to the LLM
+    for match, value, role in places:
+        matches.take(match.span())
+        matches.add(role, value, CONF_EXPLICIT if role in roles else CONF_BARE)
+
+
+def quick_extract(message: str, language: str = "english", expected: set = None, today: datetime.date = None) -> tuple:
+    """Rule-based extraction for short replies.
+
+    Returns (patch, confidence): patch maps travel fields to values in the same
+    format the LLM extraction produces. Confidence is 0 unless the whole message
+    is accounted for by recognised values and filler words, so anything the
+    rules do not understand goes to the LLM.
+    """
+    if not message or len(message) > MAX_MESSAGE_CHARS or "?" in message or "？" in message:
+        return {}, 0.0
+    expected = expected or set()
+    matches = _Matches(message)
+    _extract_when(matches, today or datetime.date.today())
+    _extract_duration(matches, expected)
+    _extract_party(matches, language, expected)
+    _extract_transport(matches, language)
+    _extract_places(matches, expected)
+
+    if not matches.fields or not _is_filler(matches.text):
+        return {}, 0.0
+
+    patch = {}
+    confidence = 1.0
+    for field, found in matches.fields.items():
+        if len({value for value, _ in found}) > 1:
+            return {}, 0.0  # e.g. two different durations
+        value, field_confidence = found[0]
+        if expected and field not in expected:
+            field_confidence *= UNASKED_FACTOR
+        patch[field] = value
+        confidence = min(confidence, field_confidence)
+    return patch, confidence
@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from aiohttp import web
+
+import metrics
+from main import AsyncTravelChatbot
+from session_store import MemorySessionStore
+from test import astream_openai_chat
+
+# Live sessions idle for longer than this are parked in the session store
+PARK_AFTER = 15 * 60
+CLEANUP_INTERVAL = 60
+
+
+class _LiveSession:
+    __slots__ = ("bot", "lock", "last_access")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.lock = asyncio.Lock()
+        self.last_access = time.time()
+
+
+class SessionManager:
+    """Live AsyncTravelChatbot objects, with idle ones parked in a session store."""
+
+    def __init__(self, store=None, park_after: float = PARK_AFTER):
+        self.store = store if store is not None else MemorySessionStore()
+        self.park_after = park_after
+        self.live = {}
+
+    def create(self, language: str) -> tuple:
+        session_id = uuid.uuid4().hex
+        bot = AsyncTravelChatbot(language=language)
+        bot.session_id = session_id
+        self.live[session_id] = _LiveSession(bot)
+        return session_id, bot
+
+    def get(self, session_id: str):
+        session = self.live.get(session_id)
+        if session is None:
+            bot = self.store.load(session_id, AsyncTravelChatbot)
+            if bot is None:
+                return None
+            session = self.live[session_id] = _LiveSession(bot)
+        session.last_access = time.time()
+        return session
+
+    def park_idle(self, now: float = None) -> int:
+        cutoff = (now or time.time()) - self.park_after
+        parked = 0
+        for session_id, session in list(self.live.items()):
+            if session.last_access < cutoff and not session.lock.locked():
+                self.store.save(session_id, session.bot)
+                del self.live[session_id]
+                parked += 1
+        self.store.evict_idle()
+        return parked
+
+
+def _sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def _event_stream(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+    return response
+
+
+def _session_or_404(request: web.Request):
+    session = request.app["sessions"].get(request.match_info["session_id"])
+    if session is None:
+        raise web.HTTPNotFound(text=json.dumps({"error": "unknown session"}), content_type="application/json")
+    return session
+
+
+async def _json_body(request: web.Request) -> dict:
+    if not request.can_read_body:
+        return {}
+    try:
+        return await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "invalid JSON body"}), content_type="application/json")
+
+
+async def start_session(request: web.Request) -> web.Response:
+    body = await _json_body(request)
+    session_id, bot = request.app["sessions"].create(body.get("language", "english"))
+    message = bot.start_conversation()
+    return web.json_response({"session_id": session_id, "message": message, **bot.get_travel_info_json()})
+
+
+async def get_session(request: web.Request) -> web.Response:
+    session = _session_or_404(request)
+    return web.json_response(session.bot.get_travel_info_json())
+
+
+async def send_message(request: web.Request) -> web.StreamResponse:
+    """Stream the assistant reply as SSE 'token' events, then a 'done' event with the trip state"""
+    session = _session_or_404(request)
+    body = await _json_body(request)
+    user_message = (body.get("message") or "").strip()
+
+    async with session.lock:
+        bot = session.bot
+        response = await _event_stream(request)
+        with metrics.session_context(bot.session_id, bot.language):
+            if bot.is_complete() and not bot.confirmed:
+                # Confirmation phase: an acknowledgement, or the change acknowledgement and the updated summary
+                pieces = bot.stream_confirmation(user_message)
+            else:
+                pieces = bot.stream_turn(user_message)
+            async for piece in pieces:
+                await response.write(_sse("token", piece))
+        await response.write(_sse("done", bot.get_travel_info_json()))
+        await response.write_eof()
+        return response
+
+
+async def confirm(request: web.Request) -> web.Response:
+    session = _session_or_404(request)
+    body = await _json_body(request)
+    async with session.lock:
+        with metrics.session_context(session.bot.session_id, session.bot.language):
+            is_confirmed, reply = await session.bot.handle_user_confirmation(body.get("message") or "yes")
+    return web.json_response({"confirmed": is_confirmed, "message": reply, **session.bot.get_travel_info_json()})
+
+
+async def generate_itinerary(request: web.Request) -> web.StreamResponse:
+    """Stream itinerary sections as SSE 'section' events as soon as each one is complete"""
+    session = _session_or_404(request)
+    body = await _json_body(request)
+    bot = session.bot
+    if not bot.is_complete():
+        raise web.HTTPConflict(text=json.dumps({"error": "travel information is incomplete", **bot.get_travel_info_json()}),
+                               content_type="application/json")
+
+    async with session.lock:
+        with metrics.session_context(bot.session_id, bot.language):
+            await bot.ensure_trip_description()
+        travel_data = bot.get_travel_info_json()
+
+    response = await _event_stream(request)
+    with metrics.session_context(bot.session_id, bot.language):
+        language = body.get("language", bot.language)
+        async for path, section in astream_openai_chat(travel_data, {"hotels": body.get("hotels", [])}, language):
+            await response.write(_sse("section", {"path": path, "section": section}))
+    await response.write(_sse("done", {}))
+    await response.write_eof()
+    return response
+
+
+async def get_trace(request: web.Request) -> web.Response:
+    """Per-stage spans recorded for one session (timings, token usage, cache hits, errors)"""
+    session_id = request.match_info["session_id"]
+    return web.Response(text=metrics.traces.dump(session_id), content_type="application/json")
+
+
+async def get_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+
+async def _park_idle_sessions(app: web.Application):
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL)
+        app["sessions"].park_idle()
+
+
+async def _start_background(app: web.Application):
+    app["cleanup"] = asyncio.create_task(_park_idle_sessions(app))
+
+
+async def _stop_background(app: web.Application):
+    app["cleanup"].cancel()
+
+
+def create_app(sessions: SessionManager = None) -> web.Application:
+    app = web.Application()
+    app["sessions"] = sessions or SessionManager()
+    app.router.add_post("/sessions", start_session)
+    app.router.add_get("/sessions/{session_id}", get_session)
+    app.router.add_post("/sessions/{session_id}/messages", send_message)
+    app.router.add_post("/sessions/{session_id}/confirm", confirm)
+    app.router.add_post("/sessions/{session_id}/itinerary", generate_itinerary)
+    app.router.add_get("/sessions/{session_id}/trace", get_trace)
+    app.router.add_get("/metrics", get_metrics)
+    app.on_startup.append(_start_background)
+    app.on_cleanup.append(_stop_background)
+    return app
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Travel planner HTTP service")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    args = arg_parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+TRAVEL_FIELDS = (
+    'from', 'to', 'traveling_with', 'when', 'duration', 'purpose', 'transportation', 'descriptions of the trip'
+)
+_ROLE_CODES = {"user": "u", "assistant": "a", "system": "s"}
+_ROLES = {code: role for role, code in _ROLE_CODES.items()}
+
+
+class SessionState:
+    """Slim, serialisable snapshot of one TravelChatbot conversation."""
+
+    __slots__ = (
+        "session_id", "language", "travel_values", "collected", "history",
+        "summary", "confirmed", "incremental", "last_access",
+    )
+
+    def __init__(self, session_id, language, travel_values, collected, history, summary=None,
+                 confirmed=False, incremental=True, last_access=None):
+        self.session_id = session_id
+        self.language = language
+        self.travel_values = travel_values  # values in TRAVEL_FIELDS order
+        self.collected = collected  # bitmask over TRAVEL_FIELDS
+        self.history = history  # [(role code, content), ...]
+        self.summary = summary
+        self.confirmed = confirmed
+        self.incremental = incremental
+        self.last_access = time.time() if last_access is None else last_access
+
+    @classmethod
+    def from_bot(cls, session_id: str, bot) -> "SessionState":
+        bot._apply_compaction()
+        collected = 0
+        for i, field in enumerate(TRAVEL_FIELDS):
+            if field in bot.collected_info:
+                collected |= 1 << i
+        return cls(
+            session_id=session_id,
+            language=bot.language,
+            travel_values=[bot.travel_info.get(field) for field in TRAVEL_FIELDS],
+            collected=collected,
+            history=[(_ROLE_CODES[msg["role"]], msg["content"]) for msg in bot.conversation_history],
+            summary=bot.history_summary,
+            confirmed=bot.confirmed,
+            incremental=bot.incremental_extraction,
+        )
+
+    def to_bot(self, bot_cls, **kwargs):
+        """Rebuild a chatbot of bot_cls (TravelChatbot or AsyncTravelChatbot) from this state"""
+        bot = bot_cls(language=self.language, incremental_extraction=self.incremental, **kwargs)
+        bot.travel_info = dict(zip(TRAVEL_FIELDS, self.travel_values))
+        bot.collected_info = {field for i, field in enumerate(TRAVEL_FIELDS) if self.collected >> i & 1}
+        bot.conversation_history = [{"role": _ROLES[role], "content": content} for role, content in self.history]
+        bot.history_summary = self.summary
+        bot.confirmed = self.confirmed
+        bot.session_id = self.session_id
+        return bot
+
+    def to_bytes(self) -> bytes:
+        payload = [
+            self.session_id, self.language, self.travel_values, self.collected, self.history,
+            self.summary, int(self.confirmed), int(self.incremental), round(self.last_access, 3),
+        ]
+        return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SessionState":
+        (session_id, language, travel_values, collected, history,
+         summary, confirmed, incremental, last_access) = json.loads(zlib.decompress(data))
+        return cls(session_id, language, travel_values, collected, [tuple(item) for item in history],
+                   summary, bool(confirmed), bool(incremental), last_access)
+
+
+class MemorySessionStore:
+    """In-memory LRU of compressed session snapshots.
+
+    Sessions are evicted least-recently-used first when max_sessions or max_bytes
+    is exceeded, and by age after idle_ttl seconds. Evicted sessions are handed
+    to `overflow` (e.g. a SQLiteSessionStore) when one is given, otherwise dropped.
+    """
+
+    def __init__(self, max_sessions: int = 50_000, max_bytes: int = 256 * 1024 * 1024,
+                 idle_ttl: float = 24 * 3600, overflow=None):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.overflow = overflow
+        self._data = OrderedDict()  # session_id -> (last_access, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def save(self, session_id: str, bot):
+        self.save_state(SessionState.from_bot(session_id, bot))
+
+    def save_state(self, state: SessionState):
+        data = state.to_bytes()
+        with self._lock:
+            previous = self._data.pop(state.session_id, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._data[state.session_id] = (state.last_access, data)
+            self._bytes += len(data)
+            evicted = self._evict_over_capacity()
+        self._spill(evicted)
+
+    def load(self, session_id: str, bot_cls, **kwargs):
+        state = self.load_state(session_id)
+        return state.to_bot(bot_cls, **kwargs) if state is not None else None
+
+    def load_state(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is not None:
+                # A load counts as access: refresh the stored timestamp so evict_idle keeps the session
+                self._data[session_id] = (now, entry[1])
+                self._data.move_to_end(session_id)
+                state = SessionState.from_bytes(entry[1])
+                state.last_access = now
+                return state
+        if self.overflow is None:
+            return None
+        state = self.overflow.load_state(session_id)
+        if state is not None:
+            # Promote the session back into memory; its overflow copy is replaced on the next spill
+            state.last_access = now
+            self.save_state(state)
+        return state
+
+    def delete(self, session_id: str):
+        with self._lock:
+            entry = self._data.pop(session_id, None)
+            if entry is not None:
+                self._bytes -= len(entry[1])
+        if self.overflow is not None:
+            self.overflow.delete(session_id)
+
+    def _evict_over_capacity(self) -> list:
+        evicted = []
+        while self._data and (len(self._data) > self.max_sessions or self._bytes > self.max_bytes):
+            session_id, (_, data) = self._data.popitem(last=False)
+            self._bytes -= len(data)
+            evicted.append(data)
+        return evicted
+
+    def evict_idle(self, now: float = None) -> int:
+        """Evict sessions idle for longer than idle_ttl; returns how many were evicted"""
+        cutoff = (now or time.time()) - self.idle_ttl
+        evicted = []
+        with self._lock:
+            for session_id in [sid for sid, (last_access, _) in self._data.items() if last_access < cutoff]:
+                _, data = self._data.pop(session_id)
+                self._bytes -= len(data)
+                evicted.append(data)
+        self._spill(evicted)
+        return len(evicted)
+
+    def _spill(self, evicted: list):
+        if self.overflow is not None:
+            for data in evicted:
+                self.overflow.save_state(SessionState.from_bytes(data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._data), "bytes": self._bytes}
+
+
+class SQLiteSessionStore:
+    """Local on-disk session store (compressed snapshots in SQLite) with idle eviction."""
+
+    def __init__(self, path: str, idle_ttl: float = 30 * 24 * 3600):
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, data BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self._conn.commit()
+
+    def save(self, session_id: str, bot):
+        self.save_state(SessionState.from_bot(session_id, bot))
+
+    def save_state(self, state: SessionState):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, last_access) VALUES (?, ?, ?)",
+                (state.session_id, state.to_bytes(), state.last_access),
+            )
+            self._conn.commit()
+
+    def load(self, session_id: str, bot_cls, **kwargs):
+        state = self.load_state(session_id)
+        return state.to_bot(bot_cls, **kwargs) if state is not None else None
+
+    def load_state(self, session_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        state = SessionState.from_bytes(row[0])
+        state.last_access = time.time()
+        return state
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def evict_idle(self, now: float = None) -> int:
+        cutoff = (now or time.time()) - self.idle_ttl
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
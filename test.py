@@ -1,11 +1,20 @@
 import openai
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
 from rich.markdown import Markdown
 import os
 from dotenv import load_dotenv
 import json
-from datetime import datetime
-from dateutil import parser
+from datetime import date, timedelta
+from date_normalizer import normalize_duration, normalize_when
+from hotel_ranking import rank_hotels
+from json_stream import JSONSectionStream, loads_lenient
+from prompt_budget import PromptBudget
+from prompts import ITINERARY, ITINERARY_CHUNK, ITINERARY_LANGUAGE_INSTRUCTIONS, ITINERARY_PLAN, ITINERARY_REQUEST
+from llm_client import chat_completion, achat_completion
+from translation import PIVOT_LANGUAGE, atranslate_itinerary, atranslate_stream, needs_translation, translate_itinerary, translate_section
 
 load_dotenv()
 
@@ -15,7 +24,26 @@ openai.api_key = OPENAI_API_KEY
 
 console = Console()
 
-def call_openai_chat(travel_data, hotels_data, language: str = None):
+# Number of ranked hotels embedded in the itinerary prompt
+MAX_PROMPT_HOTELS = 5
+
+# Output cap of the single-call itinerary request
+ITINERARY_MAX_TOKENS = 4000
+
+# Smallest context window among the routable itinerary models (gpt-4 class); the prompt gets
+# what is left after reserving the output cap, so the completion is never squeezed by the prompt
+ITINERARY_CONTEXT_TOKENS = 8192
+
+# Token budgets for the flexible sections of the itinerary prompt
+ITINERARY_SECTION_BUDGETS = {"description": 600, "hotels": 1200}
+
+
+def _warn_if_truncated(response):
+    if response.choices and response.choices[0].get("finish_reason") == "length":
+        console.print("[yellow]Warning: itinerary hit the max_tokens limit and is truncated[/yellow]")
+
+def _itinerary_context(travel_data, hotels_data, language: str = None) -> dict:
+    """Prompt inputs shared by the single-call and chunked itinerary requests."""
     # Extract data from the travel_info dictionary
     travel_info = travel_data["travel_info"]
     destination = travel_info["to"]
@@ -44,18 +72,16 @@ def call_openai_chat(travel_data, hotels_data, language: str = None):
     if language not in supported_languages:
         language = "english"
 
-    if language == "chinese":
-        language_instruction = "Please use ONLY in Traditional Chinese for creating  this entire travel plan."
-    else:
-        language_instruction = "Please use ONLY in English for creating this entire travel plan."
+    language_instruction = ITINERARY_LANGUAGE_INSTRUCTIONS[language]
 
 ##############################################################
-    # Dynamically parse and format travel_dates
-    try:
-        dt = parser.parse(travel_dates, fuzzy=True, default=datetime.now())
-        formatted_date = dt.strftime("%B %Y")
-    except Exception:
-        formatted_date = travel_dates 
+    # Format travel_dates from the normalised dates (parsed once by the chatbot when available)
+    if travel_data.get("travel_dates"):
+        start_date = date.fromisoformat(travel_data["travel_dates"]["start"])
+    else:
+        normalized = normalize_when(travel_dates)
+        start_date = normalized.start if normalized else None
+    formatted_date = start_date.strftime("%B %Y") if start_date else travel_dates
     
     # Create a dynamic traveler profile based on the description
     traveler_profile = ""
@@ -87,175 +113,474 @@ def call_openai_chat(travel_data, hotels_data, language: str = None):
     else:
         activity_string = activity_preferences[0]
     
-    # Filter hotels suitable for the destination and group
+    # Select the best few hotels for the group (required facilities, amenities, budget)
     suitable_hotels = []
     if hotels_data and "hotels" in hotels_data:
-        for hotel in hotels_data["hotels"]:
-            # Check if hotel is suitable based on tags and group needs
-            is_suitable = True
-            if has_elderly and "Facilities for disabled guests" not in hotel["tags"]:
-                is_suitable = False
-            if is_family and "Family rooms" not in hotel["tags"]:
-                is_suitable = False
-            if is_suitable:
-                suitable_hotels.append({
-                    "name": hotel["hotel_name"],
-                    "url": hotel["hotel_url"],
-                    "image": hotel["hotel_image"],
-                    "price": hotel["offer_price"],
-                    "tags": hotel["tags"]
-                })
+        suitable_hotels = rank_hotels(hotels_data["hotels"], description, has_elderly, is_family, k=MAX_PROMPT_HOTELS)
     
+    context = {
+        "language_instruction": language_instruction,
+        "destination": destination,
+        "origin": origin,
+        "group_size": group_size,
+        "trip_duration": trip_duration,
+        "travel_dates": travel_dates,
+        "transportation": transportation,
+        "purpose": purpose,
+        "start_date": start_date,
+        "formatted_date": formatted_date,
+        "traveler_profile": traveler_profile if traveler_profile else "a group of travelers ",
+        "activity_string": activity_string,
+        "prompt_description": "",
+        "hotel_info": "",
+    }
+
+    # Charge the instructions and trip details first, then fit the description and hotel data
+    # into their budgets (compact tabular hotels, trimming tags and then dropping the
+    # lowest-ranked hotels when over budget)
+    budget = PromptBudget(ITINERARY_CONTEXT_TOKENS - ITINERARY_MAX_TOKENS, ITINERARY_SECTION_BUDGETS)
+    budget.add_fixed("instructions", tokens=ITINERARY.count_tokens(**context) + ITINERARY_REQUEST.count_tokens(**context))
+    prompt_description = budget.fit_text("description", description)
+    # The description is repeated in the request message
+    budget.add_fixed("description", prompt_description)
+    hotel_info = ""
+    if suitable_hotels:
+        hotel_info, _ = budget.fit_hotels("hotels", suitable_hotels)
+    if budget.remaining() < 0:
+        console.print(f"[yellow]Warning: itinerary prompt is over its token budget: {budget.report()}[/yellow]")
+
     # If no suitable hotels found, provide a fallback message
-    if not suitable_hotels:
+    if not hotel_info:
         hotel_info = "No specific hotel recommendations are available for this destination. Please choose accommodations that suit your group's needs, such as accessibility or family-friendly options."
-    else:
-        hotel_info = json.dumps(suitable_hotels, indent=2)
-    
-    # Create a dynamic system prompt based on the travel data and hotel data
-    base_prompt = f"""
-        You are a professional AI travel planner, inspired by Layla.ai, tasked with creating a personalized {trip_duration} travel itinerary. Your goal is to craft an engaging, narrative-style itinerary written as if by a seasoned travel editor for an online itinerary generator. The itinerary should feel immersive, practical, and tailored to the travelers' preferences, with descriptions and real-world logistics.
-
-        Create a travel plan for travelers from {origin} to {destination} for {trip_duration}, starting {formatted_date}, for {group_size}, with the purpose to "{purpose}".
-
-        The following description provides key information about the trip:
-        "{description}"
-
-        Based on this information, this is {traveler_profile if traveler_profile else "a group of travelers "} looking for {activity_string}. They plan to use {transportation} as their primary mode of transportation during the trip.
-
-        **Hotel Data**:
-        Below is a list of available hotels for the trip. Use this data to recommend specific accommodations, including the hotel name, URL, image link, price, and relevant features (e.g., accessibility, family-friendly). Ensure the selected hotels align with the group's needs (e.g., accessibility for elderly, family rooms for families). If no suitable hotels are available, suggest checking reputable booking platforms for accommodations that meet the group's needs.
-
-        {hotel_info}
-
-        **Guidelines**:
-        - Use real locations, realistic logistics, and vivid descriptions to create an immersive and practical travel experience.
-        - For each key location in the itinerary, recommend one hotel accommodation that best fits the group and trip purpose.
-        - Under each location section, include an "Accommodations" subsection with organized hotel details:
-          - Hotel name
-          - URL
-          - Image link
-          - Price
-          - Features (tags)
-        - In the itinerary section, provide detailed, engaging day-by-day activities descriptions **without mentioning any prices**.
-        - Ensure the pace and activities are appropriate for the traveler profile (e.g., slower pace for elderly, engaging activities for families).
-        - Recommend real restaurants with local specialties and estimated price ranges.
-        - Provide practical travel tips specific to {destination} for travelers from {origin}.
-        - Consider seasonal factors for {formatted_date} in {destination} (e.g., cherry blossom season in Kyoto in April).
-        - Include realistic travel times and logistics using {transportation}.
-        - Write in a detailed, well structured narrative style that captures the experience of each day, similar to Layla.ai's engaging and user-focused tone.
-        - For splurge experiences (if mentioned in the description), recommend one or two high-end activities or dining options.
-        - Ensure the total estimated cost includes transportation, accommodations (using provided hotel prices), activities, and dining.
-
-        **Response Structure**:
-
-        ### [Dynamic Title Based on User Input]
-        **Total Estimated Cost**: [Rough total for transport, accommodations, activities, and dining] (Give a short brackdown) 
-        **Travel Dates**: [{formatted_date}]  
-        **Group Size**: [{group_size}]  
-        **Destinations**: [List key locations in {destination}]
-
-        ---
-
-        ### 📍 [Location Name], {destination} (Days X–Y)
-
-        A 2–3 sentence overview of the destination's unique appeal and why it's suitable for this specific group.
-
-        #### 🏨 Accommodations
-        - **Hotel Name**: [Hotel name]
-        - **URL**: [Hotel URL]
-        - **Image**: [Hotel image link]
-        - **Price**: [Hotel price]
-        - **Features**: [Relevant hotel features]
-
-        ---
-
-        #### 📅 Itinerary
-
-        **Day X: [Descriptive Day Title] – [Date]**
-
-        Narrative description of the day's activities, accommodations, dining, and travel tips.  (give a well descriptive and extended personalized detailed plan for each days activity description)
-        **Travel Time**: [Transportation details]
-
-        (Repeat for each day with logical flow through locations and activities.)
-
-        **Output Format**:
-         Return the response as a valid JSON object following the structure below.
-
-        
-
-        ```json
-        {{
-            "trip_overview": {{
-                "title": "[Dynamic Title]",
-                "total_estimated_cost": "[Cost]",
-                "travel_dates": "[Dates]",
-                "group_size": "[Size]",
-                "destinations": ["[Destination]"]
-            }},
-            "locations": [
-                {{
-                    "location": "[Location Name]",
-                    "overview": "[Overview Description]"
-                    "accommodations":[ 
-                        {{
-                            "hotel_name": "[Hotel Name]",
-                            "full_hotel_name": "[Full Hotel Name]",
-                            "url": "[Hotel URL]",
-                            "image": "[Image URL]",
-                            "price": "[Price]",
-                            "features": "[Features]"
-                        }},
-                        ]
-                    "itinerary": [
-                        {{
-                            "day": "[Day Number]",
-                            "title": "[Day Title]",
-                            "date": "[Date]",
-                            "description": "[Description]",
-                            "travel_time": "[Travel Time]"
-                        }}
-                }}
-            "additional_info": [
-                {{
-                    "tips":"[description]"
-                }}            
-            ]
-        }}
 
+    return dict(context, prompt_description=prompt_description, hotel_info=hotel_info)
 
-    """
-#New system_prompt#
-##################
 
-    system_prompt =  language_instruction + "\n\n" + base_prompt
+def build_itinerary_messages(travel_data, hotels_data, language: str = None):
+    """Build the system/user messages for the itinerary request (shared by the sync and async callers)."""
+    context = _itinerary_context(travel_data, hotels_data, language)
+    return [
+        {"role": "system", "content": ITINERARY.render(**context)},
+        {"role": "user", "content": ITINERARY_REQUEST.render(**context)}
+    ]
 
-    
+
+def _parse_itinerary(text):
+    """Itinerary JSON text as a dict; None when missing or unparseable"""
+    try:
+        itinerary = loads_lenient(text) if text else None
+    except ValueError:
+        return None
+    return itinerary if isinstance(itinerary, dict) else None
 
 
-    # Create a user input message that summarizes the travel request
-    user_input = f"""Please create a {trip_duration} itinerary for {group_size} traveling from {origin} to {destination} starting {travel_dates}. 
+def call_openai_chat(travel_data, hotels_data, language: str = None, chunked: bool = None):
+    """Generate the itinerary JSON; long trips (or chunked=True) use the parallel chunked mode.
+
+    Other languages are translated from the pivot-language itinerary, section by section.
+    """
+    if needs_translation(language):
+        itinerary = _parse_itinerary(call_openai_chat(travel_data, hotels_data, PIVOT_LANGUAGE, chunked))
+        if itinerary is not None:
+            return json.dumps(translate_itinerary(itinerary, language), ensure_ascii=False, indent=2)
+    if _use_chunked(travel_data, chunked):
+        itinerary = call_openai_chat_chunked(travel_data, hotels_data, language)
+        if itinerary is not None:
+            return itinerary
+    messages = build_itinerary_messages(travel_data, hotels_data, language)
+
+    try:
+        response = chat_completion(
+            task="itinerary",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=ITINERARY_MAX_TOKENS
+        )
+        _warn_if_truncated(response)
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        console.print(f"[red]Error calling OpenAI API: {str(e)}[/red]")
+        return None
 
-    The travelers have described their trip as follows:
-    "{description}"
-    
-    They want to {purpose} and will primarily use {transportation} for getting around. Please create a personalized travel plan that meets their specific needs and interests, incorporating the provided hotel data for accommodation recommendations."""
+
+async def async_call_openai_chat(travel_data, hotels_data, language: str = None, chunked: bool = None):
+    """Awaitable counterpart of call_openai_chat for use inside an event loop."""
+    if needs_translation(language):
+        itinerary = _parse_itinerary(await async_call_openai_chat(travel_data, hotels_data, PIVOT_LANGUAGE, chunked))
+        if itinerary is not None:
+            return json.dumps(await atranslate_itinerary(itinerary, language), ensure_ascii=False, indent=2)
+    if _use_chunked(travel_data, chunked):
+        itinerary = await async_call_openai_chat_chunked(travel_data, hotels_data, language)
+        if itinerary is not None:
+            return itinerary
+    messages = build_itinerary_messages(travel_data, hotels_data, language)
 
     try:
-        response = openai.ChatCompletion.create(
-            model = "gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt.strip()},
-                {"role": "user", "content": user_input.strip()}
-            ],
+        response = await achat_completion(
+            task="itinerary",
+            messages=messages,
             temperature=0.7,
-            max_tokens=4000  # Increased to accommodate detailed itinerary
+            max_tokens=ITINERARY_MAX_TOKENS
         )
+        _warn_if_truncated(response)
         return response.choices[0].message.content.strip()
     except Exception as e:
         console.print(f"[red]Error calling OpenAI API: {str(e)}[/red]")
         return None
 
+def stream_openai_chat(travel_data, hotels_data, language: str = None, chunked: bool = None):
+    """Stream the itinerary, yielding (path, section) as soon as each JSON section closes.
+
+    Paths are "trip_overview", "locations[].itinerary[]" (one day), "locations[]",
+    "additional_info[]" and finally "" for the complete document.
+    """
+    if needs_translation(language):
+        for path, section in stream_openai_chat(travel_data, hotels_data, PIVOT_LANGUAGE, chunked):
+            yield path, translate_section(section, language)
+        return
+    if _use_chunked(travel_data, chunked):
+        started = False
+        try:
+            for section in iter_chunked_itinerary(travel_data, hotels_data, language):
+                started = True
+                yield section
+            return
+        except Exception as e:
+            console.print(f"[red]Error generating chunked itinerary: {str(e)}[/red]")
+            if started:
+                return
+    messages = build_itinerary_messages(travel_data, hotels_data, language)
+    sections = JSONSectionStream()
+
+    try:
+        response = chat_completion(
+            task="itinerary",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=ITINERARY_MAX_TOKENS,
+            stream=True
+        )
+        for chunk in response:
+            content = chunk.choices[0].delta.get("content") if chunk.choices else None
+            if content:
+                yield from sections.feed(content)
+    except Exception as e:
+        console.print(f"[red]Error calling OpenAI API: {str(e)}[/red]")
+
+
+async def astream_openai_chat(travel_data, hotels_data, language: str = None, chunked: bool = None):
+    """Async generator counterpart of stream_openai_chat."""
+    if needs_translation(language):
+        async for section in atranslate_stream(astream_openai_chat(travel_data, hotels_data, PIVOT_LANGUAGE, chunked), language):
+            yield section
+        return
+    if _use_chunked(travel_data, chunked):
+        started = False
+        try:
+            async for section in aiter_chunked_itinerary(travel_data, hotels_data, language):
+                started = True
+                yield section
+            return
+        except Exception as e:
+            console.print(f"[red]Error generating chunked itinerary: {str(e)}[/red]")
+            if started:
+                return
+    messages = build_itinerary_messages(travel_data, hotels_data, language)
+    sections = JSONSectionStream()
+
+    try:
+        response = await achat_completion(
+            task="itinerary",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=ITINERARY_MAX_TOKENS,
+            stream=True
+        )
+        async for chunk in response:
+            content = chunk.choices[0].delta.get("content") if chunk.choices else None
+            if content:
+                for section in sections.feed(content):
+                    yield section
+    except Exception as e:
+        console.print(f"[red]Error calling OpenAI API: {str(e)}[/red]")
+
+##################################################################
+# Chunked generation for long trips
+##################################################################
+
+# Trips of at least this many days are planned first and then detailed per location concurrently
+CHUNKED_MIN_DAYS = 6
+
+# Most days written by one detail request (longer stays are split into day blocks)
+MAX_CHUNK_DAYS = 4
+
+MAX_CHUNK_CONCURRENCY = 6
+PLAN_MAX_TOKENS = 1500
+CHUNK_TOKENS_PER_DAY = 500
+
+
+def _use_chunked(travel_data, chunked: bool = None) -> bool:
+    if chunked is not None:
+        return chunked
+    days = normalize_duration(travel_data["travel_info"].get("duration"))
+    return bool(days) and days >= CHUNKED_MIN_DAYS
+
+
+def build_plan_messages(context: dict, total_days: int = None):
+    """Messages for the planning request: overview, locations with day ranges, hotels and tips, but no days."""
+    return [
+        {"role": "system", "content": ITINERARY_PLAN.render(total_days=total_days or context["trip_duration"], **context)},
+        {"role": "user", "content": ITINERARY_REQUEST.render(**context)}
+    ]
+
+
+def build_chunk_messages(context: dict, plan: dict, location_index: int, first_day: int, last_day: int):
+    """Messages for the day-by-day detail of one location (or one block of its days)."""
+    location = plan["locations"][location_index]
+    route = " → ".join(
+        f"{loc.get('location')} (days {loc['_days'][0]}–{loc['_days'][1]})" for loc in plan["locations"]
+    )
+    hotels = ", ".join(hotel.get("hotel_name", "") for hotel in location.get("accommodations") or [] if isinstance(hotel, dict))
+    if isinstance(context["start_date"], date):
+        dates = "; ".join(
+            f"Day {day}: {(context['start_date'] + timedelta(days=day - 1)).isoformat()}"
+            for day in range(first_day, last_day + 1)
+        )
+    else:
+        dates = f"the trip starts {context['formatted_date']}"
+    system_prompt = ITINERARY_CHUNK.render(
+        title=plan.get("trip_overview", {}).get("title", ""),
+        route=route,
+        first_day=first_day,
+        last_day=last_day,
+        location=location.get("location"),
+        overview=location.get("overview", ""),
+        hotels=hotels or "as planned",
+        dates=dates,
+        **context
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Please write days {first_day} to {last_day} in {location.get('location')}."}
+    ]
+
+
+def _parse_plan(text: str):
+    try:
+        plan = loads_lenient(text)
+    except ValueError:
+        return None
+    if not isinstance(plan, dict) or not isinstance(plan.get("locations"), list):
+        return None
+    plan["locations"] = [loc for loc in plan["locations"] if isinstance(loc, dict)]
+    return plan if plan["locations"] else None
+
+
+def _assign_day_ranges(plan: dict, total_days: int = None):
+    """Store each location's (first, last) day as "_days"; splits the trip evenly when the plan's ranges are unusable"""
+    locations = plan["locations"]
+    ranges, expected = [], 1
+    for location in locations:
+        try:
+            first, last = int(location["days"][0]), int(location["days"][-1])
+        except (KeyError, TypeError, ValueError, IndexError):
+            break
+        if first != expected or last < first:
+            break
+        ranges.append((first, last))
+        expected = last + 1
+    if len(ranges) != len(locations) or (total_days and expected - 1 != total_days):
+        total = total_days or max(len(locations), expected - 1)
+        bounds = [round(i * total / len(locations)) for i in range(len(locations) + 1)]
+        ranges = [(bounds[i] + 1, max(bounds[i] + 1, bounds[i + 1])) for i in range(len(locations))]
+    for location, day_range in zip(locations, ranges):
+        location["_days"] = day_range
+
+
+def _chunk_requests(context: dict, plan: dict) -> list:
+    """(location index, messages, max_tokens) for every day block of every location"""
+    requests = []
+    for index, location in enumerate(plan["locations"]):
+        first, last = location["_days"]
+        for block_start in range(first, last + 1, MAX_CHUNK_DAYS):
+            block_end = min(last, block_start + MAX_CHUNK_DAYS - 1)
+            max_tokens = min(4000, CHUNK_TOKENS_PER_DAY * (block_end - block_start + 1) + 200)
+            requests.append((index, build_chunk_messages(context, plan, index, block_start, block_end), max_tokens))
+    return requests
+
+
+def _parse_chunk(text: str) -> list:
+    try:
+        chunk = loads_lenient(text)
+    except ValueError:
+        console.print("[yellow]Warning: could not parse an itinerary chunk; its days are left out[/yellow]")
+        return []
+    if isinstance(chunk, dict):
+        chunk = chunk.get("itinerary", [])
+    return [day for day in chunk if isinstance(day, dict)] if isinstance(chunk, list) else []
+
+
+def _merged_location(location: dict, days: list) -> dict:
+    merged = {key: value for key, value in location.items() if key not in ("days", "_days", "itinerary")}
+    merged.setdefault("accommodations", [])
+    merged["itinerary"] = days
+    return merged
+
+
+def _merge_itinerary(plan: dict, location_days: list) -> dict:
+    """The chunked results in the same JSON schema as the single-call itinerary"""
+    return {
+        "trip_overview": plan.get("trip_overview", {}),
+        "locations": [_merged_location(location, days) for location, days in zip(plan["locations"], location_days)],
+        "additional_info": plan.get("additional_info", []),
+    }
+
+
+def _plan_params(context: dict, total_days: int = None) -> dict:
+    return dict(
+        messages=build_plan_messages(context, total_days),
+        temperature=0.7,
+        max_tokens=PLAN_MAX_TOKENS
+    )
+
+
+def _chunk_params(messages: list, max_tokens: int) -> dict:
+    return dict(messages=messages, temperature=0.7, max_tokens=max_tokens)
+
+
+def _request_plan(context: dict, total_days: int = None):
+    response = chat_completion(task="itinerary_plan", **_plan_params(context, total_days))
+    plan = _parse_plan(response.choices[0].message.content)
+    if plan is not None:
+        _assign_day_ranges(plan, total_days)
+    return plan
+
+
+async def _arequest_plan(context: dict, total_days: int = None):
+    response = await achat_completion(task="itinerary_plan", **_plan_params(context, total_days))
+    plan = _parse_plan(response.choices[0].message.content)
+    if plan is not None:
+        _assign_day_ranges(plan, total_days)
+    return plan
+
+
+def _request_chunk(messages: list, max_tokens: int) -> list:
+    try:
+        response = chat_completion(task="itinerary_chunk", **_chunk_params(messages, max_tokens))
+        _warn_if_truncated(response)
+        return _parse_chunk(response.choices[0].message.content)
+    except Exception as e:
+        console.print(f"[red]Error generating itinerary chunk: {str(e)}[/red]")
+        return []
+
+
+async def _arequest_chunk(semaphore: asyncio.Semaphore, messages: list, max_tokens: int) -> list:
+    async with semaphore:
+        try:
+            response = await achat_completion(task="itinerary_chunk", **_chunk_params(messages, max_tokens))
+            _warn_if_truncated(response)
+            return _parse_chunk(response.choices[0].message.content)
+        except Exception as e:
+            console.print(f"[red]Error generating itinerary chunk: {str(e)}[/red]")
+            return []
+
+
+def _location_results(plan: dict, requests: list, results: list):
+    """Yield (location index, days) in plan order, waiting on each location's chunk results (callables)"""
+    for index in range(len(plan["locations"])):
+        days = []
+        for (request_index, _, _), result in zip(requests, results):
+            if request_index == index:
+                days.extend(result())
+        yield index, days
+
+
+def iter_chunked_itinerary(travel_data, hotels_data, language: str = None):
+    """Plan the trip, then detail every location concurrently; yields sections like stream_openai_chat.
+
+    Raises ValueError when the planning response is unusable.
+    """
+    context = _itinerary_context(travel_data, hotels_data, language)
+    total_days = normalize_duration(context["trip_duration"])
+    plan = _request_plan(context, total_days)
+    if plan is None:
+        raise ValueError("unusable itinerary plan")
+    yield "trip_overview", plan.get("trip_overview", {})
+
+    requests = _chunk_requests(context, plan)
+    location_days = []
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CHUNK_CONCURRENCY, len(requests)))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, _request_chunk, messages, max_tokens)
+            for _, messages, max_tokens in requests
+        ]
+        for index, days in _location_results(plan, requests, [future.result for future in futures]):
+            location_days.append(days)
+            yield from (("locations[].itinerary[]", day) for day in days)
+            yield "locations[]", _merged_location(plan["locations"][index], days)
+
+    yield from (("additional_info[]", tip) for tip in plan.get("additional_info", []))
+    yield "", _merge_itinerary(plan, location_days)
+
+
+async def aiter_chunked_itinerary(travel_data, hotels_data, language: str = None):
+    """Async generator counterpart of iter_chunked_itinerary."""
+    context = _itinerary_context(travel_data, hotels_data, language)
+    total_days = normalize_duration(context["trip_duration"])
+    plan = await _arequest_plan(context, total_days)
+    if plan is None:
+        raise ValueError("unusable itinerary plan")
+    yield "trip_overview", plan.get("trip_overview", {})
+
+    requests = _chunk_requests(context, plan)
+    semaphore = asyncio.Semaphore(MAX_CHUNK_CONCURRENCY)
+    tasks = [asyncio.ensure_future(_arequest_chunk(semaphore, messages, max_tokens)) for _, messages, max_tokens in requests]
+    try:
+        location_days = []
+        for index in range(len(plan["locations"])):
+            days = []
+            for (request_index, _, _), task in zip(requests, tasks):
+                if request_index == index:
+                    days.extend(await task)
+            location_days.append(days)
+            for day in days:
+                yield "locations[].itinerary[]", day
+            yield "locations[]", _merged_location(plan["locations"][index], days)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    for tip in plan.get("additional_info", []):
+        yield "additional_info[]", tip
+    yield "", _merge_itinerary(plan, location_days)
+
+
+def call_openai_chat_chunked(travel_data, hotels_data, language: str = None):
+    """Chunked itinerary as a JSON string; None when generation fails."""
+    try:
+        itinerary = None
+        for path, section in iter_chunked_itinerary(travel_data, hotels_data, language):
+            if path == "":
+                itinerary = section
+        return json.dumps(itinerary, ensure_ascii=False, indent=2) if itinerary is not None else None
+    except Exception as e:
+        console.print(f"[red]Error generating chunked itinerary: {str(e)}[/red]")
+        return None
+
+
+async def async_call_openai_chat_chunked(travel_data, hotels_data, language: str = None):
+    """Awaitable counterpart of call_openai_chat_chunked."""
+    try:
+        itinerary = None
+        async for path, section in aiter_chunked_itinerary(travel_data, hotels_data, language):
+            if path == "":
+                itinerary = section
+        return json.dumps(itinerary, ensure_ascii=False, indent=2) if itinerary is not None else None
+    except Exception as e:
+        console.print(f"[red]Error generating chunked itinerary: {str(e)}[/red]")
+        return None
+
+
 if __name__ == "__main__":
     # Sample travel data
     travel_data = {
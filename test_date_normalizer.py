@@ -0,0 +1,99 @@
+import datetime
+
+import pytest
+
+from date_normalizer import DateRange, annotate_when, normalize_duration, normalize_when
+
+TODAY = datetime.date(2026, 10, 16)  # a Friday
+
+
+def d(text: str) -> datetime.date:
+    return datetime.date.fromisoformat(text)
+
+
+def span(start: str, end: str = None) -> DateRange:
+    return DateRange(d(start), d(end) if end else None)
+
+
+@pytest.mark.parametrize("expression, expected", [
+    # Relative
+    ("tomorrow", span("2026-10-17")),
+    ("next week", span("2026-10-23")),
+    ("this weekend", span("2026-10-17", "2026-10-18")),
+    ("in 3 days", span("2026-10-19")),
+    ("next month", span("2026-11-16")),
+    ("2nd week of next month", span("2026-11-08", "2026-11-14")),
+    ("end of this month", span("2026-10-31")),
+    # Month names
+    ("in May", span("2027-05-01", "2027-05-31")),
+    ("in March", span("2027-03-01", "2027-03-31")),
+    ("next May", span("2027-05-01", "2027-05-31")),
+    ("mid-December", span("2026-12-11", "2026-12-20")),
+    ("March 10-15", span("2027-03-10", "2027-03-15")),
+    ("December 24, 2026", span("2026-12-24")),
+    ("March next year", span("2027-03-01", "2027-03-31")),
+    # Day before month
+    ("12 October", span("2027-10-12")),
+    ("3 Nov", span("2026-11-03")),
+    ("3rd of November", span("2026-11-03")),
+    ("on the 20th of December 2026", span("2026-12-20")),
+    # Numeric
+    ("2026-11-05", span("2026-11-05")),
+    ("2026/11/05", span("2026-11-05")),
+    ("10/12/2026", span("2026-10-12")),
+    ("25/12/2026", span("2026-12-25")),
+    ("12/25", span("2026-12-25")),
+    ("12/20 - 12/27", span("2026-12-20", "2026-12-27")),
+    # Years and seasons
+    ("next year", span("2027-01-01", "2027-12-31")),
+    ("early next year", span("2027-01-01", "2027-04-30")),
+    ("late next year", span("2027-09-01", "2027-12-31")),
+    ("next summer", span("2027-06-01", "2027-08-31")),
+    ("this winter", span("2026-12-01", "2027-02-28")),
+    # Chinese
+    ("下个月", span("2026-11-16")),
+    ("下个月初", span("2026-11-01", "2026-11-10")),
+    ("十月中旬", span("2026-10-11", "2026-10-20")),
+    ("八月中旬", span("2027-08-11", "2027-08-20")),
+    ("10月20日到25日", span("2026-10-20", "2026-10-25")),
+    ("明年3月", span("2027-03-01", "2027-03-31")),
+    ("明年", span("2027-01-01", "2027-12-31")),
+    ("明年春天", span("2027-03-01", "2027-05-31")),
+    ("明年年底", span("2027-12-01", "2027-12-31")),
+    ("三天后", span("2026-10-19")),
+    # Already annotated
+    ("next month (2026-11-16)", span("2026-11-16")),
+])
+def test_normalize_when(expression, expected):
+    assert normalize_when(expression, TODAY) == expected
+
+
+@pytest.mark.parametrize("expression", ["", "I may go somewhere", "we will march on", "whenever", "don't let me fall"])
+def test_normalize_when_unrecognised(expression):
+    assert normalize_when(expression, TODAY) is None
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("next month", "next month (2026-11-16)"),
+    ("this weekend", "this weekend (2026-10-17 to 2026-10-18)"),
+    ("next month (2026-11-16)", "next month (2026-11-16)"),
+    ("next month (approx. November 2026)", "next month (approx. November 2026)"),
+    ("whenever", "whenever"),
+])
+def test_annotate_when(expression, expected):
+    assert annotate_when(expression, TODAY) == expected
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("2 weeks", 14),
+    ("a week and a half", 10),
+    ("5 nights", 5),
+    ("a fortnight", 14),
+    ("十天", 10),
+    ("两个星期", 14),
+    ("半个月", 15),
+    ("10", 10),
+    ("a while", None),
+])
+def test_normalize_duration(expression, expected):
+    assert normalize_duration(expression) == expected
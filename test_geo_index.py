@@ -0,0 +1,73 @@
+import math
+import random
+
+import pytest
+
+import booking
+import geo_index
+from geo_index import CityIndex
+
+
+def brute_force(index, latitude, longitude, k, max_distance_km=None):
+    distances = []
+    for city in index.cities:
+        lat1, lon1, lat2, lon2 = map(math.radians, (latitude, longitude, city["latitude"], city["longitude"]))
+        central = math.acos(min(1.0, math.sin(lat1) * math.sin(lat2) + math.cos(lat1) * math.cos(lat2) * math.cos(lon1 - lon2)))
+        distance = geo_index.EARTH_RADIUS_KM * central
+        if max_distance_km is None or distance <= max_distance_km:
+            distances.append((distance, city["name"]))
+    return [name for _, name in sorted(distances)[:k]]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CityIndex.from_table()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_nearest_matches_brute_force(index, seed):
+    rng = random.Random(seed)
+    latitude, longitude = rng.uniform(-80, 80), rng.uniform(-180, 180)
+    found = [city["name"] for city in index.nearest(latitude, longitude, k=5)]
+    assert found == brute_force(index, latitude, longitude, 5)
+
+
+def test_within_radius(index):
+    found = index.within(65.9667, -18.5333, 100)
+    assert [city["name"] for city in found] == brute_force(index, 65.9667, -18.5333, len(index.cities), 100)
+    assert all(city["distance"] <= 100 for city in found)
+
+
+def test_antimeridian():
+    index = CityIndex([
+        {"name": "East", "country": "x", "country_name": "X", "latitude": 0.0, "longitude": 179.9},
+        {"name": "Far", "country": "x", "country_name": "X", "latitude": 0.0, "longitude": 170.0},
+    ])
+    assert index.nearest(0.0, -179.9, k=1)[0]["name"] == "East"
+
+
+def test_nearby_cities_needs_k_results_from_the_builtin_table(index):
+    # North Iceland is densely covered by the built-in table; central Tokyo is not
+    iceland = geo_index.nearby_cities(65.9667, -18.5333, k=5, index=index)
+    assert len(iceland) == 5 and iceland[0]["name"] == "Dalvík"
+    assert geo_index.nearby_cities(35.6762, 139.6503, k=10, index=index) is None
+
+
+def test_nearby_cities_trusts_a_complete_index(index):
+    complete = CityIndex(index.cities, complete=True)
+    tokyo = geo_index.nearby_cities(35.6762, 139.6503, k=10, index=complete)
+    assert tokyo and len(tokyo) < 10
+    assert set(tokyo[0]) == {"name", "country", "latitude", "longitude", "distance"}
+
+
+def test_fetch_nearby_cities_falls_back_to_the_api(monkeypatch):
+    monkeypatch.setattr(geo_index, "_default_index", CityIndex.from_table())
+    calls = []
+    monkeypatch.setattr(booking, "fetch_data", lambda path, params: calls.append(path) or [{"name": "Tokyo", "dest_id": "-246227"}])
+    assert booking.fetch_nearby_cities("35.6762", "139.6503") == [{"name": "Tokyo", "dest_id": "-246227"}]
+    assert calls == ["/v1/hotels/nearby-cities"]
+
+    calls.clear()
+    monkeypatch.setattr(geo_index, "_default_index", CityIndex(CityIndex.from_table().cities, complete=True))
+    assert booking.fetch_nearby_cities("65.9667", "-18.5333")[0]["name"] == "Dalvík"
+    assert calls == []
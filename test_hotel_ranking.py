@@ -0,0 +1,62 @@
+import pytest
+
+from hotel_ranking import HotelCandidates, parse_price, rank_hotels, traveler_constraints
+
+
+def hotel(name, price, tags):
+    return {"hotel_name": name, "hotel_url": f"https://example.com/{name}", "hotel_image": f"{name}.jpg",
+            "offer_price": price, "tags": tags}
+
+
+HOTELS = [
+    hotel("Budget Inn", "US$80", "Free WiFi, 2 swimming pools"),
+    hotel("Family Suites", "US$150", "Family rooms, Facilities for disabled guests, Swimming pool"),
+    hotel("Grand Spa", "US$420", "Spa and wellness centre, Swimming pool, Restaurant"),
+    hotel("Beach Club", "US$260", "Beachfront, Swimming pool, Restaurant, Family rooms"),
+    hotel("No Price", None, "Free parking"),
+]
+
+
+@pytest.mark.parametrize("description, preferred", [
+    # Longer words that merely start with a keyword are not amenity requests
+    ("Two weeks exploring Spain and the Caribbean, visiting Petra and a pottery workshop", []),
+    ("We want to relax by the beach", ["spa and wellness centre", "swimming pool", "beachfront"]),
+    ("A relaxing trip", ["spa and wellness centre", "swimming pool"]),
+    ("Travelling with our two dogs and renting cars", ["free parking", "private parking", "pets allowed"]),
+    ("Remote work, fast wifi please", ["free wifi"]),
+])
+def test_preferred_tags(description, preferred):
+    assert traveler_constraints(description)["preferred_tags"] == preferred
+
+
+@pytest.mark.parametrize("description, band", [
+    ("Our budget is mid-range", (0.2, 0.8)),
+    ("Looking for the cheapest options", (0.0, 0.4)),
+    ("A luxury honeymoon", (0.6, 1.0)),
+    ("Budgeting is not a concern", None),
+])
+def test_budget_band(description, band):
+    assert traveler_constraints(description)["budget_band"] == band
+
+
+def test_required_tags_for_elderly_and_families():
+    constraints = traveler_constraints("trip with my parents", has_elderly=True, is_family=True)
+    assert constraints["required_tags"] == ["facilities for disabled guests", "family rooms"]
+    assert HotelCandidates(HOTELS).select(required_tags=constraints["required_tags"]) == [1]
+
+
+def test_select_ranks_preferred_tags_then_price():
+    candidates = HotelCandidates(HOTELS)
+    assert candidates.select(preferred_tags=["swimming pool", "restaurant"], k=3) == [3, 2, 1]
+    assert candidates.select(max_price=200) == [0, 1, 4]
+
+
+def test_rank_hotels_compact_form():
+    ranked = rank_hotels(HOTELS, "We love the beach", k=1)
+    assert ranked == [{"name": "Beach Club", "url": "https://example.com/Beach Club", "image": "Beach Club.jpg",
+                       "price": "US$260", "tags": HOTELS[3]["tags"]}]
+
+
+@pytest.mark.parametrize("price, expected", [("US$1,993", 1993.0), (120, 120.0), ("", None), (None, None)])
+def test_parse_price(price, expected):
+    assert parse_price(price) == expected
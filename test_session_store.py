@@ -0,0 +1,38 @@
+import time
+
+from session_store import MemorySessionStore, SessionState, SQLiteSessionStore
+
+
+def state(session_id, last_access=None):
+    return SessionState(session_id, "english", [None] * 8, 0, [("u", "hi")], last_access=last_access)
+
+
+def test_load_refreshes_idle_timestamp():
+    store = MemorySessionStore(idle_ttl=60)
+    store.save_state(state("a", last_access=time.time() - 120))
+    assert store.load_state("a") is not None
+    assert store.evict_idle() == 0
+    assert len(store) == 1
+
+
+def test_idle_sessions_spill_to_overflow_and_are_promoted_on_load():
+    overflow = SQLiteSessionStore(":memory:")
+    store = MemorySessionStore(idle_ttl=60, overflow=overflow)
+    store.save_state(state("a", last_access=time.time() - 120))
+    assert store.evict_idle() == 1
+    assert len(store) == 0
+
+    loaded = store.load_state("a")
+    assert loaded.history == [("u", "hi")]
+    assert len(store) == 1
+    assert store.evict_idle() == 0
+
+
+def test_capacity_eviction_keeps_most_recently_loaded():
+    store = MemorySessionStore(max_sessions=2)
+    for session_id in ("a", "b"):
+        store.save_state(state(session_id))
+    store.load_state("a")
+    store.save_state(state("c"))
+    assert store.load_state("b") is None
+    assert store.load_state("a") is not None
@@ -0,0 +1,251 @@
+import asyncio
+import contextvars
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from cache import LRUCache, SQLiteCache, TieredCache, make_key
+from json_stream import loads_lenient
+from llm_client import chat_completion, achat_completion
+from prompts import TRANSLATION
+
+# Itineraries are generated once in this language and translated into the others
+PIVOT_LANGUAGE = "english"
+
+TARGET_LANGUAGES = {"chinese": "Traditional Chinese"}
+
+# Values copied as-is: links, prices, day numbers and the hotel names used for booking
+UNTRANSLATED_KEYS = {"url", "image", "price", "day", "hotel_name", "full_hotel_name"}
+
+MAX_TRANSLATION_CONCURRENCY = 8
+
+_UNTRANSLATABLE_RE = re.compile(r"^(?:https?://\S+|[\d\s.,:/$%+\-–()]*)$")
+
+# Translation memory: one entry per (language, text segment), so repeated hotel
+# features, tips and day descriptions are only ever translated once
+_memory = TieredCache(
+    LRUCache(max_entries=int(os.getenv("TRANSLATION_MEMORY_SIZE", "20000")), ttl=0),
+    SQLiteCache(os.environ["TRANSLATION_MEMORY_PATH"], ttl=0) if os.getenv("TRANSLATION_MEMORY_PATH") else None,
+)
+
+
+def configure_memory(memory=None):
+    """Replace the translation memory (any object with get/set, e.g. TieredCache); None disables it"""
+    global _memory
+    _memory = memory
+
+
+def get_memory():
+    return _memory
+
+
+def _memory_key(language: str, text: str) -> str:
+    return make_key("translation", language, text)
+
+
+def needs_translation(language: str) -> bool:
+    return (language or PIVOT_LANGUAGE).lower() in TARGET_LANGUAGES
+
+
+##################################################################
+# Segments: the translatable string values of a section
+##################################################################
+
+def segments(section, key: str = None) -> list:
+    """Distinct translatable strings in a section, in document order"""
+    found = []
+    if isinstance(section, dict):
+        for child_key, value in section.items():
+            found.extend(segments(value, child_key))
+    elif isinstance(section, list):
+        for value in section:
+            found.extend(segments(value, key))
+    elif isinstance(section, str) and key not in UNTRANSLATED_KEYS and not _UNTRANSLATABLE_RE.match(section):
+        found.append(section)
+    return list(dict.fromkeys(found))
+
+
+def apply_translations(section, translations: dict, key: str = None):
+    """Copy of section with every translated string replaced"""
+    if isinstance(section, dict):
+        return {child_key: apply_translations(value, translations, child_key) for child_key, value in section.items()}
+    if isinstance(section, list):
+        return [apply_translations(value, translations, key) for value in section]
+    if isinstance(section, str) and key not in UNTRANSLATED_KEYS:
+        return translations.get(section, section)
+    return section
+
+
+def _recall(texts: list, language: str) -> tuple:
+    """(translations found in memory, texts still to translate)"""
+    known, missing = {}, []
+    for text in texts:
+        cached = _memory.get(_memory_key(language, text)) if _memory is not None else None
+        if cached is None:
+            missing.append(text)
+        else:
+            known[text] = cached
+    metrics.record_cache("translation", not missing)
+    return known, missing
+
+
+def _translation_params(texts: list, language: str) -> dict:
+    return dict(
+        messages=[
+            {"role": "system", "content": TRANSLATION.render(target=TARGET_LANGUAGES[language])},
+            {"role": "user", "content": json.dumps(texts, ensure_ascii=False)},
+        ],
+        temperature=0,
+        max_tokens=min(4000, 200 + 3 * sum(len(text) for text in texts)),
+    )
+
+
+def _remember(texts: list, response, language: str) -> dict:
+    try:
+        translated = loads_lenient(response.choices[0].message.content)
+    except ValueError:
+        translated = None
+    if not isinstance(translated, list) or len(translated) != len(texts):
+        print(f"Error translating itinerary section: unexpected response for {len(texts)} segments")
+        return {}
+    translations = {}
+    for text, translation in zip(texts, translated):
+        if isinstance(translation, str) and translation:
+            translations[text] = translation
+            if _memory is not None:
+                _memory.set(_memory_key(language, text), translation)
+    return translations
+
+
+def translate_section(section, language: str):
+    """Translate one itinerary section, asking the LLM only for segments not in the memory"""
+    language = language.lower()
+    known, missing = _recall(segments(section), language)
+    if missing:
+        try:
+            # The memory is the cache here; a response cache entry per batch would only duplicate it
+            response = chat_completion(cache=False, task="translate", **_translation_params(missing, language))
+            known.update(_remember(missing, response, language))
+        except Exception as e:
+            print(f"Error translating itinerary section: {str(e)}")
+    return apply_translations(section, known)
+
+
+async def atranslate_section(section, language: str, semaphore: asyncio.Semaphore = None):
+    """Awaitable counterpart of translate_section"""
+    language = language.lower()
+    known, missing = _recall(segments(section), language)
+    if missing:
+        try:
+            async with semaphore or asyncio.Semaphore(1):
+                response = await achat_completion(cache=False, task="translate", **_translation_params(missing, language))
+            known.update(_remember(missing, response, language))
+        except Exception as e:
+            print(f"Error translating itinerary section: {str(e)}")
+    return apply_translations(section, known)
+
+
+##################################################################
+# Whole itineraries and section streams
+##################################################################
+
+def _split_sections(itinerary: dict) -> list:
+    """The itinerary as independently translatable sections: overview, location headers, days, tips"""
+    sections = [itinerary.get("trip_overview", {})]
+    for location in itinerary.get("locations", []):
+        sections.append({key: value for key, value in location.items() if key != "itinerary"})
+        sections.extend(location.get("itinerary", []))
+    sections.append(itinerary.get("additional_info", []))
+    return sections
+
+
+def _join_sections(itinerary: dict, translated: list) -> dict:
+    parts = iter(translated)
+    joined = dict(itinerary, trip_overview=next(parts), locations=[])
+    for location in itinerary.get("locations", []):
+        header = next(parts)
+        joined["locations"].append(dict(header, itinerary=[next(parts) for _ in location.get("itinerary", [])]))
+    joined["additional_info"] = next(parts)
+    return joined
+
+
+def translate_itinerary(itinerary: dict, language: str) -> dict:
+    """Translate an itinerary document, all sections concurrently"""
+    sections = _split_sections(itinerary)
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_TRANSLATION_CONCURRENCY, len(sections)))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, translate_section, section, language) for section in sections]
+        return _join_sections(itinerary, [future.result() for future in futures])
+
+
+async def atranslate_itinerary(itinerary: dict, language: str) -> dict:
+    """Awaitable counterpart of translate_itinerary"""
+    semaphore = asyncio.Semaphore(MAX_TRANSLATION_CONCURRENCY)
+    translated = await asyncio.gather(*(atranslate_section(section, language, semaphore) for section in _split_sections(itinerary)))
+    return _join_sections(itinerary, list(translated))
+
+
+async def atranslate_stream(sections, language: str):
+    """Translate an itinerary section stream (see json_stream.ITINERARY_SECTIONS) as it is generated.
+
+    Each overview, day and tip starts translating as soon as it arrives; a location is
+    assembled from its translated days plus its header, and the final document from
+    the translated parts. Sections are yielded in their original order.
+    """
+    semaphore = asyncio.Semaphore(MAX_TRANSLATION_CONCURRENCY)
+    queue = asyncio.Queue()
+    day_tasks, location_tasks, tip_tasks = [], [], []
+    overview_task = None
+
+    def start(section):
+        return asyncio.ensure_future(atranslate_section(section, language, semaphore))
+
+    async def location(section, days):
+        header = {key: value for key, value in section.items() if key != "itinerary"}
+        header, days = await asyncio.gather(atranslate_section(header, language, semaphore), asyncio.gather(*days))
+        return dict(header, itinerary=list(days))
+
+    async def document(section, overview, locations, tips):
+        parts = await asyncio.gather(
+            overview if overview is not None else start(section.get("trip_overview", {})),
+            asyncio.gather(*locations),
+            asyncio.gather(*tips),
+        )
+        return dict(section, trip_overview=parts[0], locations=list(parts[1]), additional_info=list(parts[2]))
+
+    async def produce():
+        nonlocal overview_task, day_tasks
+        try:
+            async for path, section in sections:
+                if path == "trip_overview":
+                    task = overview_task = start(section)
+                elif path == "locations[].itinerary[]":
+                    task = start(section)
+                    day_tasks.append(task)
+                elif path == "locations[]":
+                    task = asyncio.ensure_future(location(section, day_tasks))
+                    location_tasks.append(task)
+                    day_tasks = []
+                elif path == "additional_info[]":
+                    task = start(section)
+                    tip_tasks.append(task)
+                elif path == "":
+                    task = asyncio.ensure_future(document(section, overview_task, location_tasks, tip_tasks))
+                else:
+                    task = start(section)
+                await queue.put((path, task))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            path, task = item
+            yield path, await task
+        await producer
+    finally:
+        producer.cancel()